@@ -1,7 +1,9 @@
 import os
+import json
 import base64
 import logging
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 import fitz  # PyMuPDF
 import requests
 from PIL import Image
@@ -9,9 +11,53 @@ from docx import Document
 import io
 from pathlib import Path
 from dotenv import load_dotenv
+from pdf_engine import PageText, extract_pages, with_offsets, join_pages
+from ocr import ocr_available, ocr_image, ocr_pdf_pages
+from clauses import segment_pdf, segment_text
+from legacy_formats import extract_doc, extract_rtf, sniff_format
 
 load_dotenv()
 
+@dataclass
+class ExtractionResult:
+    """Extracted text plus per-page text and offsets into it, and the clause tree"""
+    text: str
+    file_type: str
+    pages: List[PageText] = field(default_factory=list)
+    clauses: List[Dict] = field(default_factory=list)
+
+    @classmethod
+    def single_page(cls, text: str, file_type: str) -> 'ExtractionResult':
+        return cls(text, file_type, [PageText(0, text, 0, len(text), False)])
+
+class Base64Body:
+    """Request body that base64-encodes a file (or bytes) between two JSON fragments.
+
+    requests sends it with a Content-Length computed up front and reads the
+    source in CHUNK_SIZE pieces, so neither the raw file, its base64 form
+    nor the JSON document is ever held in memory whole.
+    """
+    CHUNK_SIZE = 3 * 64 * 1024  # multiple of 3, so chunks encode without padding
+
+    def __init__(self, head: bytes, tail: bytes, source):
+        self.head = head
+        self.tail = tail
+        self.source = source  # file path or bytes
+        self.size = len(source) if isinstance(source, bytes) else os.path.getsize(source)
+
+    def __len__(self) -> int:
+        return len(self.head) + 4 * -(-self.size // 3) + len(self.tail)
+
+    def __iter__(self):
+        yield self.head
+        with (io.BytesIO(self.source) if isinstance(self.source, bytes) else open(self.source, 'rb')) as file:
+            while True:
+                chunk = file.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield base64.b64encode(chunk)
+        yield self.tail
+
 class DocumentExtractor:
     """Universal document text extractor supporting multiple formats"""
     
@@ -21,17 +67,26 @@ class DocumentExtractor:
         'text': ['.txt', '.md'],
         'image': ['.png', '.jpg', '.jpeg', '.tiff', '.bmp']
     }
+    MODEL = "anthropic/claude-3-opus-20240229"
+    SCAN_RENDER_DPI = 150
+    LARGE_FILE_BYTES = 4 * 1024 * 1024  # above this, never send the whole file
+    MAX_IMAGE_SIDE = 2000  # large images are downscaled to this before the vision model
+    FILE_PLACEHOLDER = "@@FILE_BASE64@@"
+    # OCR_BACKEND -> stages tried for scanned pages and images; 'local' never leaves the machine
+    OCR_STAGES = {
+        'auto': ('local', 'vision'),
+        'local': ('local',),
+        'vision': ('vision', 'local')
+    }
 
     def __init__(self):
         self.api_key = os.getenv('OPENROUTER_API_KEY')
+        self.ocr_backend = os.getenv('OCR_BACKEND', 'auto')
+        if self.ocr_backend not in self.OCR_STAGES:
+            raise ValueError(f"Unknown OCR_BACKEND: {self.ocr_backend}")
         self.api_url = "https://openrouter.ai/api/v1/chat/completions"
         self.logger = logging.getLogger(__name__)
 
-    def _encode_file_to_base64(self, filepath: str) -> str:
-        """Convert any file to base64 string"""
-        with open(filepath, "rb") as file:
-            return base64.b64encode(file.read()).decode('utf-8')
-
     def _get_file_type(self, filepath: str) -> str:
         """Determine file type from extension"""
         ext = Path(filepath).suffix.lower()
@@ -40,25 +95,24 @@ class DocumentExtractor:
                 return file_type
         raise ValueError(f"Unsupported file format: {ext}")
 
-    def _extract_from_openrouter(self, base64_content: str, file_type: str, lang: str = 'en') -> str:
-        """Extract text using OpenRouter's AI model"""
+    def supports(self, filename: str) -> bool:
+        """True if the file's extension is a supported format"""
+        ext = Path(filename).suffix.lower()
+        return any(ext in extensions for extensions in self.SUPPORTED_FORMATS.values())
+
+    def _request_extraction(self, content: list, file_type: str, source=None) -> Optional[str]:
+        """Send one extraction request to OpenRouter; None on any failure.
+
+        source (a path or bytes) is streamed base64-encoded into the body where
+        FILE_PLACEHOLDER appears in content.
+        """
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "HTTP-Referer": "https://legalsafeai.com",
             "Content-Type": "application/json"
         }
-
-        # Create a prompt based on file type and language
-        prompts = {
-            'pdf': "Extract all text from this PDF document",
-            'document': "Extract all text from this document",
-            'text': "Process and format this text",
-            'image': "Extract all visible text from this image"
-        }
-        base_prompt = prompts.get(file_type, "Extract all text from this file")
-        
         data = {
-            "model": "anthropic/claude-3-opus-20240229",
+            "model": self.MODEL,
             "messages": [
                 {
                     "role": "system",
@@ -66,93 +120,194 @@ class DocumentExtractor:
                 },
                 {
                     "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": f"{base_prompt} in {lang}"
-                        },
-                        {
-                            "type": "file",
-                            "format": "base64",
-                            "media_type": f"application/{file_type}",
-                            "data": base64_content
-                        }
-                    ]
+                    "content": content
                 }
             ]
         }
 
         try:
-            response = requests.post(self.api_url, headers=headers, json=data)
+            if source is None:
+                response = requests.post(self.api_url, headers=headers, json=data)
+            else:
+                head, tail = json.dumps(data).encode('utf-8').split(self.FILE_PLACEHOLDER.encode('utf-8'))
+                response = requests.post(self.api_url, headers=headers, data=Base64Body(head, tail, source))
             response.raise_for_status()
             return response.json()['choices'][0]['message']['content']
         except Exception as e:
             self.logger.error(f"OpenRouter API error: {str(e)}")
             return None
 
-    def _fallback_extraction(self, filepath: str, file_type: str) -> str:
-        """Fallback extraction methods for different file types"""
+    def _extract_from_openrouter(self, filepath: str, file_type: str, lang: str = 'en') -> Optional[str]:
+        """Extract text from a whole file using OpenRouter's AI model"""
+        # Create a prompt based on file type and language
+        prompts = {
+            'pdf': "Extract all text from this PDF document",
+            'document': "Extract all text from this document",
+            'text': "Process and format this text",
+            'image': "Extract all visible text from this image"
+        }
+        base_prompt = prompts.get(file_type, "Extract all text from this file")
+        return self._request_extraction([
+            {
+                "type": "text",
+                "text": f"{base_prompt} in {lang}"
+            },
+            {
+                "type": "file",
+                "format": "base64",
+                "media_type": f"application/{file_type}",
+                "data": self.FILE_PLACEHOLDER
+            }
+        ], file_type, source=filepath)
+
+    def _extract_image_from_openrouter(self, image, lang: str = 'en', media_type: str = 'image/png') -> Optional[str]:
+        """Extract text from a single image (path or bytes, e.g. a rendered scanned page) with the vision model"""
+        return self._request_extraction([
+            {
+                "type": "text",
+                "text": f"Extract all visible text from this scanned page in {lang}. Return only the text."
+            },
+            {
+                "type": "image_url",
+                "image_url": {"url": f"data:{media_type};base64,{self.FILE_PLACEHOLDER}"}
+            }
+        ], 'image', source=image)
+
+    def _extract_local(self, filepath: str, file_type: str) -> Optional[str]:
+        """Local extraction for documents and text files; None if the format needs the LLM"""
         try:
-            if file_type == 'pdf':
-                return self._extract_pdf_fallback(filepath)
-            elif file_type == 'document':
-                return self._extract_document_fallback(filepath)
+            if file_type == 'document':
+                return self._extract_document_local(filepath)
             elif file_type == 'text':
-                return self._extract_text_fallback(filepath)
-            elif file_type == 'image':
-                return self._extract_image_fallback(filepath)
+                return self._extract_text_local(filepath)
         except Exception as e:
-            self.logger.error(f"Fallback extraction error: {str(e)}")
-            raise
+            self.logger.warning(f"Local extraction failed for {Path(filepath).name}: {str(e)}")
+        return None
 
-    def _extract_pdf_fallback(self, filepath: str) -> str:
-        """Extract text from PDF using PyMuPDF"""
-        doc = fitz.open(filepath)
-        text = ""
-        for page in doc:
-            text += page.get_text()
-        return text
+    def _extract_pdf(self, filepath: str, lang: str) -> ExtractionResult:
+        """Text pages are read from the text layer in parallel; only scanned pages are OCR'd"""
+        pages = extract_pages(filepath)
+        scanned = [number for number, _, is_scanned in pages if is_scanned]
+        if scanned:
+            self.logger.info(f"{len(scanned)}/{len(pages)} scanned pages in {Path(filepath).name}")
+            for number, text in self._ocr_scanned_pages(filepath, scanned, lang).items():
+                if text and not text.endswith("\n"):
+                    text += "\n"
+                pages[number] = (number, text, True)
+        pages = with_offsets(pages)
+        return ExtractionResult(join_pages(pages), 'pdf', pages)
 
-    def _extract_document_fallback(self, filepath: str) -> str:
-        """Extract text from Word documents"""
-        doc = Document(filepath)
-        return "\n".join([paragraph.text for paragraph in doc.paragraphs])
+    def _ocr_scanned_pages(self, filepath: str, numbers: List[int], lang: str) -> Dict[int, str]:
+        """Run the OCR stages in OCR_STAGES order, each only on pages still without text"""
+        texts = {number: "" for number in numbers}
+        for stage in self.OCR_STAGES[self.ocr_backend]:
+            missing = [number for number, text in texts.items() if not text.strip()]
+            if not missing:
+                break
+            if stage == 'local':
+                if ocr_available():
+                    texts.update(ocr_pdf_pages(filepath, missing, lang))
+            else:
+                with fitz.open(filepath) as doc:
+                    for number in missing:
+                        texts[number] = self._extract_scanned_page(doc[number], lang)
+        return texts
 
-    def _extract_text_fallback(self, filepath: str) -> str:
+    def _extract_scanned_page(self, page, lang: str) -> str:
+        """Render a scanned page and extract it with the vision model"""
+        pixmap = page.get_pixmap(dpi=self.SCAN_RENDER_DPI)
+        return self._extract_image_from_openrouter(pixmap.tobytes('png'), lang) or ""
+
+    def _extract_image(self, filepath: str, lang: str) -> str:
+        """Run the OCR stages in OCR_STAGES order until one returns text"""
+        for stage in self.OCR_STAGES[self.ocr_backend]:
+            if stage == 'local':
+                text = ocr_image(filepath, lang) if ocr_available() else ""
+            else:
+                text = self._extract_image_with_vision(filepath, lang)
+            if text.strip():
+                return text
+        return ""
+
+    def _extract_image_with_vision(self, filepath: str, lang: str) -> str:
+        with Image.open(filepath) as image:
+            media_type = Image.MIME.get(image.format, 'image/png')
+            if os.path.getsize(filepath) > self.LARGE_FILE_BYTES or max(image.size) > self.MAX_IMAGE_SIDE:
+                # Downscale instead of uploading the original: bounded size, like a rendered page
+                image.thumbnail((self.MAX_IMAGE_SIDE, self.MAX_IMAGE_SIDE))
+                buffer = io.BytesIO()
+                image.convert('RGB').save(buffer, format='JPEG', quality=85)
+                return self._extract_image_from_openrouter(buffer.getvalue(), lang, 'image/jpeg') or ""
+        return self._extract_image_from_openrouter(filepath, lang, media_type) or ""
+
+    def _extract_document_local(self, filepath: str) -> Optional[str]:
+        """Extract text from .docx, .doc and .rtf, dispatching on the file's magic bytes"""
+        kind = sniff_format(filepath)
+        if kind == 'docx':
+            doc = Document(filepath)
+            return "\n".join([paragraph.text for paragraph in doc.paragraphs])
+        if kind == 'rtf':
+            return extract_rtf(filepath)
+        if kind == 'doc':
+            return extract_doc(filepath)
+        return None
+
+    def _extract_text_local(self, filepath: str) -> str:
         """Extract text from text files"""
-        with open(filepath, 'r', encoding='utf-8') as file:
-            return file.read()
+        with open(filepath, 'rb') as file:
+            raw = file.read()
+        try:
+            return raw.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            return raw.decode('cp1252', errors='replace')
 
-    def _extract_image_fallback(self, filepath: str) -> str:
-        """Extract text from images using Tesseract"""
+    def _segment(self, filepath: str, result: ExtractionResult) -> ExtractionResult:
+        """Attach the clause tree; a segmentation failure never fails the extraction"""
         try:
-            import pytesseract
-            image = Image.open(filepath)
-            return pytesseract.image_to_string(image)
-        except ImportError:
-            self.logger.error("Tesseract not installed for image fallback")
-            return ""
+            if result.file_type == 'pdf':
+                result.clauses = segment_pdf(filepath, result.pages)
+            else:
+                result.clauses = segment_text(result.text)
+        except Exception as e:
+            self.logger.warning(f"Clause segmentation failed for {Path(filepath).name}: {str(e)}")
+        return result
 
-    def extract_text(self, filepath: str, lang: str = 'en') -> str:
-        """Main method to extract text from any supported file"""
+    def extract(self, filepath: str, lang: str = 'en') -> ExtractionResult:
+        """Extract any supported file into text with per-page offsets and clauses.
+
+        Local extraction runs first; the LLM only sees what cannot be read
+        locally: scanned pages and images that local OCR cannot read (see
+        OCR_STAGES; rendered or downscaled images), and formats without a local reader
+        up to LARGE_FILE_BYTES, streamed rather than encoded in memory.
+        """
         try:
             file_type = self._get_file_type(filepath)
-            
-            # Try AI extraction first
-            base64_content = self._encode_file_to_base64(filepath)
-            ai_text = self._extract_from_openrouter(base64_content, file_type, lang)
-            
-            if ai_text and len(ai_text.strip()) > 100:
-                return ai_text
-            
-            # Fallback to traditional methods if AI extraction fails
-            self.logger.info("Using fallback extraction method")
-            return self._fallback_extraction(filepath, file_type)
-            
+
+            if file_type == 'pdf':
+                return self._segment(filepath, self._extract_pdf(filepath, lang))
+            if file_type == 'image':
+                return self._segment(filepath, ExtractionResult.single_page(self._extract_image(filepath, lang), file_type))
+
+            local_text = self._extract_local(filepath, file_type)
+            if local_text and local_text.strip():
+                return self._segment(filepath, ExtractionResult.single_page(local_text, file_type))
+
+            if os.path.getsize(filepath) > self.LARGE_FILE_BYTES:
+                # No page-wise route exists for this format, and whole-file uploads are capped
+                raise ValueError(f"{Path(filepath).suffix} files over {self.LARGE_FILE_BYTES // (1024 * 1024)}MB need a local extractor")
+
+            self.logger.info("No local extractor produced text, using AI extraction")
+            ai_text = self._extract_from_openrouter(filepath, file_type, lang)
+            return self._segment(filepath, ExtractionResult.single_page(ai_text or local_text or "", file_type))
+
         except Exception as e:
             self.logger.error(f"Text extraction error: {str(e)}")
             raise
 
+    def extract_text(self, filepath: str, lang: str = 'en') -> str:
+        """Main method to extract text from any supported file"""
+        return self.extract(filepath, lang).text
+
 def main():
     logging.basicConfig(level=logging.INFO)
     extractor = DocumentExtractor()
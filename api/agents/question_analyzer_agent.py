@@ -5,13 +5,24 @@ import logging
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
 import os
+import hashlib
 from flask import Flask
-from models import db, Preference, ChatHistory
+from models import db, ChatHistory, QuestionFrequency, GLOBAL_QUESTION_SCOPE
+from preferences import preference_store, PREFERENCE_AREAS
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_FREQUENT_QUESTIONS = [
+    {"question": "What are the termination clauses in the contract?", "response": "What are the termination clauses in the contract?", "count": 0},
+    {"question": "Is the non-compete clause enforceable under Italian law?", "response": "Is the non-compete clause enforceable under Italian law?", "count": 0},
+    {"question": "What are the salary and benefits details?", "response": "What are the salary and benefits details?", "count": 0},
+    {"question": "How many vacation days are provided?", "response": "How many vacation days are provided?", "count": 0},
+    {"question": "What are the overtime policies?", "response": "What are the overtime policies?", "count": 0}
+]
+
 class QuestionAnalyzerAgent:
     def __init__(self):
         load_dotenv()
@@ -19,15 +30,7 @@ class QuestionAnalyzerAgent:
         if not self.api_key:
             raise ValueError("OPENROUTER_API_KEY not found in .env file")
         self.api_url = "https://openrouter.ai/api/v1/chat/completions"
-        self.areas = [
-            'sick_leave', 'vacation', 'overtime', 'termination', 'confidentiality',
-            'non_compete', 'intellectual_property', 'governing_law', 'jurisdiction',
-            'dispute_resolution', 'liability', 'salary', 'benefits', 'work_hours',
-            'performance_evaluation', 'duties', 'responsibilities'
-        ]
-        self._frequent_questions_cache = None
-        self._cache_timestamp = None
-        self._cache_duration = 3600  # Cache for 1 hour
+        self.areas = list(PREFERENCE_AREAS)
 
     def analyze(self, user_id: int, question: str) -> List[str]:
         """Analyze a question to identify relevant contract areas and update preferences."""
@@ -82,21 +85,8 @@ class QuestionAnalyzerAgent:
             areas = [area for area in re.findall(pattern, content, re.IGNORECASE) if area in self.areas]
             valid_areas = list(dict.fromkeys(areas))[:3]  # Remove duplicates, keep order
             
-            # Initialize preferences if not exist
-            existing_prefs = {p.area: p for p in Preference.query.filter_by(user_id=user_id).all()}
-            for area in self.areas:
-                if area not in existing_prefs:
-                    pref = Preference(user_id=user_id, area=area, weight=1.0)
-                    db.session.add(pref)
-                    existing_prefs[area] = pref
-            
-            # Update preference weights
-            for area, pref in existing_prefs.items():
-                if area in valid_areas:
-                    pref.weight = min(pref.weight + 0.2, 5.0)  # Increase weight
-                else:
-                    pref.weight = max(pref.weight - 0.05, 0.5)  # Decrease weight
-            db.session.commit()
+            # Queue the event; the user's vector is written back in batches
+            preference_store.record(user_id, valid_areas)
             
             logger.debug(f"Updated preferences for user_id {user_id}: {valid_areas}")
             return valid_areas
@@ -114,38 +104,15 @@ class QuestionAnalyzerAgent:
             return []
 
     def get_choices(self, user_id: int) -> List[str]:
-        """Get the minimal set of choices with combined weight > 60% or top 5 by weight."""
+        """Get the top 5 areas by weight.
+
+        Picking the minimal set above 60% of the total weight and then padding it
+        to 5 areas always yields the 5 heaviest areas, so this is a plain top-k.
+        """
         try:
-            preferences = Preference.query.filter_by(user_id=user_id).all()
-            if not preferences:
-                logger.debug(f"No preferences for user_id {user_id}, returning default areas")
-                return self.areas[:5]
-            
-            # Calculate total weight
-            total_weight = sum(pref.weight for pref in preferences)
-            target_weight = total_weight * 0.6
-            
-            # Sort preferences by weight (descending)
-            sorted_prefs = sorted(preferences, key=lambda x: x.weight, reverse=True)
-            
-            # Select minimal set exceeding 60%
-            selected_areas = []
-            current_weight = 0
-            for pref in sorted_prefs:
-                if len(selected_areas) >= 5:
-                    break
-                selected_areas.append(pref.area)
-                current_weight += pref.weight
-                if current_weight >= target_weight:
-                    break
-            
-            # Ensure at least 5 areas
-            if len(selected_areas) < 5 and len(sorted_prefs) > len(selected_areas):
-                remaining = [p.area for p in sorted_prefs if p.area not in selected_areas]
-                selected_areas.extend(remaining[:5 - len(selected_areas)])
-            
+            selected_areas = preference_store.top_areas(user_id, k=5)
             logger.debug(f"Choices for user_id {user_id}: {selected_areas}")
-            return selected_areas[:5]
+            return selected_areas
         except SQLAlchemyError as e:
             logger.error(f"Database error fetching choices: {str(e)}")
             return self.areas[:5]
@@ -153,72 +120,107 @@ class QuestionAnalyzerAgent:
             logger.error(f"Unexpected error fetching choices: {str(e)}")
             return self.areas[:5]
 
-    # api/agents/question_analyzer_agent.py
-def get_frequent_questions(self, user_id: Optional[int] = None, limit: int = 5) -> List[Dict]:
-    """Get the most frequently asked questions for a user or globally, with caching."""
-    try:
+    def record_question(self, user_id: int, question: str) -> None:
+        """Count a newly saved question for the user and globally (caller commits)."""
+        normalized = _normalize_question(question)
+        if not normalized:
+            return
+        question_hash = _question_hash(normalized)
         now = datetime.utcnow()
-        
-        # Check cache
-        if (self._frequent_questions_cache and 
-            self._cache_timestamp and 
-            (now - self._cache_timestamp).total_seconds() < self._cache_duration):
-            logger.debug("Returning cached frequent questions")
-            return self._frequent_questions_cache[:limit]
-        
-        # Query frequent questions
-        query = ChatHistory.query
-        if user_id:
-            query = query.filter_by(user_id=user_id)
-        
-        questions = (
-            query
-            .group_by(ChatHistory.question)
-            .order_by(db.func.count().desc())
-            .limit(limit)
-            .all()
-        )
-        
-        if questions:
-            result = [
+        for scope in (user_id, GLOBAL_QUESTION_SCOPE):
+            stmt = sqlite_insert(QuestionFrequency).values(
+                user_id=scope,
+                question_hash=question_hash,
+                question=normalized,
+                count=1,
+                updated_at=now
+            ).on_conflict_do_update(
+                index_elements=['user_id', 'question_hash'],
+                set_={'count': QuestionFrequency.count + 1, 'updated_at': now}
+            )
+            db.session.execute(stmt)
+
+    def record_response(self, user_id: int, question: str, response: str) -> None:
+        """Remember the latest response shown for a frequent question (caller commits)."""
+        normalized = _normalize_question(question)
+        if not normalized or not response:
+            return
+        QuestionFrequency.query.filter(
+            QuestionFrequency.user_id.in_((user_id, GLOBAL_QUESTION_SCOPE)),
+            QuestionFrequency.question_hash == _question_hash(normalized)
+        ).update({'response': response}, synchronize_session=False)
+
+    def get_frequent_questions(self, user_id: Optional[int] = None, limit: int = 5) -> List[Dict]:
+        """Get the most frequently asked questions for a user or globally."""
+        try:
+            scope = user_id or GLOBAL_QUESTION_SCOPE
+            # Served by ix_question_frequencies_user_count; id is the rowid, so the tie-break needs no sort
+            rows = (
+                QuestionFrequency.query
+                .filter_by(user_id=scope)
+                .order_by(QuestionFrequency.count.desc(), QuestionFrequency.id.desc())
+                .limit(limit)
+                .all()
+            )
+            if not rows:
+                logger.debug("No frequent questions found, returning default questions")
+                return [dict(q) for q in DEFAULT_FREQUENT_QUESTIONS[:limit]]
+
+            return [
                 {
-                    "question": q.question,
-                    "response": q.response or q.question,
-                    "count": ChatHistory.query.filter_by(question=q.question).count()
+                    "question": row.question,
+                    "response": row.response or row.question,
+                    "count": row.count
                 }
-                for q in questions
+                for row in rows
             ]
-        else:
-            # Return default questions if none exist
-            result = [
-                {"question": "What are the termination clauses in the contract?", "response": "What are the termination clauses in the contract?", "count": 0},
-                {"question": "Is the non-compete clause enforceable under Italian law?", "response": "Is the non-compete clause enforceable under Italian law?", "count": 0},
-                {"question": "What are the salary and benefits details?", "response": "What are the salary and benefits details?", "count": 0},
-                {"question": "How many vacation days are provided?", "response": "How many vacation days are provided?", "count": 0},
-                {"question": "What are the overtime policies?", "response": "What are the overtime policies?", "count": 0}
-            ]
-            logger.debug("No frequent questions found, returning default questions")
-        
-        # Update cache
-        self._frequent_questions_cache = result
-        self._cache_timestamp = now
-        logger.debug(f"Cached frequent questions: {result}")
-        return result[:limit]
-    except SQLAlchemyError as e:
-        logger.error(f"Database error fetching frequent questions: {str(e)}")
-        return [
-            {"question": "What are the termination clauses in the contract?", "response": "What are the termination clauses in the contract?", "count": 0},
-            {"question": "Is the non-compete clause enforceable under Italian law?", "response": "Is the non-compete clause enforceable under Italian law?", "count": 0},
-            {"question": "What are the salary and benefits details?", "response": "What are the salary and benefits details?", "count": 0},
-            {"question": "How many vacation days are provided?", "response": "How many vacation days are provided?", "count": 0},
-            {"question": "What are the overtime policies?", "response": "What are the overtime policies?", "count": 0}
-        ]
-    except Exception as e:
-        logger.error(f"Unexpected error fetching frequent questions: {str(e)}")
-        return [
-            {"question": "What are the termination clauses in the contract?", "response": "What are the termination clauses in the contract?", "count": 0},
-            {"question": "Is the non-compete clause enforceable under Italian law?", "response": "Is the non-compete clause enforceable under Italian law?", "count": 0},
-            {"question": "What are the salary and benefits details?", "response": "What are the salary and benefits details?", "count": 0},
-            {"question": "How many vacation days are provided?", "response": "How many vacation days are provided?", "count": 0},
-            {"question": "What are the overtime policies?", "response": "What are the overtime policies?", "count": 0}
-        ]
\ No newline at end of file
+        except SQLAlchemyError as e:
+            logger.error(f"Database error fetching frequent questions: {str(e)}")
+            return [dict(q) for q in DEFAULT_FREQUENT_QUESTIONS[:limit]]
+        except Exception as e:
+            logger.error(f"Unexpected error fetching frequent questions: {str(e)}")
+            return [dict(q) for q in DEFAULT_FREQUENT_QUESTIONS[:limit]]
+
+_shared_analyzer: Optional[QuestionAnalyzerAgent] = None
+
+def get_question_analyzer() -> QuestionAnalyzerAgent:
+    """Process-wide QuestionAnalyzerAgent shared by the chat, shadow and summary stages."""
+    global _shared_analyzer
+    if _shared_analyzer is None:
+        _shared_analyzer = QuestionAnalyzerAgent()
+    return _shared_analyzer
+
+def rebuild_question_frequencies() -> int:
+    """Recompute question_frequencies from chat_history; returns the number of rows written."""
+    counts: Dict[tuple, Dict] = {}
+    rows = db.session.query(
+        ChatHistory.user_id, ChatHistory.question, ChatHistory.response
+    ).order_by(ChatHistory.id).yield_per(1000)
+    for user_id, question, response in rows:
+        normalized = _normalize_question(question)
+        if not normalized:
+            continue
+        question_hash = _question_hash(normalized)
+        for scope in (user_id, GLOBAL_QUESTION_SCOPE):
+            entry = counts.setdefault((scope, question_hash), {
+                "user_id": scope,
+                "question_hash": question_hash,
+                "question": normalized,
+                "response": None,
+                "count": 0
+            })
+            entry["count"] += 1
+            if response:
+                entry["response"] = response
+
+    QuestionFrequency.query.delete()
+    db.session.bulk_insert_mappings(QuestionFrequency, list(counts.values()))
+    db.session.commit()
+    logger.info(f"Rebuilt {len(counts)} question frequency rows")
+    return len(counts)
+
+def _normalize_question(question: str) -> str:
+    return ' '.join((question or '').split())
+
+def _question_hash(normalized_question: str) -> str:
+    return hashlib.sha256(normalized_question.lower().encode('utf-8')).hexdigest()
@@ -2,8 +2,7 @@ import logging
 from typing import Dict, List, Any
 from agents.web_search_agent import WebSearchAgent
 from urllib.parse import urlparse
-import requests
-from fuzzywuzzy import fuzz, process
+from university_index import university_index
 
 logger = logging.getLogger(__name__)
 
@@ -12,40 +11,21 @@ class StudentAgent:
     
     def __init__(self):
         self.web_search_agent = WebSearchAgent()
-        self.university_domains = {
-            "università degli studi di trento": "unitn.it",
-            "universita degli stui di trento": "unitn.it",
-            "university of oxford": "ox.ac.uk",
-            "harvard university": "harvard.edu",
-            # Add more as needed
-        }
+        self.universities = university_index  # bundled dataset, fuzzy name lookup
         self.government_domains = {
             "italy": ["miur.gov.it", "istruzione.it"],
             "united kingdom": ["gov.uk"],
             "united states": ["ed.gov"],
             # Add more country-specific domains
         }
-        self.country_mapping = {}  # Cache for university-country mapping
 
     def get_university_country(self, university: str) -> str:
-        """Fetch the country of the university using Hipolabs API"""
-        try:
-            university_lower = university.lower().strip()
-            if university_lower in self.country_mapping:
-                return self.country_mapping[university_lower]
-
-            response = requests.get(f"http://universities.hipolabs.com/search?name={university}")
-            if response.status_code == 200:
-                data = response.json()
-                if data and len(data) > 0:
-                    country = data[0].get('country', 'unknown').lower()
-                    self.country_mapping[university_lower] = country
-                    return country
+        """Look up the country of the university in the local index"""
+        country = self.universities.country(university)
+        if not country:
             logger.warning(f"No country found for university: {university}")
             return "unknown"
-        except Exception as e:
-            logger.error(f"Error fetching university country: {str(e)}")
-            return "unknown"
+        return country.lower()
 
     def search_university_info(
         self, 
@@ -59,7 +39,7 @@ class StudentAgent:
         """
         try:
             # Get university domain
-            domain = self._get_university_domain(university)
+            domain = self._get_university_domain(university, country)
             if not domain:
                 logger.warning(f"Could not determine domain for university: {university}")
                 # Proceed with broader search if domain not found
@@ -156,30 +136,14 @@ class StudentAgent:
                 'results': []
             }
 
-    def _get_university_domain(self, university: str) -> str:
+    def _get_university_domain(self, university: str, country: str = "unknown") -> str:
         """Determine the domain for the given university"""
         university_lower = university.lower().strip()
-        # Fuzzy matching for university names
-        best_match, score = process.extractOne(
-            university_lower, self.university_domains.keys(), scorer=fuzz.token_sort_ratio
-        )
-        if score > 80:  # Threshold for fuzzy match
-            return self.university_domains[best_match]
-
-        # Try Hipolabs API
-        try:
-            response = requests.get(f"http://universities.hipolabs.com/search?name={university}")
-            if response.status_code == 200:
-                data = response.json()
-                if data and len(data) > 0:
-                    domains = data[0].get('domains', [])
-                    if domains:
-                        return domains[0]
-        except Exception as e:
-            logger.warning(f"Failed to fetch domain from API for {university}: {str(e)}")
+        domain = self.universities.domain(university)
+        if domain:
+            return domain
 
         # Fallback: guess domain based on country
-        country = self.get_university_country(university)
         tld = {
             'italy': '.it',
             'united kingdom': '.ac.uk',
@@ -6,8 +6,11 @@ import logging
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
 from typing import Optional, Dict
-from datetime import datetime
-from agents.question_analyzer_agent import QuestionAnalyzerAgent
+from agents.question_analyzer_agent import get_question_analyzer
+from sqlalchemy.exc import SQLAlchemyError
+from models import db
+from contracts import store_contract
+import analysis_store
 from time import sleep
 
 logger = logging.getLogger(__name__)
@@ -53,10 +56,7 @@ class SummaryAgent:
         if not self.api_key:
             raise ValueError("OPENROUTER_API_KEY not found in .env file")
         self.api_url = "https://openrouter.ai/api/v1/chat/completions"
-        self.question_analyzer = QuestionAnalyzerAgent()
-        self.output_dir = "contract_analyses"
-        if not os.path.exists(self.output_dir):
-            os.makedirs(self.output_dir)
+        self.question_analyzer = get_question_analyzer()
 
     def analyze(self, contract_text: str, user_id: int, language: str = 'en') -> Dict:
         """Analyze the contract and return structured results."""
@@ -187,7 +187,7 @@ class SummaryAgent:
                 )
 
                 # Save analysis
-                self.save_analysis(analysis_result, contract_name="analysis")
+                self.save_analysis(analysis_result, user_id, contract_text, language)
                 return analysis_result.dict()
 
             except (requests.RequestException, ValueError) as e:
@@ -217,21 +217,18 @@ class SummaryAgent:
                     structured_analysis=default_analysis,
                     summary=default_summary
                 )
-                self.save_analysis(analysis_result, contract_name="analysis_fallback")
                 return analysis_result.dict()
 
-    def save_analysis(self, analysis_result: ContractAnalysisResult, contract_name: str):
-        """Save the analysis to a JSON file."""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_name = ''.join(c for c in contract_name if c.isalnum() or c in ('_', '-'))
-        filename = f"analysis_{safe_name}_{timestamp}.json"
-        filepath = os.path.join(self.output_dir, filename)
-
-        analysis_data = analysis_result.dict()
+    def save_analysis(self, analysis_result: ContractAnalysisResult, user_id: int, contract_text: str, language: str = 'en') -> Optional[str]:
+        """Save the analysis to the user's analysis history."""
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(analysis_data, f, indent=2, ensure_ascii=False)
-            logger.info(f"Analysis saved to: {filepath}")
-        except Exception as e:
-            logger.error(f"Failed to save analysis to {filepath}: {str(e)}")
-            raise
\ No newline at end of file
+            contract_id = store_contract(contract_text)
+            analysis_id = analysis_store.save_analysis(
+                user_id, contract_id, analysis_result.dict(), stage='summary', language=language
+            )
+            logger.info(f"Analysis saved as: {analysis_id}")
+            return analysis_id
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Failed to save analysis for user_id {user_id}: {str(e)}")
+            return None
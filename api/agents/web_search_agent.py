@@ -1,14 +1,14 @@
 import os
 from dotenv import load_dotenv
 import logging
-import requests
-from bs4 import BeautifulSoup
 from typing import Dict, List, Any
 from dataclasses import dataclass
 from urllib.parse import quote_plus
 import json
 import re
-import pdfplumber
+from page_fetcher import CONNECT_TIMEOUT, html_text, is_pdf, page_fetcher, pdf_text
+from search_cache import page_cache, search_cache, search_cache_key
+from search_ranking import key_sentences, rank_pages
 
 logger = logging.getLogger(__name__)
 
@@ -32,9 +32,10 @@ class WebSearchAgent:
         if not self.serp_api_key:
             raise ValueError("SERPAPI_KEY not found in environment variables")
         
-        self.cache_dir = "search_cache"
-        if not os.path.exists(self.cache_dir):
-            os.makedirs(self.cache_dir)
+        self.cache = search_cache
+        self.page_cache = page_cache
+        self.fetcher = page_fetcher
+        self.session = page_fetcher.session
 
     def focused_search(
         self, 
@@ -48,18 +49,17 @@ class WebSearchAgent:
         """
         try:
             # Check cache
-            cache_key = f"{query}_{'_'.join(keywords)}".replace(' ', '_')
-            cache_path = os.path.join(self.cache_dir, f"{cache_key}.json")
-            if os.path.exists(cache_path):
-                with open(cache_path, 'r') as f:
-                    logger.debug(f"Returning cached results for query: {query}")
-                    return json.load(f)
+            cache_key = search_cache_key(query, keywords, min_matches, max_results)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.debug(f"Returning cached results for query: {query}")
+                return {**cached, 'query': query, 'keywords': keywords}
 
             search_results = self._perform_search(query, max_results * 2)
             if search_results['status'] != 'success':
                 return search_results
             
-            filtered_results = []
+            candidates = []
             for result in search_results['raw_results']:
                 if not isinstance(result, dict):
                     logger.warning(f"Skipping invalid search result: {result}")
@@ -70,18 +70,24 @@ class WebSearchAgent:
                 if not url or not title:
                     logger.warning(f"Skipping result missing url or title: {result}")
                     continue
-                
-                content = self._fetch_page_content(url)
+                candidates.append((url, title))
+
+            # Fetch all pages at once; pages slower than the budget are dropped
+            contents = self.fetcher.fetch_all([url for url, _ in candidates], self._fetch_page_content)
+
+            fetched = []
+            for url, title in candidates:
+                content = contents.get(url)
                 if not content:
                     logger.debug(f"No content fetched for URL: {url}")
                     continue
-                
-                score, matched_kw = self._calculate_relevance(
-                    content=content,
-                    title=title,
-                    keywords=keywords
-                )
-                
+                fetched.append((url, title, content))
+
+            # Score the whole result set at once (BM25 over a term-frequency matrix)
+            rankings = rank_pages([(title, content) for _, title, content in fetched], keywords)
+
+            filtered_results = []
+            for (url, title, content), (score, matched_kw) in zip(fetched, rankings):
                 if len(matched_kw) >= min_matches:
                     content_summary, key_points = self._summarize_content(content, matched_kw)
                     filtered_results.append(SearchResult(
@@ -116,8 +122,7 @@ class WebSearchAgent:
                 }
             
             # Cache results
-            with open(cache_path, 'w') as f:
-                json.dump(result, f)
+            self.cache.put(cache_key, result)
             
             return result
 
@@ -134,8 +139,9 @@ class WebSearchAgent:
     def _perform_search(self, query: str, num_results: int) -> Dict[str, Any]:
         """Perform the initial web search"""
         try:
-            response = requests.get(
+            response = self.session.get(
                 "https://serpapi.com/search",
+                timeout=(CONNECT_TIMEOUT, 20),
                 params={
                     "api_key": self.serp_api_key,
                     "q": quote_plus(query),
@@ -172,83 +178,42 @@ class WebSearchAgent:
             }
 
     def _fetch_page_content(self, url: str) -> str:
-        """Fetch and parse webpage content, including PDFs"""
+        """Fetch and parse webpage content, including PDFs, revalidating cached pages"""
         try:
-            if url.lower().endswith('.pdf'):
-                response = requests.get(url, timeout=15)
+            cached = self.page_cache.lookup(url)
+            if cached is not None and self.page_cache.is_fresh(cached):
+                self.page_cache.count('fresh')
+                return cached['text']
+
+            with self.session.get(
+                url,
+                timeout=self.fetcher.timeout,
+                headers=self.page_cache.conditional_headers(cached),
+                stream=True
+            ) as response:
+                if response.status_code == 304 and cached is not None:
+                    self.page_cache.count('not_modified')
+                    self.page_cache.revalidated(url, cached)
+                    return cached['text']
                 if response.status_code != 200:
-                    logger.warning(f"Failed to fetch PDF {url}: HTTP {response.status_code}")
+                    logger.warning(f"Failed to fetch URL {url}: HTTP {response.status_code}")
                     return ""
-                with open('temp.pdf', 'wb') as f:
-                    f.write(response.content)
-                with pdfplumber.open('temp.pdf') as pdf:
-                    content = " ".join(page.extract_text() or "" for page in pdf.pages)
-                os.remove('temp.pdf')
-                return content.strip()
-
-            response = requests.get(
-                url,
-                timeout=15,
-                headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-            )
-            if response.status_code != 200:
-                logger.warning(f"Failed to fetch URL {url}: HTTP {response.status_code}")
-                return ""
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            for element in soup(['script', 'style', 'nav', 'footer', 'header']):
-                element.decompose()
-            
-            return soup.get_text(separator=' ', strip=True)
+                if cached is not None:
+                    self.page_cache.count('modified')
+
+                # Streamed and size-capped; PDFs are parsed from memory
+                content = pdf_text(response) if is_pdf(url, response) else html_text(response)
+                self.page_cache.count('bytes_downloaded', response.raw.tell())
+            if content:
+                self.page_cache.save(url, content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            return content
 
         except Exception as e:
             logger.warning(f"Failed to fetch content from {url}: {e}")
             return ""
 
-    def _calculate_relevance(
-        self, 
-        content: str, 
-        title: str, 
-        keywords: List[str]
-    ) -> tuple[float, List[str]]:
-        """Calculate relevance score and find matched keywords"""
-        content_lower = content.lower()
-        title_lower = title.lower()
-        matched_keywords = []
-        score = 0.0
-        
-        for keyword in keywords:
-            keyword_lower = keyword.lower()
-            if keyword_lower in title_lower:
-                score += 2.0
-                matched_keywords.append(keyword)
-            if keyword_lower in content_lower:
-                score += 1.0
-                if keyword not in matched_keywords:
-                    matched_keywords.append(keyword)
-            if keyword_lower in ['regulation', 'regulations', 'regolamenti', 'policy', 'policies']:
-                score += 1.5
-        
-        # Boost for policy-related terms in content
-        policy_terms = ['policy', 'policies', 'regulation', 'regulations', 'guidelines', 'rules', 'regolamenti']
-        for term in policy_terms:
-            if term in content_lower:
-                score += 0.5
-        
-        return score, matched_keywords
-
     def _summarize_content(self, content: str, keywords: List[str]) -> tuple[str, List[str]]:
         """Generate a summary and key points from content"""
-        content_lower = content.lower()
-        sentences = content.split('. ')
-        relevant_sentences = []
-        key_points = []
-        
-        for sentence in sentences:
-            if any(keyword.lower() in sentence.lower() for keyword in keywords):
-                relevant_sentences.append(sentence.strip())
-                if len(key_points) < 3:  # Limit to 3 key points
-                    key_points.append(sentence.strip())
-        
-        summary = " ".join(relevant_sentences[:3]) or content[:200]
-        return summary, key_points
\ No newline at end of file
+        key_points = key_sentences(content, keywords, limit=3)
+        summary = " ".join(key_points) or content[:200]
+        return summary, key_points
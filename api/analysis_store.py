@@ -0,0 +1,61 @@
+# api/analysis_store.py
+import json
+import logging
+import uuid
+import zlib
+from typing import Any, Dict, Optional
+from models import db, AnalysisRecord
+
+logger = logging.getLogger(__name__)
+
+def save_analysis(user_id: int, contract_id: str, payload: Dict[str, Any],
+                  stage: str = 'combined', language: str = 'en') -> str:
+    """Persist an analysis result and return its id (commits)."""
+    analysis_id = str(uuid.uuid4())
+    db.session.add(AnalysisRecord(
+        id=analysis_id,
+        user_id=user_id,
+        contract_id=contract_id,
+        stage=stage,
+        language=language,
+        payload=zlib.compress(json.dumps(payload, ensure_ascii=False).encode('utf-8'), 6)
+    ))
+    db.session.commit()
+    logger.debug(f"Saved {stage} analysis {analysis_id} for user_id {user_id}")
+    return analysis_id
+
+def load_analysis_record(analysis_id: Optional[str], user_id: Optional[int] = None) -> Optional[AnalysisRecord]:
+    """Load an analysis row by id; None if missing or owned by another user."""
+    if not analysis_id:
+        return None
+    record = AnalysisRecord.query.get(analysis_id)
+    if record is None or (user_id is not None and record.user_id != user_id):
+        return None
+    return record
+
+def decode_payload(record: AnalysisRecord) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(record.payload).decode('utf-8'))
+
+def load_analysis(analysis_id: Optional[str], user_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Load an analysis payload by id; None if missing or owned by another user."""
+    record = load_analysis_record(analysis_id, user_id)
+    return decode_payload(record) if record is not None else None
+
+def list_analyses(user_id: int, page: int = 1, per_page: int = 20,
+                  stage: Optional[str] = None, contract_id: Optional[str] = None) -> Dict[str, Any]:
+    """Newest-first page of a user's analyses, without payloads."""
+    query = AnalysisRecord.query.filter_by(user_id=user_id)
+    if contract_id:
+        query = query.filter_by(contract_id=contract_id)
+    if stage:
+        query = query.filter_by(stage=stage)
+    pagination = query.order_by(AnalysisRecord.created_at.desc()).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+    return {
+        'items': [record.to_summary() for record in pagination.items],
+        'page': pagination.page,
+        'per_page': pagination.per_page,
+        'total': pagination.total,
+        'pages': pagination.pages
+    }
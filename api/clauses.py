@@ -0,0 +1,271 @@
+# api/clauses.py
+import re
+import logging
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import fitz  # PyMuPDF
+from pdf_engine import PARALLEL_MIN_PAGES, MAX_WORKERS, PageText, page_ranges, submit
+
+logger = logging.getLogger(__name__)
+
+MAX_HEADING_CHARS = 120
+STYLED_SIZE_RATIO = 1.15  # spans this much larger than body text count as headings
+
+# "Art. 5", "Articolo 5", "Article 12", "Section 3.2", "Clausola 4", "§ 7", "ARTICLE IV"; only the keyword
+# ignores case, so the Roman branch does not match words such as "civile"
+ARTICLE_PATTERN = re.compile(
+    r'^(?:(?i:art(?:icolo|icle|\.)?|section|sezione|clause|clausola)|§)\s*(\d{1,3}(?:\.\d{1,3})*[a-zA-Z]?|[IVXLC]+)\b'
+)
+ARTICLE_SEPARATOR = re.compile(r'^(?:-|–|—|:)')  # "Art. 5 - Ferie", "Articolo 5: Oggetto"
+SENTENCE_END = ('.', ';', ',')
+DOTTED_PATTERN = re.compile(r'^(\d{1,3}(?:\.\d{1,3})+)\.?\s+(?=[A-ZÀ-Ý])')  # "5.1 Ferie", "2.3.1 The ..."
+NUMBER_PATTERN = re.compile(r'^(\d{1,3})[.)]?\s+(?=[A-ZÀ-Ý])')  # "5. Ferie", "5) Ferie"; not "1. a non ..."
+NUMBER_ONLY_PATTERN = re.compile(r'^(\d{1,3})\.?$')  # number on its own line, title below
+ARTICLE_ONLY_PATTERN = re.compile(r'^(?:art(?:icolo|icle|\.)?|section|sezione|clause|clausola|§)$', re.IGNORECASE)  # "Art." / "5 - Title"
+
+class Line(NamedTuple):
+    text: str
+    start: int  # offset in the joined document text
+    styled: Optional[bool]  # bold or enlarged; None when there is no font data (OCR, plain text)
+    heading_prefix: str  # leading styled spans, e.g. "Art. 1 - Oggetto" of "Art. 1 - Oggetto Il Datore ..."
+    page: int
+
+def _page_layout(path: str, start: int, stop: int) -> List[Tuple[int, List[Tuple[str, List[Tuple[str, float, bool]]]]]]:
+    """Runs in a pool worker: lines of each page as (text, [(span text, size, bold)])"""
+    pages = []
+    with fitz.open(path) as doc:
+        for number in range(start, stop):
+            lines = []
+            for block in doc[number].get_text('dict')['blocks']:
+                for line in block.get('lines', []):
+                    spans = [(span['text'], span['size'], bool(span['flags'] & 16)) for span in line['spans']]
+                    lines.append((''.join(text for text, _, _ in spans), spans))
+            pages.append((number, lines))
+    return pages
+
+def _layouts(path: str, numbers: Sequence[int]) -> Dict[int, list]:
+    if not numbers:
+        return {}
+    page_count = max(numbers) + 1
+    if MAX_WORKERS <= 1 or page_count < PARALLEL_MIN_PAGES:
+        layouts = _page_layout(path, 0, page_count)
+    else:
+        futures = [submit(_page_layout, path, start, stop) for start, stop in page_ranges(page_count, MAX_WORKERS)]
+        layouts = [page for future in futures for page in future.result()]
+    wanted = set(numbers)
+    return {number: lines for number, lines in layouts if number in wanted}
+
+def _body_size(layouts: Dict[int, list]) -> float:
+    sizes = Counter()
+    for lines in layouts.values():
+        for _, spans in lines:
+            for text, size, _ in spans:
+                sizes[round(size * 2) / 2] += len(text.strip())
+    return sizes.most_common(1)[0][0] if sizes else 0.0
+
+def pdf_lines(path: str, pages: List[PageText]) -> List[Line]:
+    """Lines of a PDF with font styling, located in the joined text.
+
+    Pages without a text layer (OCR'd or vision-extracted) fall back to
+    plain lines. Each line is found by searching forward from the previous
+    one on its page, so offsets always point into the joined text.
+    """
+    layouts = _layouts(path, [page.number for page in pages if not page.scanned])
+    body = _body_size(layouts)
+    result = []
+    for page in pages:
+        if page.number not in layouts:
+            result.extend(text_lines(page.text, page.start, page.number))
+            continue
+        cursor = 0
+        for text, spans in layouts[page.number]:
+            stripped = text.strip()
+            if not stripped:
+                continue
+            found = page.text.find(stripped, cursor)
+            if found < 0:
+                continue
+            cursor = found + len(stripped)
+            styled_flags = [
+                bold or (body and size >= body * STYLED_SIZE_RATIO)
+                for span_text, size, bold in spans if span_text.strip()
+            ]
+            prefix = []
+            for span_text, size, bold in spans:
+                if span_text.strip() and not (bold or (body and size >= body * STYLED_SIZE_RATIO)):
+                    break
+                prefix.append(span_text)
+            result.append(Line(stripped, page.start + found, bool(styled_flags) and all(styled_flags), ''.join(prefix).strip(), page.number))
+    return result
+
+def text_lines(text: str, offset: int = 0, page: int = 0) -> List[Line]:
+    """Lines of plain text (no font data)."""
+    lines = []
+    position = 0
+    for raw in text.split('\n'):
+        stripped = raw.strip()
+        if stripped:
+            lines.append(Line(stripped, offset + position + raw.index(stripped), None, '', page))
+        position += len(raw) + 1
+    return lines
+
+def _article_heading(line: Line, match: re.Match) -> bool:
+    """Whether an ARTICLE_PATTERN match heads a clause rather than starting a wrapped line of prose.
+
+    "...dalla\nsezione 3 del CCNL applicabile." and "clause 4 above shall
+    apply" match the pattern too. A heading is styled, separates its title
+    ("Art. 5 - Ferie"), or has a capitalised keyword followed by nothing or
+    by a title that neither starts lowercase nor ends like a sentence.
+    """
+    if line.styled or (line.heading_prefix and line.heading_prefix.startswith(match.group(0))):
+        return True
+    tail = line.text[match.end():].lstrip('.)').strip()  # "Art. 5." / "Art. 5) Ferie"
+    if ARTICLE_SEPARATOR.match(tail):
+        return True
+    if not (line.text[0].isupper() or line.text[0] == '§'):
+        return False
+    return not tail or (not tail[0].islower() and not tail.endswith(SENTENCE_END))
+
+def _heading(line: Line, following: Optional[Line]) -> Optional[Tuple[Optional[str], str, str, bool]]:
+    """(number, heading text, kind, consumes following line) if the line starts a clause"""
+    text = line.text
+    title = line.heading_prefix or (text if len(text) <= MAX_HEADING_CHARS else text[:MAX_HEADING_CHARS].rsplit(' ', 1)[0])
+
+    match = ARTICLE_PATTERN.match(text)
+    if match and _article_heading(line, match):
+        return match.group(1), title, 'article', False
+    if ARTICLE_ONLY_PATTERN.match(text) and following is not None:
+        match = re.match(r'^(\d{1,3}(?:\.\d{1,3})*[a-z]?)\b', following.text)
+        if match:
+            return match.group(1), f"{text} {following.heading_prefix or following.text[:MAX_HEADING_CHARS]}", 'article', True
+    match = DOTTED_PATTERN.match(text)
+    if match:
+        return match.group(1), title, 'dotted', False
+    match = NUMBER_PATTERN.match(text)
+    # Styled: the whole line, or a bold/large run starting with the number ("2. Compensation" + body text)
+    if match and (line.styled or line.heading_prefix.startswith(match.group(1)) or (
+            line.styled is None and len(text) <= MAX_HEADING_CHARS and not text.endswith(('.', ';', ',')))):
+        return match.group(1), title, 'number', False
+    match = NUMBER_ONLY_PATTERN.match(text)
+    if match and following is not None and (
+            following.styled or following.heading_prefix or (
+                following.styled is None and len(following.text) <= MAX_HEADING_CHARS
+                and following.text[:1].isupper() and not following.text.endswith('.'))):
+        following_title = following.heading_prefix or following.text[:MAX_HEADING_CHARS]
+        return match.group(1), f"{text} {following_title}", 'number', True
+    if line.styled and 3 <= len(text) <= MAX_HEADING_CHARS and not NUMBER_ONLY_PATTERN.match(text) and not text.endswith(':'):
+        return None, text, 'styled', False
+    return None
+
+def _page_furniture(lines: List[Line]) -> set:
+    """Indexes of running headers/footers and page numbers.
+
+    Styled lines repeated on several pages, and a bare page number as the
+    first or last line of its page, are layout rather than clauses.
+    """
+    pages: Dict[int, List[int]] = {}
+    for index, line in enumerate(lines):
+        pages.setdefault(line.page, []).append(index)
+    repeated = Counter(line.text for line in lines if line.styled)
+    skip = {index for index, line in enumerate(lines) if line.styled and repeated[line.text] > 1 and len(pages) > 1}
+    for page, indexes in pages.items():
+        for index in (indexes[0], indexes[-1]):
+            match = NUMBER_ONLY_PATTERN.match(lines[index].text)
+            if match and int(match.group(1)) == page + 1:
+                skip.add(index)
+    return skip
+
+def segment(lines: List[Line], text_length: int) -> List[Dict]:
+    """Build the clause tree from located lines.
+
+    Nodes are {number, heading, level, start, end, children}; end is the
+    start of the next clause at the same or a shallower level. Article
+    headings are level 1, "5.1"-style numbers take their depth, plain
+    numbers are level 1 (level 2 inside articles), and unnumbered styled
+    headings are level 1. Consecutive styled lines form one heading.
+    """
+    skip = _page_furniture(lines)
+    found = []
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        index += 1
+        if index - 1 in skip:
+            continue
+        following = lines[index] if index < len(lines) and index not in skip else None
+        # Headings never continue onto the next page
+        if following is not None and following.page != line.page:
+            following = None
+        heading = _heading(line, following)
+        if heading is None:
+            continue
+        number, title, kind, consumes = heading
+        if consumes:
+            index += 1
+        elif kind == 'styled':
+            # A title wrapped over several styled lines
+            while index < len(lines) and index not in skip and lines[index].styled and lines[index].page == line.page \
+                    and _heading(lines[index], None) is not None and _heading(lines[index], None)[2] == 'styled':
+                title = f"{title} {lines[index].text}"
+                index += 1
+            title = title[:MAX_HEADING_CHARS]
+        found.append((line.start, number, title, kind))
+
+    has_articles = any(kind == 'article' for _, _, _, kind in found)
+    nodes = []
+    for start, number, title, kind in found:
+        if kind == 'dotted':
+            level = number.count('.') + 1
+        elif kind == 'number':
+            level = 2 if has_articles else 1
+        elif kind == 'article':
+            level = 1 + (number.count('.') if number else 0)
+        else:
+            level = 1
+        nodes.append({'number': number, 'heading': title, 'level': level, 'start': start, 'end': text_length, 'children': []})
+
+    roots: List[Dict] = []
+    stack: List[Dict] = []
+    for node in nodes:
+        while stack and stack[-1]['level'] >= node['level']:
+            stack.pop()['end'] = node['start']
+        (stack[-1]['children'] if stack else roots).append(node)
+        stack.append(node)
+    return roots
+
+def segment_pdf(path: str, pages: List[PageText]) -> List[Dict]:
+    text_length = pages[-1].end if pages else 0
+    return segment(pdf_lines(path, pages), text_length)
+
+def segment_text(text: str) -> List[Dict]:
+    return segment(text_lines(text), len(text))
+
+def with_text(clauses: List[Dict], text: str) -> List[Dict]:
+    """Copy of a stored tree with each clause's text filled in from the document."""
+    return [
+        {**clause, 'text': text[clause['start']:clause['end']], 'children': with_text(clause['children'], text)}
+        for clause in clauses
+    ]
+
+def flatten(clauses: List[Dict]) -> List[Dict]:
+    """All clauses in document order."""
+    result = []
+    for clause in clauses:
+        result.append(clause)
+        result.extend(flatten(clause['children']))
+    return result
+
+def select_clauses(clauses: List[Dict], text: str, keywords: Sequence[str]) -> str:
+    """Text of the top-level clauses whose heading or body mentions any keyword.
+
+    Lets a later stage send the relevant clauses instead of the whole
+    contract; returns '' if nothing matches.
+    """
+    lowered = [keyword.lower() for keyword in keywords if keyword]
+    parts = []
+    for clause in clauses:
+        body = text[clause['start']:clause['end']]
+        haystack = body.lower()
+        if any(keyword in haystack for keyword in lowered):
+            parts.append(body.strip())
+    return '\n\n'.join(parts)
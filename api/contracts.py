@@ -0,0 +1,46 @@
+# api/contracts.py
+import hashlib
+import logging
+import unicodedata
+import zlib
+from functools import lru_cache
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, Contract
+
+logger = logging.getLogger(__name__)
+
+def normalize_contract_text(text: str) -> str:
+    """Canonical form used for hashing and storage: NFC, \\n line endings, no trailing spaces."""
+    text = unicodedata.normalize('NFC', text or '')
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return '\n'.join(line.rstrip() for line in text.split('\n')).strip()
+
+def contract_id_for(text: str) -> str:
+    return hashlib.sha256(normalize_contract_text(text).encode('utf-8')).hexdigest()
+
+def store_contract(text: str) -> str:
+    """Store the contract once (compressed) and return its content-addressed id.
+
+    Adds to the current transaction; the caller commits.
+    """
+    normalized = normalize_contract_text(text)
+    contract_id = hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+    if db.session.query(Contract.id).filter_by(id=contract_id).first():
+        return contract_id
+    db.session.execute(
+        sqlite_insert(Contract).values(
+            id=contract_id,
+            compressed_text=zlib.compress(normalized.encode('utf-8'), 6),
+            size=len(normalized)
+        ).on_conflict_do_nothing(index_elements=['id'])
+    )
+    logger.debug(f"Stored contract {contract_id[:12]} ({len(normalized)} chars)")
+    return contract_id
+
+@lru_cache(maxsize=32)
+def load_contract_text(contract_id: str) -> str:
+    """Decompressed text by id; contents are immutable, so caching is safe."""
+    compressed = db.session.query(Contract.compressed_text).filter_by(id=contract_id).scalar()
+    if compressed is None:
+        raise KeyError(f"Unknown contract: {contract_id}")
+    return zlib.decompress(compressed).decode('utf-8')
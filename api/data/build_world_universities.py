@@ -0,0 +1,112 @@
+"""Regenerates world_universities.json.gz, the dataset behind university_index.
+
+Source: the domain list of the swot package (MIT licensed,
+https://pypi.org/project/swot/1.0.1/), one file per institution at
+lib/domains/<tld>/.../<name>.txt containing its name. The country comes from
+the country-code TLD; generic TLDs other than .edu/.mil carry none.
+
+    pip download swot==1.0.1 --no-deps -d /tmp/swot
+    python api/data/build_world_universities.py /tmp/swot/swot-1.0.1-py3-none-any.whl
+"""
+import os
+import sys
+import gzip
+import json
+import zipfile
+
+OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'world_universities.json.gz')
+DOMAINS_DIR = '/swot_lib/lib/domains/'
+
+# (country, alpha_two_code) by top-level domain, in the dataset's spelling
+COUNTRIES = {
+    'ad': ('Andorra', 'AD'), 'ae': ('United Arab Emirates', 'AE'), 'af': ('Afghanistan', 'AF'),
+    'ag': ('Antigua and Barbuda', 'AG'), 'al': ('Albania', 'AL'), 'am': ('Armenia', 'AM'),
+    'an': ('Netherlands Antilles', 'AN'), 'ao': ('Angola', 'AO'), 'ar': ('Argentina', 'AR'),
+    'at': ('Austria', 'AT'), 'au': ('Australia', 'AU'), 'az': ('Azerbaijan', 'AZ'),
+    'ba': ('Bosnia and Herzegovina', 'BA'), 'bb': ('Barbados', 'BB'), 'bd': ('Bangladesh', 'BD'),
+    'be': ('Belgium', 'BE'), 'bf': ('Burkina Faso', 'BF'), 'bg': ('Bulgaria', 'BG'),
+    'bh': ('Bahrain', 'BH'), 'bi': ('Burundi', 'BI'), 'bj': ('Benin', 'BJ'), 'bm': ('Bermuda', 'BM'),
+    'bn': ('Brunei Darussalam', 'BN'), 'bo': ('Bolivia', 'BO'), 'br': ('Brazil', 'BR'),
+    'bs': ('Bahamas', 'BS'), 'bt': ('Bhutan', 'BT'), 'bw': ('Botswana', 'BW'), 'by': ('Belarus', 'BY'),
+    'bz': ('Belize', 'BZ'), 'ca': ('Canada', 'CA'), 'cat': ('Spain', 'ES'),
+    'cd': ('Congo, the Democratic Republic of the', 'CD'), 'ch': ('Switzerland', 'CH'),
+    'ci': ("Cote d'Ivoire", 'CI'), 'cl': ('Chile', 'CL'), 'cm': ('Cameroon', 'CM'), 'cn': ('China', 'CN'),
+    'co': ('Colombia', 'CO'), 'cr': ('Costa Rica', 'CR'), 'cu': ('Cuba', 'CU'), 'cy': ('Cyprus', 'CY'),
+    'cz': ('Czech Republic', 'CZ'), 'de': ('Germany', 'DE'), 'dk': ('Denmark', 'DK'),
+    'do': ('Dominican Republic', 'DO'), 'dz': ('Algeria', 'DZ'), 'ec': ('Ecuador', 'EC'),
+    'edu': ('United States', 'US'), 'ee': ('Estonia', 'EE'), 'eg': ('Egypt', 'EG'), 'es': ('Spain', 'ES'),
+    'et': ('Ethiopia', 'ET'), 'fi': ('Finland', 'FI'), 'fj': ('Fiji', 'FJ'), 'fo': ('Faroe Islands', 'FO'),
+    'fr': ('France', 'FR'), 'ga': ('Gabon', 'GA'), 'ge': ('Georgia', 'GE'), 'gh': ('Ghana', 'GH'),
+    'gl': ('Greenland', 'GL'), 'gr': ('Greece', 'GR'), 'gt': ('Guatemala', 'GT'), 'hk': ('Hong Kong', 'HK'),
+    'hn': ('Honduras', 'HN'), 'hr': ('Croatia', 'HR'), 'ht': ('Haiti', 'HT'), 'hu': ('Hungary', 'HU'),
+    'id': ('Indonesia', 'ID'), 'ie': ('Ireland', 'IE'), 'il': ('Israel', 'IL'), 'in': ('India', 'IN'),
+    'iq': ('Iraq', 'IQ'), 'ir': ('Iran', 'IR'), 'is': ('Iceland', 'IS'), 'it': ('Italy', 'IT'),
+    'jm': ('Jamaica', 'JM'), 'jo': ('Jordan', 'JO'), 'jp': ('Japan', 'JP'), 'ke': ('Kenya', 'KE'),
+    'kg': ('Kyrgyzstan', 'KG'), 'kh': ('Cambodia', 'KH'), 'kn': ('Saint Kitts and Nevis', 'KN'),
+    'kr': ('South Korea', 'KR'), 'kw': ('Kuwait', 'KW'), 'ky': ('Cayman Islands', 'KY'),
+    'kz': ('Kazakhstan', 'KZ'), 'la': ('Lao People\'s Democratic Republic', 'LA'), 'lb': ('Lebanon', 'LB'),
+    'li': ('Liechtenstein', 'LI'), 'lk': ('Sri Lanka', 'LK'), 'lt': ('Lithuania', 'LT'),
+    'lu': ('Luxembourg', 'LU'), 'lv': ('Latvia', 'LV'), 'ly': ('Libya', 'LY'), 'ma': ('Morocco', 'MA'),
+    'md': ('Moldova', 'MD'), 'mg': ('Madagascar', 'MG'), 'mil': ('United States', 'US'),
+    'mk': ('North Macedonia', 'MK'), 'mm': ('Myanmar', 'MM'), 'mn': ('Mongolia', 'MN'), 'mo': ('Macao', 'MO'),
+    'mr': ('Mauritania', 'MR'), 'mt': ('Malta', 'MT'), 'mu': ('Mauritius', 'MU'), 'mw': ('Malawi', 'MW'),
+    'mx': ('Mexico', 'MX'), 'my': ('Malaysia', 'MY'), 'mz': ('Mozambique', 'MZ'), 'na': ('Namibia', 'NA'),
+    'ne': ('Niger', 'NE'), 'ng': ('Nigeria', 'NG'), 'ni': ('Nicaragua', 'NI'), 'nl': ('Netherlands', 'NL'),
+    'no': ('Norway', 'NO'), 'np': ('Nepal', 'NP'), 'nz': ('New Zealand', 'NZ'), 'om': ('Oman', 'OM'),
+    'pa': ('Panama', 'PA'), 'pe': ('Peru', 'PE'), 'pf': ('French Polynesia', 'PF'),
+    'pg': ('Papua New Guinea', 'PG'), 'ph': ('Philippines', 'PH'), 'pk': ('Pakistan', 'PK'),
+    'pl': ('Poland', 'PL'), 'pr': ('Puerto Rico', 'PR'), 'ps': ('Palestine', 'PS'), 'pt': ('Portugal', 'PT'),
+    'py': ('Paraguay', 'PY'), 'qa': ('Qatar', 'QA'), 'ro': ('Romania', 'RO'), 'rs': ('Serbia', 'RS'),
+    'ru': ('Russian Federation', 'RU'), 'rw': ('Rwanda', 'RW'), 'sa': ('Saudi Arabia', 'SA'),
+    'sd': ('Sudan', 'SD'), 'se': ('Sweden', 'SE'), 'sg': ('Singapore', 'SG'), 'si': ('Slovenia', 'SI'),
+    'sk': ('Slovakia', 'SK'), 'sm': ('San Marino', 'SM'), 'sn': ('Senegal', 'SN'),
+    'su': ('Russian Federation', 'RU'), 'sv': ('El Salvador', 'SV'), 'sy': ('Syria', 'SY'),
+    'sz': ('Eswatini', 'SZ'), 'tg': ('Togo', 'TG'), 'th': ('Thailand', 'TH'), 'tj': ('Tajikistan', 'TJ'),
+    'tm': ('Turkmenistan', 'TM'), 'tn': ('Tunisia', 'TN'), 'tr': ('Turkey', 'TR'),
+    'tt': ('Trinidad and Tobago', 'TT'), 'tw': ('Taiwan', 'TW'), 'tz': ('Tanzania', 'TZ'),
+    'ua': ('Ukraine', 'UA'), 'ug': ('Uganda', 'UG'), 'uk': ('United Kingdom', 'GB'),
+    'us': ('United States', 'US'), 'uy': ('Uruguay', 'UY'), 'uz': ('Uzbekistan', 'UZ'),
+    've': ('Venezuela', 'VE'), 'vn': ('Vietnam', 'VN'), 'ws': ('Samoa', 'WS'), 'ye': ('Yemen', 'YE'),
+    'yu': ('Serbia', 'RS'), 'za': ('South Africa', 'ZA'), 'zm': ('Zambia', 'ZM'), 'zw': ('Zimbabwe', 'ZW'),
+}
+
+# Names users type that the source spells differently
+EXTRA_ENTRIES = [
+    {'name': 'Università degli Studi di Trento', 'country': 'Italy', 'alpha_two_code': 'IT', 'domains': ['unitn.it']},
+    {'name': 'Politecnico di Milano', 'country': 'Italy', 'alpha_two_code': 'IT', 'domains': ['polimi.it']},
+    {'name': 'ETH Zurich', 'country': 'Switzerland', 'alpha_two_code': 'CH', 'domains': ['ethz.ch']},
+    {'name': 'LUISS Guido Carli', 'country': 'Italy', 'alpha_two_code': 'IT', 'domains': ['luiss.it']},
+]
+
+def read_swot(wheel_path: str):
+    entries = {}
+    with zipfile.ZipFile(wheel_path) as wheel:
+        for member in wheel.namelist():
+            if DOMAINS_DIR not in member or not member.endswith('.txt'):
+                continue
+            labels = member.split(DOMAINS_DIR, 1)[1][:-len('.txt')].split('/')
+            domain = '.'.join(reversed(labels))
+            country, code = COUNTRIES.get(labels[0], (None, None))
+            for name in wheel.read(member).decode('utf-8').splitlines():
+                name = ' '.join(name.split())
+                if not name:
+                    continue
+                entry = entries.setdefault((name, country), {
+                    'name': name, 'country': country, 'alpha_two_code': code, 'domains': []
+                })
+                entry['domains'].append(domain)
+    for entry in entries.values():
+        entry['domains'].sort(key=lambda d: (len(d), d))
+    return sorted(entries.values(), key=lambda e: (e['country'] or '', e['name']))
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit(__doc__)
+    entries = read_swot(sys.argv[1]) + EXTRA_ENTRIES
+    # Fixed mtime so an unchanged source rebuilds byte for byte
+    with gzip.GzipFile(OUTPUT, 'wb', mtime=0) as out:
+        out.write(json.dumps(entries, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    print(f"{len(entries)} universities written to {OUTPUT}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# api/database.py
+import os
+import queue
+import logging
+import sqlite3
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from models import db
+
+logger = logging.getLogger(__name__)
+
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',  # readers no longer block the writer (and vice versa)
+    'PRAGMA synchronous=NORMAL',  # fsync at checkpoints only; safe with WAL
+    'PRAGMA busy_timeout=5000',  # wait for the write lock instead of failing with "database is locked"
+    'PRAGMA temp_store=MEMORY',
+)
+
+def sqlite_engine_options(busy_timeout: float = 5.0, pool_size: int = 5, max_overflow: int = 10) -> dict:
+    """SQLALCHEMY_ENGINE_OPTIONS for a file-backed SQLite database."""
+    return {
+        'poolclass': QueuePool,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_pre_ping': True,
+        'pool_recycle': 3600,
+        'connect_args': {'timeout': busy_timeout, 'check_same_thread': False}
+    }
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+def configure_database(app) -> None:
+    """Apply SQLite pragmas to every pooled connection and start write-behind."""
+    with app.app_context():
+        event.listen(db.engine, 'connect', _set_sqlite_pragmas)
+    write_behind.init_app(app)
+
+class WriteBehindQueue:
+    """Runs queued DB writes on a background thread, committing them in batches.
+
+    Each op is a callable that adds to db.session without committing. Up to
+    max_batch ops arriving within max_delay seconds share one transaction, so
+    concurrent chat requests no longer serialize on one commit each. If a batch
+    fails, its ops are retried one transaction at a time so a bad op only loses
+    itself. When disabled (or before init_app) ops run and commit inline.
+    """
+
+    def __init__(self, max_batch: int = 100, max_delay: float = 0.05):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.enabled = True
+        self.app = None
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app) -> None:
+        self.app = app
+        self.enabled = app.config.get('DB_WRITE_BEHIND', True)
+        self.max_batch = app.config.get('DB_WRITE_BEHIND_MAX_BATCH', self.max_batch)
+        self.max_delay = app.config.get('DB_WRITE_BEHIND_MAX_DELAY', self.max_delay)
+
+    def submit(self, op: Callable[[], None], on_done: Optional[Callable[[bool], None]] = None) -> None:
+        """Queue op; on_done(committed) is called once its transaction committed or failed."""
+        if not self.enabled or self.app is None:
+            self._execute([(op, on_done)])
+            return
+        self._ensure_worker()
+        self._queue.put((op, on_done))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued op has been committed; False on timeout."""
+        if self._thread is None or self._pid != os.getpid():
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def _ensure_worker(self) -> None:
+        # Started lazily so each forked gunicorn worker gets its own thread
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='db-write-behind', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                with self.app.app_context():
+                    self._execute(batch)
+            except Exception as e:
+                logger.error(f"Write-behind batch of {len(batch)} failed: {str(e)}")
+                self._notify(batch, False)  # callers requeue or report their own ops
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _execute(self, batch: List[Tuple[Callable[[], None], Optional[Callable[[bool], None]]]]) -> None:
+        try:
+            for op, _ in batch:
+                op()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            if len(batch) > 1:
+                logger.warning(f"Write-behind batch failed, retrying {len(batch)} ops individually: {str(e)}")
+                for item in batch:
+                    self._execute([item])
+                return
+            logger.error(f"Write-behind op failed: {str(e)}")
+            self._notify(batch, False)
+            return
+        self._notify(batch, True)
+
+    def _notify(self, batch, committed: bool) -> None:
+        for _, on_done in batch:
+            if on_done:
+                try:
+                    on_done(committed)
+                except Exception as e:
+                    logger.error(f"Write-behind callback failed: {str(e)}")
+
+write_behind = WriteBehindQueue()
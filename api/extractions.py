@@ -0,0 +1,293 @@
+# api/extractions.py
+import os
+import json
+import zlib
+import hashlib
+import logging
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+from models import db, DocumentExtraction, ExtractionBatch, ExtractionBatchItem
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+class SpooledUpload(NamedTuple):
+    path: str
+    filename: str
+    sha256: str
+    size: int
+
+def spool_upload(file: FileStorage, directory: str) -> SpooledUpload:
+    """Stream an upload to a unique temp file, hashing it on the way.
+
+    The temp name keeps the original extension (extractors dispatch on it) but
+    is otherwise random, so concurrent uploads of the same filename never
+    share a path. The caller removes it with discard_upload.
+    """
+    os.makedirs(directory, exist_ok=True)
+    filename = secure_filename(file.filename or '') or 'upload'
+    digest = hashlib.sha256()
+    size = 0
+    handle = tempfile.NamedTemporaryFile(dir=directory, prefix='upload_', suffix=Path(filename).suffix.lower(), delete=False)
+    try:
+        with handle:
+            while True:
+                chunk = file.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                handle.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        _remove(handle.name)
+        raise
+    return SpooledUpload(handle.name, filename, digest.hexdigest(), size)
+
+def discard_upload(upload: SpooledUpload) -> None:
+    _remove(upload.path)
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+@contextmanager
+def spooled_upload(file: FileStorage, directory: str) -> Iterator[SpooledUpload]:
+    """spool_upload for the duration of a with block."""
+    upload = spool_upload(file, directory)
+    try:
+        yield upload
+    finally:
+        discard_upload(upload)
+
+def get_cached_extraction(file_hash: str, lang: str = 'en') -> Optional[Dict]:
+    """Cached text and page offsets for a file hash and language, or None."""
+    record = DocumentExtraction.query.get((file_hash, lang))
+    if record is None:
+        return None
+    return {
+        'text': zlib.decompress(record.compressed_text).decode('utf-8'),
+        'file_type': record.file_type,
+        'pages': json.loads(record.pages),
+        'clauses': json.loads(record.clauses),
+        'incomplete': bool(record.incomplete)
+    }
+
+def unread_pages(result) -> int:
+    """Scanned pages that neither OCR nor the vision model could read."""
+    return sum(1 for page in result.pages if page.scanned and not page.text.strip())
+
+def store_extraction(file_hash: str, lang: str, size: int, result) -> None:
+    """Cache an ExtractionResult under its file hash and language (commits).
+
+    An existing entry is replaced, so a re-extraction of an incomplete
+    result overwrites it.
+    """
+    values = {
+        'file_type': result.file_type,
+        'size': size,
+        'compressed_text': zlib.compress(result.text.encode('utf-8'), 6),
+        'pages': json.dumps([[page.start, page.end, page.scanned] for page in result.pages]),
+        'clauses': json.dumps(result.clauses, ensure_ascii=False),
+        'incomplete': unread_pages(result) > 0
+    }
+    db.session.execute(
+        sqlite_insert(DocumentExtraction).values(file_hash=file_hash, language=lang, **values)
+        .on_conflict_do_update(index_elements=['file_hash', 'language'], set_=values)
+    )
+    db.session.commit()
+
+_inflight: Dict[Tuple[str, str], threading.Event] = {}
+_inflight_lock = threading.Lock()
+
+def extract_cached(extractor, upload: SpooledUpload, lang: str = 'en') -> Tuple[Dict, bool]:
+    """(extraction, cached) for an upload, extracting only on a cache miss.
+
+    Concurrent uploads of the same bytes and language in this process wait
+    for the first extraction instead of repeating it. Empty results are not
+    cached; results with unread scanned pages are stored as incomplete
+    (batches still read them) and extracted again on the next upload.
+    """
+    key = (upload.sha256, lang)
+    while True:
+        cached = get_cached_extraction(upload.sha256, lang)
+        if cached is not None and not cached['incomplete']:
+            return cached, True
+        with _inflight_lock:
+            event = _inflight.get(key)
+            if event is None:
+                event = _inflight[key] = threading.Event()
+                break
+        event.wait()
+        db.session.rollback()  # end the read transaction so the new row is visible
+
+    try:
+        result = extractor.extract(upload.path, lang=lang)
+        extraction = {
+            'text': result.text,
+            'file_type': result.file_type,
+            'pages': [[page.start, page.end, page.scanned] for page in result.pages],
+            'clauses': result.clauses,
+            'incomplete': unread_pages(result) > 0
+        }
+        if result.text.strip():
+            store_extraction(upload.sha256, lang, upload.size, result)
+            logger.info(f"Cached extraction of {upload.filename} ({upload.sha256[:12]}, {lang}, {upload.size} bytes)")
+        if extraction['incomplete']:
+            logger.warning(f"{unread_pages(result)} scanned page(s) of {upload.filename} came back empty; it will be extracted again next time")
+        return extraction, False
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        event.set()
+
+BATCH_WORKERS = int(os.getenv('EXTRACTION_BATCH_WORKERS', '4'))
+BATCH_STALE_AFTER = timedelta(minutes=float(os.getenv('EXTRACTION_BATCH_STALE_MINUTES', '60')))
+ORPHANED_ERROR = 'The worker running this extraction stopped before it finished; upload the file again'
+STALE_ERROR = 'Extraction did not finish in time; upload the file again'
+_batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='extraction-batch')
+
+def submit_batch(app, extractor, uploads: List[SpooledUpload], lang: str = 'en',
+                 user_id: Optional[int] = None) -> str:
+    """Record a batch and queue one extraction per distinct file; returns the batch id.
+
+    Files with identical bytes share one extraction (and one temp file), and
+    files already in the cache finish as soon as a worker picks them up. At
+    most BATCH_WORKERS extractions run at once per process.
+    """
+    batch_id = str(uuid.uuid4())
+    db.session.add(ExtractionBatch(id=batch_id, user_id=user_id, language=lang, worker_pid=os.getpid()))
+    unique: Dict[str, SpooledUpload] = {}
+    for position, upload in enumerate(uploads):
+        db.session.add(ExtractionBatchItem(
+            batch_id=batch_id,
+            position=position,
+            filename=upload.filename,
+            file_hash=upload.sha256,
+            size=upload.size
+        ))
+        if upload.sha256 in unique:
+            discard_upload(upload)
+        else:
+            unique[upload.sha256] = upload
+    db.session.commit()
+
+    for upload in unique.values():
+        _batch_executor.submit(_run_batch_item, app, extractor, batch_id, upload, lang)
+    logger.info(f"Batch {batch_id}: {len(uploads)} files, {len(unique)} distinct")
+    return batch_id
+
+def _run_batch_item(app, extractor, batch_id: str, upload: SpooledUpload, lang: str) -> None:
+    with app.app_context():
+        try:
+            extraction, cached = extract_cached(extractor, upload, lang)
+            status, error = ('done', None) if extraction['text'].strip() else ('failed', 'No text could be extracted from the document')
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Batch {batch_id}: extraction of {upload.filename} failed: {str(e)}")
+            status, error, cached = 'failed', str(e), False
+        finally:
+            discard_upload(upload)
+        try:
+            ExtractionBatchItem.query.filter_by(batch_id=batch_id, file_hash=upload.sha256).update({
+                'status': status,
+                'error': error,
+                'cached': cached,
+                'finished_at': datetime.utcnow()
+            }, synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Batch {batch_id}: could not record status of {upload.filename}: {str(e)}")
+        finally:
+            db.session.remove()
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _fail_pending(batch_ids: List[str], error: str) -> int:
+    """Mark the pending items of these batches failed (commits); returns how many."""
+    if not batch_ids:
+        return 0
+    failed = ExtractionBatchItem.query.filter(
+        ExtractionBatchItem.batch_id.in_(batch_ids),
+        ExtractionBatchItem.status == 'pending'
+    ).update({'status': 'failed', 'error': error, 'finished_at': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    return failed
+
+def fail_orphaned_batches() -> int:
+    """Fail pending items whose worker process is gone (run at startup).
+
+    Their work lived only in that process's thread pool and the temp files
+    are not recorded, so nothing can resume them. A batch owned by this
+    very pid belongs to a dead process whose pid was reused.
+    """
+    batches = db.session.query(ExtractionBatch.id, ExtractionBatch.worker_pid).join(ExtractionBatchItem).filter(
+        ExtractionBatchItem.status == 'pending'
+    ).distinct().all()
+    orphaned = [
+        batch_id for batch_id, pid in batches
+        if pid is None or pid == os.getpid() or not _process_alive(pid)
+    ]
+    failed = _fail_pending(orphaned, ORPHANED_ERROR)
+    if failed:
+        logger.warning(f"Failed {failed} pending extraction(s) in {len(orphaned)} batch(es) left by stopped workers")
+    return failed
+
+def get_batch(batch_id: str, user_id: Optional[int] = None, include_text: bool = True) -> Optional[Dict]:
+    """Batch status with per-file results; None if missing or owned by another user.
+
+    Items still pending BATCH_STALE_AFTER after the batch was created are
+    failed, so a lost worker never leaves a batch running forever.
+    """
+    batch = ExtractionBatch.query.get(batch_id)
+    if batch is None or (batch.user_id is not None and batch.user_id != user_id):
+        return None
+    if batch.created_at and datetime.utcnow() - batch.created_at > BATCH_STALE_AFTER:
+        if any(item.status == 'pending' for item in batch.items):
+            logger.warning(f"Batch {batch_id}: pending items timed out")
+            _fail_pending([batch_id], STALE_ERROR)  # the commit expires batch, so items reload
+    texts: Dict[str, Dict] = {}
+    files = []
+    for item in batch.items:
+        entry = {
+            'index': item.position,
+            'filename': item.filename,
+            'file_hash': item.file_hash,
+            'size': item.size,
+            'status': item.status,
+            'cached': item.cached,
+            'error': item.error
+        }
+        if include_text and item.status == 'done':
+            if item.file_hash not in texts:
+                texts[item.file_hash] = get_cached_extraction(item.file_hash, batch.language or 'en') or {'text': '', 'clauses': []}
+            entry['text'] = texts[item.file_hash]['text']
+            entry['clauses'] = texts[item.file_hash]['clauses']
+        files.append(entry)
+    counts = {status: sum(1 for f in files if f['status'] == status) for status in ('pending', 'done', 'failed')}
+    return {
+        'batch_id': batch.id,
+        'status': 'running' if counts['pending'] else 'complete',
+        'created_at': batch.created_at.isoformat() if batch.created_at else None,
+        'counts': counts,
+        'files': files
+    }
@@ -0,0 +1,323 @@
+# api/legacy_formats.py
+import re
+import struct
+import logging
+from typing import BinaryIO, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+OLE_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+RTF_SIGNATURE = b'{\\rtf'
+ZIP_SIGNATURE = b'PK\x03\x04'
+
+def sniff_format(path: str) -> Optional[str]:
+    """'rtf', 'doc' or 'docx' from the file's magic bytes; extensions are often wrong for these."""
+    with open(path, 'rb') as file:
+        head = file.read(8)
+    if head.startswith(RTF_SIGNATURE):
+        return 'rtf'
+    if head.startswith(OLE_SIGNATURE):
+        return 'doc'
+    if head.startswith(ZIP_SIGNATURE):
+        return 'docx'
+    return None
+
+# --- RTF ---------------------------------------------------------------------
+
+RTF_TOKEN = re.compile(
+    rb"\\([a-zA-Z]{1,32})(-?\d{1,10})? ?"  # control word with optional parameter
+    rb"|((?:\\'[0-9a-fA-F]{2})+)"  # run of hex-escaped bytes in the document code page
+    rb"|\\([^a-zA-Z'])"  # control symbol
+    rb"|([{}])"
+    rb"|[\r\n]+"  # raw line breaks are not content
+    rb"|([^\\{}\r\n]+)"
+)
+TOKEN_MARGIN = 64  # unparsed tail kept between chunks so no token is split
+
+# Destinations whose content is not document text
+RTF_SKIP_DESTINATIONS = {
+    'fonttbl', 'colortbl', 'stylesheet', 'info', 'pict', 'object', 'header', 'headerl', 'headerr',
+    'headerf', 'footer', 'footerl', 'footerr', 'footerf', 'themedata', 'colorschememapping',
+    'datastore', 'latentstyles', 'listtable', 'listoverridetable', 'rsidtbl', 'generator',
+    'xmlnstbl', 'mmathPr', 'filetbl', 'revtbl', 'fldinst', 'bkmkstart', 'bkmkend', 'pgdsctbl',
+    'protusertbl', 'wgrffmtfilter', 'xe', 'tc', 'pn', 'pntext', 'listtext', 'footnote', 'annotation'
+}
+RTF_CHARACTERS = {
+    'par': '\n', 'line': '\n', 'sect': '\n', 'page': '\n', 'row': '\n', 'tab': '\t', 'cell': '\t',
+    'emdash': '\u2014', 'endash': '\u2013', 'bullet': '\u2022', 'lquote': '\u2018', 'rquote': '\u2019',
+    'ldblquote': '\u201c', 'rdblquote': '\u201d', 'emspace': ' ', 'enspace': ' ', 'qmspace': ' '
+}
+RTF_SYMBOLS = {'~': '\u00a0', '-': '', '_': '-', '\\': '\\', '{': '{', '}': '}'}
+
+class _RtfState:
+    def __init__(self):
+        self.out: List[str] = []
+        self.stack: List[tuple] = []
+        self.skip = False  # inside an ignorable destination
+        self.uc = 1  # fallback characters following each \\uN
+        self.pending_fallback = 0
+        self.encoding = 'cp1252'
+        self.hex = bytearray()
+        self.first_in_group = False
+
+    def flush_hex(self):
+        if self.hex:
+            if not self.skip:
+                self.out.append(self.hex.decode(self.encoding, errors='replace'))
+            self.hex.clear()
+
+    def text(self, data: bytes):
+        if self.pending_fallback:
+            drop = min(self.pending_fallback, len(data))
+            self.pending_fallback -= drop
+            data = data[drop:]
+        if data and not self.skip:
+            self.out.append(data.decode(self.encoding, errors='replace'))
+
+def extract_rtf(path: str) -> str:
+    """Text of an RTF file, parsed in CHUNK_SIZE pieces.
+
+    Handles groups, ignorable destinations (font/colour tables, pictures,
+    headers, field instructions), \\'hh bytes in the document code page,
+    \\uN Unicode with \\ucN fallback skipping and \\binN binary data.
+    """
+    with open(path, 'rb') as file:
+        return _parse_rtf(file)
+
+def _parse_rtf(file: BinaryIO) -> str:
+    state = _RtfState()
+    buffer = b''
+    binary_skip = 0
+    eof = False
+    while not eof:
+        chunk = file.read(CHUNK_SIZE)
+        eof = not chunk
+        buffer += chunk
+        if binary_skip:
+            dropped = min(binary_skip, len(buffer))
+            buffer = buffer[dropped:]
+            binary_skip -= dropped
+            if binary_skip:
+                continue
+        position = 0
+        limit = len(buffer) if eof else len(buffer) - TOKEN_MARGIN
+        while position < limit:
+            match = RTF_TOKEN.match(buffer, position)
+            if match is None:  # stray byte
+                position += 1
+                continue
+            position = match.end()
+            if match.lastindex is None:  # raw line break
+                continue
+            binary_skip = _rtf_token(state, match)
+            if binary_skip:
+                dropped = min(binary_skip, len(buffer) - position)
+                position += dropped
+                binary_skip -= dropped
+                if binary_skip:
+                    break
+        buffer = buffer[position:]
+    state.flush_hex()
+    return ''.join(state.out)
+
+def _rtf_token(state: _RtfState, match) -> int:
+    """Apply one token; returns a number of raw bytes to skip (\\binN)."""
+    word, param, hex_run, symbol, brace, text = match.groups()
+    if hex_run is not None:
+        data = bytes.fromhex(hex_run.replace(b"\\'", b'').decode('ascii'))
+        if state.pending_fallback:
+            drop = min(state.pending_fallback, len(data))
+            state.pending_fallback -= drop
+            data = data[drop:]
+        state.hex.extend(data)
+        state.first_in_group = False
+        return 0
+    state.flush_hex()
+    if brace == b'{':
+        state.stack.append((state.skip, state.uc))
+        state.first_in_group = True
+        state.pending_fallback = 0
+        return 0
+    if brace == b'}':
+        if state.stack:
+            state.skip, state.uc = state.stack.pop()
+        state.first_in_group = False
+        state.pending_fallback = 0
+        return 0
+    first, state.first_in_group = state.first_in_group, False
+    if symbol is not None:
+        symbol = symbol.decode('latin-1')
+        if symbol == '*':
+            state.skip = True
+        elif not state.skip and symbol in RTF_SYMBOLS:
+            state.out.append(RTF_SYMBOLS[symbol])
+        return 0
+    if word is not None:
+        word = word.decode('ascii')
+        number = int(param) if param is not None else None
+        if word in RTF_SKIP_DESTINATIONS and first:
+            state.skip = True
+        elif word == 'ansicpg' and number:
+            state.encoding = f'cp{number}'
+        elif word == 'uc' and number is not None:
+            state.uc = number
+        elif word == 'u' and number is not None:
+            if not state.skip:
+                state.out.append(chr(number + 65536 if number < 0 else number))
+            state.pending_fallback = state.uc
+        elif word == 'bin' and number:
+            return number
+        elif not state.skip and word in RTF_CHARACTERS:
+            state.out.append(RTF_CHARACTERS[word])
+        return 0
+    if text is not None:
+        state.text(text)
+    return 0
+
+# --- Word 97-2003 .doc ----------------------------------------------------------
+
+class _CompoundFile:
+    """Minimal reader for OLE2 compound files: just enough to read named streams"""
+
+    def __init__(self, file: BinaryIO):
+        self.file = file
+        header = file.read(512)
+        if not header.startswith(OLE_SIGNATURE):
+            raise ValueError("Not an OLE2 compound file")
+        sector_shift, mini_shift = struct.unpack_from('<HH', header, 0x1E)
+        self.sector_size = 1 << sector_shift
+        self.mini_size = 1 << mini_shift
+        fat_sectors, first_dir, _, self.mini_cutoff, first_minifat, minifat_count, first_difat, difat_count = \
+            struct.unpack_from('<IIIIIIII', header, 0x2C)
+        difat = list(struct.unpack_from('<109I', header, 0x4C))
+        sector = first_difat
+        for _ in range(difat_count):
+            data = self._sector(sector)
+            entries = struct.unpack(f'<{self.sector_size // 4}I', data)
+            difat.extend(entries[:-1])
+            sector = entries[-1]
+        self.fat: List[int] = []
+        for sector in difat[:fat_sectors]:
+            self.fat.extend(struct.unpack(f'<{self.sector_size // 4}I', self._sector(sector)))
+        directory = self._chain(first_dir)
+        self.entries: Dict[str, tuple] = {}
+        root = None
+        for offset in range(0, len(directory), 128):
+            entry = directory[offset:offset + 128]
+            name_length, kind = struct.unpack_from('<HB', entry, 64)
+            if kind == 0 or name_length < 2:
+                continue
+            name = entry[:name_length - 2].decode('utf-16-le', errors='replace')
+            start, size = struct.unpack_from('<II', entry, 116)
+            if kind == 5:
+                root = (start, size)
+            self.entries[name] = (start, size)
+        self.minifat: List[int] = []
+        if minifat_count:
+            data = self._chain(first_minifat)
+            self.minifat = list(struct.unpack(f'<{len(data) // 4}I', data))
+        self.mini_stream = self._chain(root[0])[:root[1]] if root and root[1] else b''
+
+    def _sector(self, sector: int) -> bytes:
+        self.file.seek((sector + 1) * self.sector_size)
+        return self.file.read(self.sector_size)
+
+    def _chain(self, sector: int) -> bytes:
+        parts = []
+        seen = set()
+        while sector < 0xFFFFFFFA and sector not in seen:
+            seen.add(sector)
+            parts.append(self._sector(sector))
+            sector = self.fat[sector] if sector < len(self.fat) else 0xFFFFFFFE
+        return b''.join(parts)
+
+    def _mini_chain(self, sector: int) -> bytes:
+        parts = []
+        seen = set()
+        while sector < 0xFFFFFFFA and sector not in seen:
+            seen.add(sector)
+            offset = sector * self.mini_size
+            parts.append(self.mini_stream[offset:offset + self.mini_size])
+            sector = self.minifat[sector] if sector < len(self.minifat) else 0xFFFFFFFE
+        return b''.join(parts)
+
+    def stream(self, name: str) -> bytes:
+        if name not in self.entries:
+            raise KeyError(name)
+        start, size = self.entries[name]
+        data = self._mini_chain(start) if size < self.mini_cutoff else self._chain(start)
+        return data[:size]
+
+WORD_FIELD_BEGIN, WORD_FIELD_SEPARATOR, WORD_FIELD_END = '\x13', '\x14', '\x15'
+WORD_FIELD_MARKS = re.compile('([\x13\x14\x15])')
+WORD_CHARACTERS = {
+    '\r': '\n', '\x0b': '\n', '\x0c': '\n', '\x0e': '\n', '\x07': '\t',
+    '\x01': '', '\x02': '', '\x03': '', '\x04': '', '\x05': '', '\x08': '',
+    '\x1e': '-', '\x1f': '', '\xa0': ' '
+}
+WORD_SPECIAL = re.compile('[' + ''.join(WORD_CHARACTERS) + ']')  # str.translate with a dict is per-character Python
+
+def extract_doc(path: str) -> str:
+    """Main-document text of a Word 97-2003 .doc via its piece table.
+
+    Reads the FIB from the WordDocument stream, the CLX from the 0Table or
+    1Table stream, and decodes each piece as cp1252 (compressed) or UTF-16.
+    Field instructions are dropped and field results kept.
+    """
+    with open(path, 'rb') as file:
+        compound = _CompoundFile(file)
+        word = compound.stream('WordDocument')
+        ident, version = struct.unpack_from('<HH', word, 0)
+        if ident != 0xA5EC or version < 101:
+            raise ValueError("Only Word 97-2003 .doc files are supported")
+        flags = struct.unpack_from('<H', word, 0x0A)[0]
+        if flags & 0x0100:
+            raise ValueError("Encrypted .doc files are not supported")
+        table = compound.stream('1Table' if flags & 0x0200 else '0Table')
+    text_chars = struct.unpack_from('<i', word, 0x4C)[0]
+    fc_clx, lcb_clx = struct.unpack_from('<II', word, 0x01A2)
+    clx = table[fc_clx:fc_clx + lcb_clx]
+
+    position = 0
+    while position < len(clx) and clx[position] == 0x01:  # Prc: property modifiers
+        position += 3 + struct.unpack_from('<H', clx, position + 1)[0]
+    if position >= len(clx) or clx[position] != 0x02:
+        raise ValueError("No piece table in .doc file")
+    size = struct.unpack_from('<I', clx, position + 1)[0]
+    plc = clx[position + 5:position + 5 + size]
+    pieces = (size - 4) // 12
+    cps = struct.unpack_from(f'<{pieces + 1}I', plc, 0)
+
+    parts = []
+    remaining = text_chars
+    for index in range(pieces):
+        if remaining <= 0:
+            break
+        count = min(cps[index + 1] - cps[index], remaining)
+        fc = struct.unpack_from('<I', plc, 4 * (pieces + 1) + 8 * index + 2)[0]
+        if fc & 0x40000000:
+            offset = (fc & ~0x40000000) // 2
+            parts.append(word[offset:offset + count].decode('cp1252', errors='replace'))
+        else:
+            parts.append(word[fc:fc + 2 * count].decode('utf-16-le', errors='replace'))
+        remaining -= count
+    return WORD_SPECIAL.sub(lambda match: WORD_CHARACTERS[match.group()], _strip_fields(''.join(parts)))
+
+def _strip_fields(text: str) -> str:
+    """Drop field instructions (begin..separator), keep results (separator..end)"""
+    if WORD_FIELD_BEGIN not in text:
+        return text
+    out = []
+    in_code: List[bool] = []  # one entry per open field, innermost last
+    for part in WORD_FIELD_MARKS.split(text):
+        if part == WORD_FIELD_BEGIN:
+            in_code.append(True)
+        elif part == WORD_FIELD_SEPARATOR and in_code:
+            in_code[-1] = False
+        elif part == WORD_FIELD_END and in_code:
+            in_code.pop()
+        elif part and not any(in_code):
+            out.append(part)
+    return ''.join(out)
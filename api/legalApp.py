@@ -1,9 +1,13 @@
 # api/legalApp.py
 import os
+import sys
+import atexit
 import logging
+import click
 from flask import Flask, redirect, request, jsonify, session, render_template, url_for
 from flask_session import Session
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.exc import SQLAlchemyError
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 import secrets
 import requests
@@ -16,7 +20,17 @@ from routes.translator_routes import translator_bp
 from routes.student_routes import student_bp
 from routes.web_search_routes import web_search_bp
 from routes.auth_routes import auth_bp
-from models import db, User, Preference
+from routes.analysis_routes import analysis_bp
+from models import db, User
+from preferences import preference_store, init_preference_vectors
+import migrations
+from database import configure_database, sqlite_engine_options, write_behind
+from contracts import store_contract, load_contract_text
+from analysis_store import save_analysis, load_analysis
+from maintenance import maintenance
+from extractions import fail_orphaned_batches
+import pdf_engine
+import search_cache
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -43,8 +57,14 @@ app.config.update(
     SESSION_COOKIE_SAME_SITE='Lax',
     SESSION_COOKIE_NAME='legal_safe_ai_session',
     MAX_CONTENT_LENGTH=16 * 1024 * 1024,  # 16MB max file size
+    BATCH_MAX_CONTENT_LENGTH=256 * 1024 * 1024,  # /api/document/extract/batch, up to 50 files
     SQLALCHEMY_DATABASE_URI=f'sqlite:///{os.path.join(instance_path, "legal_safe_ai.db")}',
-    SQLALCHEMY_TRACK_MODIFICATIONS=False
+    SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    SQLALCHEMY_ENGINE_OPTIONS=sqlite_engine_options(),
+    DB_WRITE_BEHIND=os.getenv('DB_WRITE_BEHIND', '1') != '0',
+    MAINTENANCE_SCHEDULER=os.getenv('MAINTENANCE_SCHEDULER', '1') != '0',
+    CHAT_HISTORY_RETENTION_DAYS=int(os.getenv('CHAT_HISTORY_RETENTION_DAYS', '180')),
+    CHAT_HISTORY_ARCHIVE_DIR=os.path.join(instance_path, 'archive')
 )
 
 # Ensure session directory exists
@@ -54,8 +74,9 @@ if not os.path.exists(app.config['SESSION_FILE_DIR']):
 # Initialize Flask-Session
 Session(app)
 
-# Initialize SQLAlchemy
+# Initialize SQLAlchemy (WAL, busy timeout, pooled connections, write-behind)
 db.init_app(app)
+configure_database(app)
 
 # Initialize Flask-Login
 login_manager = LoginManager()
@@ -66,21 +87,85 @@ login_manager.login_view = 'auth.login'
 def load_user(user_id):
     return User.query.get(int(user_id))
 
-# Create database tables and initialize preferences
+# Create missing tables; data migrations run via 'flask upgrade-db', not on import,
+# and per-user preferences are initialized lazily on first access
 with app.app_context():
+    new_database = not db.inspect(db.engine).has_table('users')
     db.create_all()
-    areas = [
-        'sick_leave', 'vacation', 'overtime', 'termination', 'confidentiality',
-        'non_compete', 'intellectual_property', 'governing_law', 'jurisdiction',
-        'dispute_resolution', 'liability', 'salary', 'benefits', 'work_hours',
-        'performance_evaluation', 'duties', 'responsibilities'
-    ]
-    for user in User.query.all():
-        existing_areas = {p.area for p in Preference.query.filter_by(user_id=user.id).all()}
-        for area in areas:
-            if area not in existing_areas:
-                db.session.add(Preference(user_id=user.id, area=area, weight=1.0))
-    db.session.commit()
+    if new_database:
+        migrations.stamp()
+    migrations.check_schema()
+    try:
+        fail_orphaned_batches()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.warning(f"Could not check for orphaned extraction batches: {str(e)}")
+
+# Refuse requests (503) until 'flask upgrade-db' has brought the schema up to date
+migrations.init_app(app)
+
+def flush_pending_writes():
+    """Write back preference events and queued writes when the worker exits"""
+    with app.app_context():
+        preference_store.flush()
+    if not write_behind.flush(timeout=10):
+        logger.warning("Timed out flushing queued writes at exit")
+    dropped = preference_store.pending_events()
+    if dropped:
+        logger.warning(f"Dropping {dropped} preference events that could not be written at exit")
+
+atexit.register(flush_pending_writes)
+
+def serving_requests() -> bool:
+    """False when loaded by a flask CLI command other than 'run' (upgrade-db, run-maintenance, ...)"""
+    if click.get_current_context(silent=True) is None:
+        return True  # WSGI server or 'python legalApp.py'
+    return 'run' in sys.argv[1:]
+
+# Fork the PDF/OCR workers while this is the only thread: forking after the
+# scheduler or request threads start can copy a lock they hold into a child.
+# CLI commands do no document work, so they skip the pool.
+if serving_requests():
+    pdf_engine.start_pool()
+
+# Search and page caches keep their SQLite file in the instance folder
+search_cache.init_app(app)
+
+# Session GC, file retention, chat history archival and WAL compaction
+maintenance.init_app(app)
+if app.config['MAINTENANCE_SCHEDULER']:
+    maintenance.start()
+    atexit.register(maintenance.shutdown)
+
+@app.cli.command('rebuild-question-frequencies')
+def rebuild_question_frequencies_command():
+    """Recompute the materialized question counts from chat_history."""
+    from agents.question_analyzer_agent import rebuild_question_frequencies
+    rows = rebuild_question_frequencies()
+    print(f"Rebuilt {rows} question frequency rows")
+
+@app.cli.command('upgrade-db')
+def upgrade_db_command():
+    """Apply pending schema and data migrations."""
+    applied = migrations.upgrade()
+    if not applied:
+        print(f"Database already at version {migrations.current_version()}")
+    for step in applied:
+        print(f"Applied migration {step.version}: {step.name}")
+
+@app.cli.command('init-preferences')
+def init_preferences_command():
+    """Create preference vectors for every user that does not have one yet."""
+    created = init_preference_vectors()
+    print(f"Initialized {created} preference vectors")
+
+@app.cli.command('run-maintenance')
+def run_maintenance_command():
+    """Run every maintenance job once and print what was reclaimed."""
+    for name, result in maintenance.run_all().items():
+        print(f"{name}: {result}")
+    print(f"Total reclaimed: {maintenance.totals['bytes_reclaimed'] / 1024 / 1024:.1f} MB, "
+          f"{maintenance.totals['files_removed']} files, {maintenance.totals['rows_archived']} chat rows archived")
 
 # Register blueprints
 app.register_blueprint(document_bp, url_prefix='/api/document')
@@ -92,6 +177,7 @@ app.register_blueprint(translator_bp, url_prefix='/api/translator')
 app.register_blueprint(student_bp, url_prefix='/api/student')
 app.register_blueprint(web_search_bp, url_prefix='/api/web_search')
 app.register_blueprint(auth_bp, url_prefix='/auth')
+app.register_blueprint(analysis_bp, url_prefix='/api/analyses')
 
 @app.route('/')
 def index():
@@ -202,21 +288,24 @@ def analyze_contract():
             logger.error("Evaluation missing in response")
             return jsonify({'status': 'error', 'error': 'Evaluation missing'}), 500
 
-        # Store English results in session
+        # Store the contract once and the English results server-side;
+        # the session only keeps the analysis id
+        contract_id = store_contract(contract_text)
         analysis_results = {
             'status': 'success',
-            'document_text': contract_text,
+            'contract_id': contract_id,
             'shadow_analysis': shadow_analysis,
             'summary': summary,
             'evaluation': evaluation,
             'original_language': 'en'
         }
-        session['english_analysis_results'] = analysis_results
-        session['contract_text'] = contract_text
+        analysis_id = save_analysis(current_user.id, contract_id, analysis_results)
+        session['analysis_id'] = analysis_id
         session['chat_language'] = user_language
         session['analysis_complete'] = True
         session.modified = True
-        logger.debug(f"Stored English analysis results in session")
+        analysis_results = dict(analysis_results, analysis_id=analysis_id, document_text=contract_text)
+        logger.debug(f"Stored English analysis results as {analysis_id}")
 
         # Translate if not English
         if user_language != 'en':
@@ -274,14 +363,17 @@ def retranslate_analysis():
         user_language = data['language']
         logger.debug(f"Retranslating to language: {user_language}")
 
-        if 'english_analysis_results' not in session:
-            logger.error("No cached analysis results in session")
+        owner_id = current_user.id if current_user.is_authenticated else None
+        analysis_results = load_analysis(session.get('analysis_id'), owner_id)
+        if analysis_results is None:
+            logger.error("No stored analysis results for session")
             return jsonify({
                 'status': 'error',
                 'error': 'No analysis results available. Please analyze a contract first.'
             }), 400
 
-        analysis_results = session['english_analysis_results']
+        analysis_results['analysis_id'] = session['analysis_id']
+        analysis_results['document_text'] = load_contract_text(analysis_results['contract_id'])
         logger.debug(f"Retrieved English analysis results")
 
         if user_language == 'en':
@@ -0,0 +1,260 @@
+# api/maintenance.py
+import os
+import json
+import gzip
+import time
+import logging
+import fnmatch
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from apscheduler.schedulers.background import BackgroundScheduler
+from models import db, ChatHistory
+from search_cache import page_cache, search_cache
+from preferences import preference_store
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, every process may run jobs
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class RetentionPolicy:
+    """Files under path older than max_age_days are removed; if max_total_mb is
+    set the oldest remaining files are removed until the directory fits. Only
+    files whose name matches pattern are considered."""
+    name: str
+    path: str
+    max_age_days: float
+    max_total_mb: Optional[float] = None
+    interval_hours: float = 24
+    pattern: str = '*'
+
+def default_policies(app) -> List[RetentionPolicy]:
+    session_days = app.config.get('PERMANENT_SESSION_LIFETIME', 3600)
+    if isinstance(session_days, timedelta):
+        session_days = session_days.total_seconds()
+    session_days = 2 * session_days / 86400  # expired sessions, with a margin
+    return [
+        RetentionPolicy('flask_session', app.config.get('SESSION_FILE_DIR', 'flask_session'), session_days, interval_hours=1),
+        RetentionPolicy('shadow_analyses', 'shadow_analyses', 30),
+        RetentionPolicy('contract_analyses', 'contract_analyses', 7, max_total_mb=100),
+        # Pre-hashing JSON entries only; the SQLite store expires its own rows (purge_search_cache)
+        RetentionPolicy('search_cache', 'search_cache', 7, max_total_mb=200, interval_hours=6, pattern='*.json'),
+        RetentionPolicy('automated_tests', 'automated_tests', 30),
+        RetentionPolicy('uploads', os.path.join(app.instance_path, 'uploads'), 1),  # left behind by crashed requests
+    ]
+
+def prune_directory(policy: RetentionPolicy, now: Optional[float] = None) -> Dict:
+    """Apply a retention policy in one directory walk; returns reclaimed-space stats."""
+    now = now or time.time()
+    stats = {'files_removed': 0, 'bytes_reclaimed': 0, 'files_kept': 0, 'bytes_kept': 0}
+    if not os.path.isdir(policy.path):
+        return stats
+
+    cutoff = now - policy.max_age_days * 86400
+    kept = []
+    for root, dirs, files in os.walk(policy.path):
+        for name in files:
+            if not fnmatch.fnmatch(name, policy.pattern):
+                continue
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if st.st_mtime < cutoff:
+                if _remove(path):
+                    stats['files_removed'] += 1
+                    stats['bytes_reclaimed'] += st.st_size
+            else:
+                kept.append((st.st_mtime, st.st_size, path))
+
+    if policy.max_total_mb is not None:
+        budget = policy.max_total_mb * 1024 * 1024
+        total = sum(size for _, size, _ in kept)
+        kept.sort()  # oldest first
+        while kept and total > budget:
+            _, size, path = kept.pop(0)
+            if _remove(path):
+                stats['files_removed'] += 1
+                stats['bytes_reclaimed'] += size
+            total -= size
+
+    stats['files_kept'] = len(kept)
+    stats['bytes_kept'] = sum(size for _, size, _ in kept)
+    _remove_empty_dirs(policy.path)
+    return stats
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except OSError as e:
+        logger.warning(f"Could not remove {path}: {str(e)}")
+        return False
+
+def _remove_empty_dirs(top: str) -> None:
+    for root, dirs, files in os.walk(top, topdown=False):
+        if root != top and not dirs and not files:
+            try:
+                os.rmdir(root)
+            except OSError:
+                pass
+
+def archive_chat_history(archive_dir: str, older_than_days: int = 180, batch_size: int = 5000) -> Dict:
+    """Move chat_history rows older than the cutoff into gzip'd monthly JSONL partitions.
+
+    Rows are appended to <archive_dir>/chat_history_YYYY-MM.jsonl.gz (one gzip
+    member per batch) before they are deleted, so a crash can at worst archive
+    a batch twice but never lose it.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    stats = {'rows_archived': 0, 'partitions': set(), 'bytes_written': 0}
+    while True:
+        rows = (
+            ChatHistory.query
+            .filter(ChatHistory.asked_at < cutoff)
+            .order_by(ChatHistory.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        by_month: Dict[str, List[str]] = {}
+        for row in rows:
+            by_month.setdefault(row.asked_at.strftime('%Y-%m'), []).append(json.dumps({
+                'id': row.id,
+                'user_id': row.user_id,
+                'session_id': row.session_id,
+                'question': row.question,
+                'response': row.response,
+                'asked_at': row.asked_at.isoformat()
+            }, ensure_ascii=False))
+        for month, lines in by_month.items():
+            path = os.path.join(archive_dir, f'chat_history_{month}.jsonl.gz')
+            before = os.path.getsize(path) if os.path.exists(path) else 0
+            with gzip.open(path, 'at', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+            stats['bytes_written'] += os.path.getsize(path) - before
+            stats['partitions'].add(month)
+        ChatHistory.query.filter(
+            ChatHistory.id.in_([row.id for row in rows])
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        stats['rows_archived'] += len(rows)
+    stats['partitions'] = sorted(stats['partitions'])
+    return stats
+
+def compact_database() -> Dict:
+    """Checkpoint and truncate the SQLite WAL and refresh planner statistics."""
+    path = db.engine.url.database
+    def size():
+        return sum(os.path.getsize(p) for p in (path, f'{path}-wal') if p and os.path.exists(p))
+    before = size()
+    db.session.execute(db.text('PRAGMA wal_checkpoint(TRUNCATE)'))
+    db.session.execute(db.text('PRAGMA optimize'))
+    db.session.commit()
+    return {'bytes_before': before, 'bytes_after': size(), 'bytes_reclaimed': max(before - size(), 0)}
+
+class MaintenanceScheduler:
+    """Runs retention, archival and compaction jobs on an APScheduler background thread.
+
+    Every gunicorn worker schedules the jobs, but a scheduled run only proceeds
+    in the worker holding the instance lock file; the first one to take it keeps
+    it for its lifetime and another takes over if it exits. Results of the last
+    run of each job and cumulative totals are kept in metrics and logged.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.scheduler: Optional[BackgroundScheduler] = None
+        self.metrics: Dict[str, Dict] = {}
+        self.totals = {'files_removed': 0, 'bytes_reclaimed': 0, 'rows_archived': 0}
+        self._lock_file = None
+        self._metrics_lock = threading.Lock()
+
+    def init_app(self, app) -> None:
+        self.app = app
+        self.policies = default_policies(app)
+        self.archive_dir = app.config.get('CHAT_HISTORY_ARCHIVE_DIR', os.path.join(app.instance_path, 'archive'))
+        self.history_days = app.config.get('CHAT_HISTORY_RETENTION_DAYS', 180)
+
+    def jobs(self) -> Dict[str, Callable[[], Dict]]:
+        jobs = {f'prune_{p.name}': (lambda p=p: prune_directory(p)) for p in self.policies}
+        jobs['archive_chat_history'] = lambda: archive_chat_history(self.archive_dir, self.history_days)
+        jobs['compact_database'] = compact_database
+        jobs['purge_search_cache'] = lambda: {'results': search_cache.purge(), 'pages': page_cache.purge()}
+        return jobs
+
+    def run_scheduled(self, name: str) -> None:
+        if self._acquire_lock():
+            self.run_job(name)
+
+    def run_job(self, name: str) -> Dict:
+        started = time.monotonic()
+        with self.app.app_context():
+            try:
+                result = self.jobs()[name]()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Maintenance job {name} failed: {str(e)}")
+                result = {'error': str(e)}
+        result['duration_s'] = round(time.monotonic() - started, 3)
+        result['ran_at'] = datetime.utcnow().isoformat()
+        with self._metrics_lock:
+            self.metrics[name] = result
+            for key in self.totals:
+                self.totals[key] += result.get(key, 0)
+        logger.info(f"Maintenance job {name}: {result}")
+        return result
+
+    def run_all(self) -> Dict[str, Dict]:
+        return {name: self.run_job(name) for name in self.jobs()}
+
+    def start(self) -> bool:
+        """Schedule every job in this process; False if already started."""
+        if self.scheduler is not None:
+            return False
+        self.scheduler = BackgroundScheduler(daemon=True)
+        for policy in self.policies:
+            self.scheduler.add_job(self.run_scheduled, 'interval', args=[f'prune_{policy.name}'],
+                                   hours=policy.interval_hours, id=f'prune_{policy.name}',
+                                   coalesce=True, max_instances=1)
+        self.scheduler.add_job(self.run_scheduled, 'interval', args=['archive_chat_history'], hours=24,
+                               id='archive_chat_history', coalesce=True, max_instances=1)
+        self.scheduler.add_job(self.run_scheduled, 'interval', args=['compact_database'], hours=6,
+                               id='compact_database', coalesce=True, max_instances=1)
+        self.scheduler.add_job(self.run_scheduled, 'interval', args=['purge_search_cache'], hours=6,
+                               id='purge_search_cache', coalesce=True, max_instances=1)
+        # Not behind the lock: every worker holds its own pending preference events
+        self.scheduler.add_job(preference_store.flush_due, 'interval', seconds=preference_store.flush_interval,
+                               id='flush_preferences', coalesce=True, max_instances=1)
+        self.scheduler.start()
+        logger.info(f"Maintenance scheduler started in pid {os.getpid()}")
+        return True
+
+    def shutdown(self) -> None:
+        if self.scheduler is not None:
+            self.scheduler.shutdown(wait=False)
+            self.scheduler = None
+
+    def _acquire_lock(self) -> bool:
+        if fcntl is None or self._lock_file is not None:
+            return True
+        path = os.path.join(self.app.instance_path, 'maintenance.lock')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        lock_file = open(path, 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file  # held for the life of the process
+        return True
+
+maintenance = MaintenanceScheduler()
@@ -0,0 +1,179 @@
+# api/migrations.py
+import logging
+from typing import Callable, List, NamedTuple, Optional
+from flask import jsonify
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, SchemaMigration
+
+logger = logging.getLogger(__name__)
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    upgrade: Callable[[], None]
+
+MIGRATIONS: List[Migration] = []
+
+def migration(version: int, name: str):
+    """Register an upgrade step. Steps must be idempotent: db.create_all() may
+    already have built the current schema on a fresh database."""
+    def decorator(func: Callable[[], None]) -> Callable[[], None]:
+        MIGRATIONS.append(Migration(version, name, func))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return func
+    return decorator
+
+def current_version() -> int:
+    return db.session.query(db.func.max(SchemaMigration.version)).scalar() or 0
+
+def pending_migrations() -> List[Migration]:
+    applied = current_version()
+    return [m for m in MIGRATIONS if m.version > applied]
+
+def upgrade(target: Optional[int] = None) -> List[Migration]:
+    """Apply pending migrations up to target (default: latest); returns those applied."""
+    applied = []
+    for step in pending_migrations():
+        if target is not None and step.version > target:
+            break
+        logger.info(f"Applying migration {step.version}: {step.name}")
+        try:
+            step.upgrade()
+            db.session.add(SchemaMigration(version=step.version, name=step.name))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.error(f"Migration {step.version} ({step.name}) failed")
+            raise
+        applied.append(step)
+    return applied
+
+def stamp() -> None:
+    """Mark every migration as applied (for databases just built by db.create_all()).
+
+    Several workers starting on a fresh database all stamp it, so versions
+    another worker already recorded are skipped rather than violating the key.
+    """
+    pending = pending_migrations()
+    if pending:
+        db.session.execute(
+            sqlite_insert(SchemaMigration)
+            .values([{'version': step.version, 'name': step.name} for step in pending])
+            .on_conflict_do_nothing(index_elements=['version'])
+        )
+    db.session.commit()
+
+def check_schema() -> None:
+    """Log at startup if the database is behind; only reads schema_migrations."""
+    pending = pending_migrations()
+    if pending:
+        logger.error(
+            f"Database schema is {len(pending)} migration(s) behind "
+            f"(latest {pending[-1].version}); requests are refused until 'flask upgrade-db' runs"
+        )
+
+_schema_current = False
+
+def schema_is_current() -> bool:
+    """True once no migrations are pending; rechecked on every call until then."""
+    global _schema_current
+    if not _schema_current:
+        _schema_current = not pending_migrations()
+    return _schema_current
+
+def init_app(app) -> None:
+    """Answer 503 while migrations are pending: queries against the old schema would fail.
+
+    The CLI commands (upgrade-db among them) do not go through requests, and a
+    running server starts serving as soon as another process upgrades the database.
+    """
+    @app.before_request
+    def require_current_schema():
+        if not schema_is_current():
+            return jsonify({'error': 'Database upgrade pending'}), 503
+
+def _column_names(table: str) -> set:
+    return {column['name'] for column in inspect(db.session.connection()).get_columns(table)}
+
+@migration(1, 'preference_vectors_from_legacy_rows')
+def _init_preference_vectors():
+    from preferences import init_preference_vectors
+    init_preference_vectors()
+
+def _create_indexes(*names: str):
+    """Create model-declared indexes by name; create_all() only builds them with new tables."""
+    declared = {
+        index.name: index
+        for table in db.metadata.tables.values()
+        for index in table.indexes
+    }
+    for name in names:
+        declared[name].create(bind=db.session.connection(), checkfirst=True)
+
+@migration(2, 'chat_and_preference_indexes')
+def _create_chat_and_preference_indexes():
+    _create_indexes(
+        'ix_preferences_user_area',
+        'ix_chat_history_user_question',
+        'ix_chat_history_session_asked_at',
+        'ix_chat_sessions_user_id'
+    )
+
+@migration(3, 'content_addressed_contracts')
+def _move_session_contracts_to_contracts_table(batch_size: int = 200):
+    """Replace chat_sessions.contract_text with a reference into contracts."""
+    from contracts import store_contract
+    columns = _column_names('chat_sessions')
+    if 'contract_text' not in columns:
+        return
+    if 'contract_id' not in columns:
+        db.session.execute(text(
+            'ALTER TABLE chat_sessions ADD COLUMN contract_id VARCHAR(64) REFERENCES contracts(id)'
+        ))
+    while True:
+        rows = db.session.execute(text(
+            'SELECT id, contract_text FROM chat_sessions WHERE contract_id IS NULL LIMIT :limit'
+        ), {'limit': batch_size}).fetchall()
+        if not rows:
+            break
+        for session_id, contract_text in rows:
+            db.session.execute(
+                text('UPDATE chat_sessions SET contract_id = :contract_id WHERE id = :id'),
+                {'contract_id': store_contract(contract_text or ''), 'id': session_id}
+            )
+        db.session.commit()
+    db.session.execute(text('ALTER TABLE chat_sessions DROP COLUMN contract_text'))
+    _create_indexes('ix_chat_sessions_contract_id')
+
+@migration(4, 'analysis_history_index')
+def _create_analysis_history_index():
+    _create_indexes('ix_analyses_user_contract_stage_created')
+
+@migration(5, 'document_extraction_clauses')
+def _add_document_extraction_clauses():
+    # The table is created by create_all(); only caches created before clauses lack the column
+    if 'clauses' not in _column_names('document_extractions'):
+        db.session.execute(text(
+            "ALTER TABLE document_extractions ADD COLUMN clauses TEXT NOT NULL DEFAULT '[]'"
+        ))
+
+@migration(6, 'document_extraction_language_key')
+def _key_document_extractions_by_language():
+    # The primary key changes, which SQLite cannot alter in place; the table is only a cache, so rebuild it
+    if 'language' in _column_names('document_extractions'):
+        return
+    from models import DocumentExtraction
+    db.session.execute(text('DROP TABLE document_extractions'))
+    DocumentExtraction.__table__.create(bind=db.session.connection())
+
+@migration(7, 'extraction_batch_worker_pid')
+def _add_extraction_batch_worker_pid():
+    if 'worker_pid' not in _column_names('extraction_batches'):
+        db.session.execute(text('ALTER TABLE extraction_batches ADD COLUMN worker_pid INTEGER'))
+
+@migration(8, 'question_frequencies_backfill')
+def _backfill_question_frequencies():
+    # question_frequencies is only maintained for new questions; count the existing history once
+    from agents.question_analyzer_agent import rebuild_question_frequencies
+    rebuild_question_frequencies()
@@ -3,6 +3,7 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+import zlib
 
 db = SQLAlchemy()
 
@@ -15,6 +16,7 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     preferences = db.relationship('Preference', backref='user', lazy=True)
+    preference_vector = db.relationship('PreferenceVector', backref='user', lazy=True, uselist=False)
     chat_history = db.relationship('ChatHistory', backref='user', lazy=True)
     chat_sessions = db.relationship('ChatSession', backref='user', lazy=True)
 
@@ -25,6 +27,7 @@ class User(UserMixin, db.Model):
         return check_password_hash(self.password_hash, password)
 
 class Preference(db.Model):
+    """Legacy one-row-per-area weights; only read to seed a user's PreferenceVector."""
     __tablename__ = 'preferences'
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -32,6 +35,19 @@ class Preference(db.Model):
     weight = db.Column(db.Float, default=1.0)  # Preference weight (0-5)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_preferences_user_area', 'user_id', 'area'),
+    )
+
+class PreferenceVector(db.Model):
+    """All area weights of one user, packed in PREFERENCE_AREAS order (see preferences.py)."""
+    __tablename__ = 'preference_vectors'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    weights = db.Column(db.LargeBinary, nullable=False)  # little-endian float32 per area
+    last_events = db.Column(db.LargeBinary, nullable=False)  # little-endian uint32: event index of last write per area
+    event_count = db.Column(db.Integer, nullable=False, default=0)  # questions applied so far
+    last_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class ChatHistory(db.Model):
     __tablename__ = 'chat_history'
     id = db.Column(db.Integer, primary_key=True)
@@ -41,11 +57,127 @@ class ChatHistory(db.Model):
     response = db.Column(db.Text)
     asked_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_chat_history_user_question', 'user_id', 'question'),
+        db.Index('ix_chat_history_session_asked_at', 'session_id', 'asked_at'),
+    )
+
 class ChatSession(db.Model):
     __tablename__ = 'chat_sessions'
     id = db.Column(db.String(36), primary_key=True)  # UUID as string
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    contract_id = db.Column(db.String(64), db.ForeignKey('contracts.id'), nullable=False, index=True)
+    language = db.Column(db.String(10), default='en')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    messages = db.relationship('ChatHistory', backref='session', lazy=True)
+    contract = db.relationship('Contract', lazy=True)
+
+    @property
+    def contract_text(self):
+        """Decompressed contract text; only touch this when building a prompt."""
+        from contracts import load_contract_text
+        return load_contract_text(self.contract_id)
+
+class Contract(db.Model):
+    """Content-addressed contract text, stored once however many sessions use it."""
+    __tablename__ = 'contracts'
+    id = db.Column(db.String(64), primary_key=True)  # sha256 of the normalized text
+    compressed_text = db.deferred(db.Column(db.LargeBinary, nullable=False))  # zlib, loaded on first access
+    size = db.Column(db.Integer, nullable=False)  # uncompressed length in characters
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @property
+    def text(self):
+        return zlib.decompress(self.compressed_text).decode('utf-8')
+
+class QuestionFrequency(db.Model):
+    """Materialized question counts, maintained as questions are saved.
+
+    Rows with user_id == GLOBAL_QUESTION_SCOPE hold the counts across all users.
+    """
+    __tablename__ = 'question_frequencies'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, default=0)  # 0 = global scope
+    question_hash = db.Column(db.String(64), nullable=False)  # sha256 of the normalized question
+    question = db.Column(db.Text, nullable=False)
+    response = db.Column(db.Text)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'question_hash', name='uq_question_frequencies_user_hash'),
+        db.Index('ix_question_frequencies_user_count', 'user_id', 'count'),
+    )
+
+GLOBAL_QUESTION_SCOPE = 0
+
+class AnalysisRecord(db.Model):
+    """Analysis history: combined /analyze results plus each shadow/summary run."""
+    __tablename__ = 'analyses'
+    id = db.Column(db.String(36), primary_key=True)  # UUID as string
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    contract_text = db.Column(db.Text, nullable=False)
+    contract_id = db.Column(db.String(64), db.ForeignKey('contracts.id'), nullable=False)
+    stage = db.Column(db.String(20), nullable=False, default='combined')
     language = db.Column(db.String(10), default='en')
+    payload = db.deferred(db.Column(db.LargeBinary, nullable=False))  # zlib-compressed JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_analyses_user_created', 'user_id', 'created_at'),
+        db.Index('ix_analyses_user_contract_stage_created', 'user_id', 'contract_id', 'stage', 'created_at'),
+    )
+
+    def to_summary(self):
+        return {
+            'id': self.id,
+            'contract_id': self.contract_id,
+            'stage': self.stage,
+            'language': self.language,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class DocumentExtraction(db.Model):
+    """Extraction result cache keyed by the SHA-256 of the uploaded file's bytes and the language.
+
+    The language is part of the key because OCR and vision prompts use it.
+    """
+    __tablename__ = 'document_extractions'
+    file_hash = db.Column(db.String(64), primary_key=True)
+    language = db.Column(db.String(10), primary_key=True, default='en')
+    file_type = db.Column(db.String(20), nullable=False)
+    size = db.Column(db.Integer, nullable=False)  # bytes of the uploaded file
+    compressed_text = db.deferred(db.Column(db.LargeBinary, nullable=False))  # zlib, exact extracted text
+    pages = db.Column(db.Text, nullable=False, default='[]')  # JSON [[start, end, scanned], ...]
+    clauses = db.Column(db.Text, nullable=False, default='[]')  # JSON clause tree (offsets, no text)
+    incomplete = db.Column(db.Boolean, nullable=False, default=False)  # a scanned page came back empty; re-extracted on the next upload
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    messages = db.relationship('ChatHistory', backref='session', lazy=True)
\ No newline at end of file
+
+class ExtractionBatch(db.Model):
+    """A multi-file extraction request; progress lives in its items."""
+    __tablename__ = 'extraction_batches'
+    id = db.Column(db.String(36), primary_key=True)  # UUID as string
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    language = db.Column(db.String(10), default='en')
+    worker_pid = db.Column(db.Integer)  # process whose thread pool runs the items
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    items = db.relationship('ExtractionBatchItem', backref='batch', lazy=True, order_by='ExtractionBatchItem.position')
+
+class ExtractionBatchItem(db.Model):
+    __tablename__ = 'extraction_batch_items'
+    id = db.Column(db.Integer, primary_key=True)
+    batch_id = db.Column(db.String(36), db.ForeignKey('extraction_batches.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    file_hash = db.Column(db.String(64), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, done, failed
+    cached = db.Column(db.Boolean, default=False)
+    error = db.Column(db.Text)
+    finished_at = db.Column(db.DateTime)
+
+class SchemaMigration(db.Model):
+    """Versions applied by migrations.py."""
+    __tablename__ = 'schema_migrations'
+    version = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
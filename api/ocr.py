@@ -0,0 +1,102 @@
+# api/ocr.py
+import logging
+from functools import lru_cache
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+import numpy as np
+from PIL import Image, ImageOps
+import fitz  # PyMuPDF
+from pdf_engine import submit
+
+logger = logging.getLogger(__name__)
+
+TARGET_DPI = 300  # Tesseract is most accurate at roughly 300 dpi
+MAX_SIDE = 5000  # pixels; bounds memory for huge scans
+DESKEW_MAX_ANGLE = 5.0  # degrees searched either side of level
+DEFAULT_SOURCE_DPI = 150  # assumed for images without DPI metadata
+
+# ISO 639-1 codes used across the app -> Tesseract traineddata names
+TESSERACT_LANGUAGES = {
+    'en': 'eng', 'it': 'ita', 'de': 'deu', 'fr': 'fra', 'es': 'spa',
+    'pt': 'por', 'nl': 'nld', 'pl': 'pol', 'ro': 'ron'
+}
+
+@lru_cache(maxsize=1)
+def ocr_available() -> bool:
+    """True if pytesseract and the tesseract binary are both installed."""
+    try:
+        import pytesseract
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception as e:
+        logger.info(f"Local OCR unavailable: {str(e)}")
+        return False
+
+def tesseract_language(lang: str) -> str:
+    return '+'.join(dict.fromkeys([TESSERACT_LANGUAGES.get(lang, 'eng'), 'eng']))
+
+def skew_angle(image: Image.Image) -> float:
+    """Rotation (degrees) that makes text lines horizontal, by projection profile.
+
+    Text rows give a spiky horizontal projection when level; the angle with
+    the highest variance of row sums wins. Searched coarse-to-fine on a
+    downsampled, inverted copy so it stays cheap on 300 dpi pages.
+    """
+    small = ImageOps.invert(image.convert('L'))
+    small.thumbnail((1000, 1000))
+
+    def score(angle: float) -> float:
+        rotated = np.asarray(small.rotate(angle, resample=Image.BILINEAR, fillcolor=0), dtype=np.float32)
+        return float(np.var(rotated.sum(axis=1)))
+
+    best = max(np.arange(-DESKEW_MAX_ANGLE, DESKEW_MAX_ANGLE + 0.01, 1.0), key=score)
+    best = max(np.arange(best - 0.9, best + 0.91, 0.1), key=score)
+    return round(float(best), 1)
+
+def preprocess(image: Image.Image, source_dpi: Optional[float] = None) -> Image.Image:
+    """Grayscale, normalize to TARGET_DPI, stretch contrast and deskew."""
+    image = ImageOps.exif_transpose(image).convert('L')
+    scale = TARGET_DPI / (source_dpi or DEFAULT_SOURCE_DPI)
+    scale = min(scale, MAX_SIDE / max(image.size))
+    if abs(scale - 1.0) > 0.05:
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.LANCZOS)
+    image = ImageOps.autocontrast(image, cutoff=1)
+    angle = skew_angle(image)
+    if angle:
+        image = image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+    return image
+
+def render_page(path: str, number: int) -> Image.Image:
+    """Render one PDF page straight to grayscale at TARGET_DPI."""
+    with fitz.open(path) as doc:
+        pixmap = doc[number].get_pixmap(dpi=TARGET_DPI, colorspace=fitz.csGRAY)
+    return Image.frombytes('L', (pixmap.width, pixmap.height), pixmap.samples)
+
+def _ocr_task(path: str, number: Optional[int], lang: str) -> str:
+    """Runs in a pool worker: render (or load), preprocess and OCR one page"""
+    import pytesseract
+    if number is None:
+        with Image.open(path) as image:
+            dpi = image.info.get('dpi', (None,))[0]
+            prepared = preprocess(image, dpi)
+    else:
+        prepared = preprocess(render_page(path, number), TARGET_DPI)
+    return pytesseract.image_to_string(prepared, lang=tesseract_language(lang))
+
+def ocr_pdf_pages(path: str, numbers: List[int], lang: str = 'en') -> Dict[int, str]:
+    """OCR the given PDF pages concurrently; pages that fail map to ''."""
+    futures = {number: submit(_ocr_task, path, number, lang) for number in numbers}
+    return {number: _result(future, f'page {number + 1}') for number, future in futures.items()}
+
+def ocr_image(path: str, lang: str = 'en') -> str:
+    """OCR an image file after preprocessing; '' on failure."""
+    return _result(submit(_ocr_task, path, None, lang), 'image')
+
+def _result(future: Future, label: str) -> str:
+    # OCR runs in the document pool even for one page, keeping the
+    # seconds of CPU work off the request thread's GIL
+    try:
+        return future.result()
+    except Exception as e:
+        logger.error(f"OCR failed for {label}: {str(e)}")
+        return ""
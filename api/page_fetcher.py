@@ -0,0 +1,213 @@
+# api/page_fetcher.py
+import io
+import os
+import re
+import time
+import codecs
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterator, List
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+import pdfplumber
+
+logger = logging.getLogger(__name__)
+
+FETCH_WORKERS = int(os.getenv('FETCH_WORKERS', '8'))
+FETCH_PER_HOST = int(os.getenv('FETCH_PER_HOST', '2'))  # concurrent requests to one host
+FETCH_BUDGET_SECONDS = float(os.getenv('FETCH_BUDGET_SECONDS', '12'))  # wall clock for a whole batch
+CONNECT_TIMEOUT = 4.0
+READ_TIMEOUT = 8.0
+MAX_HTML_BYTES = int(os.getenv('FETCH_MAX_HTML_KB', '2048')) * 1024
+MAX_PDF_BYTES = int(os.getenv('FETCH_MAX_PDF_KB', '15360')) * 1024
+MAX_PDF_PAGES = 40
+MAX_TEXT_CHARS = 100_000  # more than relevance scoring and summaries ever use
+CHUNK_SIZE = 64 * 1024
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+class PageFetcher:
+    """Fetches many pages concurrently over one keep-alive connection pool.
+
+    At most FETCH_WORKERS pages are in flight, at most FETCH_PER_HOST of them
+    per host, and fetch_all returns when every page is done or the time
+    budget runs out, whichever comes first. Pages still pending at the
+    deadline are dropped; the ones already running finish in the background
+    (bounded by the per-request timeouts) and their results are discarded.
+    """
+
+    def __init__(self, workers: int = FETCH_WORKERS, per_host: int = FETCH_PER_HOST):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=max(workers, 4))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = USER_AGENT
+        self.timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+        self.per_host = per_host
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='page-fetch')
+        self._hosts: Dict[str, threading.BoundedSemaphore] = {}
+        self._hosts_lock = threading.Lock()
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc.lower()
+        with self._hosts_lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return self._hosts[host]
+
+    def _run(self, fetch: Callable[[str], str], url: str, deadline: float) -> str:
+        slot = self._host_slot(url)
+        if not slot.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            return ""
+        try:
+            if time.monotonic() >= deadline:
+                return ""
+            return fetch(url)
+        finally:
+            slot.release()
+
+    def fetch_all(self, urls: List[str], fetch: Callable[[str], str],
+                  budget: float = FETCH_BUDGET_SECONDS) -> Dict[str, str]:
+        """{url: content} for the pages that finished within the budget."""
+        started = time.monotonic()
+        deadline = started + budget
+        pending = {self._executor.submit(self._run, fetch, url, deadline): url for url in dict.fromkeys(urls)}
+        results: Dict[str, str] = {}
+        while pending:
+            done, _ = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                url = pending.pop(future)
+                try:
+                    results[url] = future.result()
+                except Exception as e:
+                    logger.warning(f"Failed to fetch content from {url}: {e}")
+                    results[url] = ""
+        for future, url in pending.items():
+            future.cancel()
+            logger.info(f"Dropped {url}: not fetched within {budget:.0f}s")
+        logger.debug(f"Fetched {len(results)}/{len(results) + len(pending)} pages in {time.monotonic() - started:.2f}s")
+        return results
+
+class ResponseTooLarge(Exception):
+    pass
+
+def iter_capped(response: requests.Response, max_bytes: int, truncate: bool = False) -> Iterator[bytes]:
+    """Body chunks of a streamed response, at most max_bytes in total.
+
+    Past the limit the body is cut off if truncate is set, otherwise
+    ResponseTooLarge is raised (before downloading anything when the
+    declared Content-Length is already too large).
+    """
+    length = response.headers.get('Content-Length')
+    if not truncate and length and length.isdigit() and int(length) > max_bytes:
+        raise ResponseTooLarge(f"{length} bytes declared, limit {max_bytes}")
+    received = 0
+    for chunk in response.iter_content(CHUNK_SIZE):
+        if received + len(chunk) > max_bytes:
+            if not truncate:
+                raise ResponseTooLarge(f"over {max_bytes} bytes")
+            chunk = chunk[:max_bytes - received]
+            if chunk:
+                yield chunk
+            logger.info(f"Truncated {response.url} at {max_bytes} bytes")
+            return
+        received += len(chunk)
+        yield chunk
+
+class _TextCollector(HTMLParser):
+    """Visible text of an HTML page, like soup.get_text(' ', strip=True) after
+    removing script/style/nav/footer/header elements."""
+
+    SKIPPED = {'script', 'style', 'nav', 'footer', 'header', 'noscript', 'template'}
+
+    def __init__(self):
+        super().__init__()
+        self.parts: List[str] = []
+        self.chars = 0
+        self._skipping: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED:
+            self._skipping.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self._skipping:
+            while self._skipping and self._skipping.pop() != tag:
+                pass
+
+    def handle_data(self, data):
+        if not self._skipping:
+            text = data.strip()
+            if text:
+                self.parts.append(text)
+                self.chars += len(text) + 1
+
+    def text(self) -> str:
+        return ' '.join(self.parts)
+
+META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([A-Za-z0-9_\-]+)', re.IGNORECASE)
+
+def _html_encoding(response: requests.Response, head: bytes) -> str:
+    """Header charset, else a <meta charset> in the first chunk, else UTF-8."""
+    content_type = response.headers.get('Content-Type', '')
+    if 'charset=' in content_type.lower():
+        return content_type.lower().split('charset=')[-1].split(';')[0].strip(' "\'')
+    match = META_CHARSET.search(head)
+    return match.group(1).decode('ascii') if match else 'utf-8'
+
+def html_text(response: requests.Response, max_bytes: int = MAX_HTML_BYTES,
+              max_chars: int = MAX_TEXT_CHARS) -> str:
+    """Parse a streamed HTML response incrementally, stopping at max_chars of text.
+
+    Pages larger than max_bytes are cut off there rather than rejected: the
+    text seen so far is still useful.
+    """
+    collector = _TextCollector()
+    decoder = None
+    for chunk in iter_capped(response, max_bytes, truncate=True):
+        if decoder is None:
+            try:
+                decoder = codecs.getincrementaldecoder(_html_encoding(response, chunk))(errors='replace')
+            except LookupError:
+                decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        collector.feed(decoder.decode(chunk))
+        if collector.chars >= max_chars:
+            break
+    collector.close()
+    return collector.text()[:max_chars]
+
+def pdf_text(response: requests.Response, max_bytes: int = MAX_PDF_BYTES,
+             max_pages: int = MAX_PDF_PAGES, max_chars: int = MAX_TEXT_CHARS) -> str:
+    """Text of a streamed PDF parsed from memory; '' if it is over max_bytes.
+
+    A PDF's cross-reference table is at the end, so a truncated download
+    cannot be parsed and oversized files are skipped instead.
+    """
+    buffer = io.BytesIO()
+    try:
+        for chunk in iter_capped(response, max_bytes):
+            buffer.write(chunk)
+    except ResponseTooLarge as e:
+        logger.info(f"Skipped PDF {response.url}: {str(e)}")
+        return ""
+    buffer.seek(0)
+    parts = []
+    chars = 0
+    with pdfplumber.open(buffer) as pdf:
+        for page in pdf.pages[:max_pages]:
+            text = page.extract_text() or ""
+            parts.append(text)
+            chars += len(text)
+            if chars >= max_chars:
+                break
+    return " ".join(parts).strip()[:max_chars]
+
+def is_pdf(url: str, response: requests.Response) -> bool:
+    return url.lower().endswith('.pdf') or 'application/pdf' in response.headers.get('Content-Type', '').lower()
+
+page_fetcher = PageFetcher()
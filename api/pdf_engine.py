@@ -0,0 +1,131 @@
+# api/pdf_engine.py
+import os
+import atexit
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, NamedTuple, Optional, Tuple
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+MIN_PAGE_TEXT_CHARS = 20  # fewer characters than this on an image page means no text layer
+PARALLEL_MIN_PAGES = 16  # below this, process start-up costs more than it saves
+MAX_WORKERS = int(os.getenv('PDF_WORKERS', '0')) or min(os.cpu_count() or 1, 8)
+
+class PageText(NamedTuple):
+    number: int  # 0-based page index
+    text: str
+    start: int  # offset of the page's first character in the joined text
+    end: int
+    scanned: bool  # no text layer; text came from OCR or the vision model
+
+def _extract_range(path: str, start: int, stop: int) -> List[Tuple[int, str, bool]]:
+    """Runs in a pool worker: each worker opens its own handle on the file"""
+    pages = []
+    with fitz.open(path) as doc:
+        for number in range(start, stop):
+            page = doc[number]
+            text = page.get_text()
+            scanned = len(text.strip()) < MIN_PAGE_TEXT_CHARS and bool(page.get_images())
+            pages.append((number, text, scanned))
+    return pages
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+def _mp_context():
+    # fork while this process has a single thread (start_pool runs at startup):
+    # spawn and forkserver re-import the app's __main__, and with it the database
+    # setup and scheduler, in every worker. Once other threads run, a forked child
+    # can inherit a lock one of them held (logging, SQLite) and hang, so later pools
+    # come from the forkserver. Workers only run PyMuPDF and OCR.
+    methods = multiprocessing.get_all_start_methods()
+    if 'fork' in methods and threading.active_count() == 1:
+        return multiprocessing.get_context('fork')
+    if 'forkserver' in methods:
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context()
+
+def get_pool() -> ProcessPoolExecutor:
+    """Shared process pool for CPU-bound document work (PDF text, OCR).
+
+    A pool whose worker died (killed, out of memory, crashed in MuPDF) is
+    broken for good, so it is replaced rather than returned.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid() and _pool._broken:
+            logger.warning(f"Replacing broken process pool: {_pool._broken}")
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=_mp_context())
+            _pool_pid = os.getpid()
+        return _pool
+
+def submit(fn: Callable, *args) -> Future:
+    """Submit to the shared pool, retrying once on a fresh pool if it broke meanwhile"""
+    try:
+        return get_pool().submit(fn, *args)
+    except BrokenProcessPool:
+        return get_pool().submit(fn, *args)
+
+def start_pool() -> None:
+    """Start the shared pool's workers now, before the process starts any threads"""
+    submit(os.getpid).result()
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+atexit.register(shutdown_pool)
+
+def page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """Contiguous ranges, two per worker so a slow range does not idle the rest"""
+    chunks = max(1, min(page_count, workers * 2))
+    size = -(-page_count // chunks)
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+def extract_pages(path: str, workers: Optional[int] = None) -> List[Tuple[int, str, bool]]:
+    """(page number, text, scanned) for every page, in order.
+
+    Documents of PARALLEL_MIN_PAGES pages or more are split into page ranges
+    extracted in a shared process pool, keeping the CPU work off the request
+    thread's GIL and spreading it across cores.
+    """
+    workers = workers or MAX_WORKERS
+    with fitz.open(path) as doc:
+        page_count = doc.page_count
+    if workers <= 1 or page_count < PARALLEL_MIN_PAGES:
+        return _extract_range(path, 0, page_count)
+
+    if workers != MAX_WORKERS:
+        # Explicit worker counts (benchmarks) get a pool of exactly that size
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context()) as pool:
+            return _gather(pool.submit, path, page_count, workers)
+    return _gather(submit, path, page_count, workers)
+
+def _gather(submit_to: Callable[..., Future], path: str, page_count: int, workers: int) -> List[Tuple[int, str, bool]]:
+    futures = [submit_to(_extract_range, path, start, stop) for start, stop in page_ranges(page_count, workers)]
+    pages = []
+    for future in futures:
+        pages.extend(future.result())
+    return pages
+
+def with_offsets(pages: List[Tuple[int, str, bool]]) -> List[PageText]:
+    result = []
+    offset = 0
+    for number, text, scanned in pages:
+        result.append(PageText(number, text, offset, offset + len(text), scanned))
+        offset += len(text)
+    return result
+
+def join_pages(pages: List[PageText]) -> str:
+    return "".join(page.text for page in pages)
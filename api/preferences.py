@@ -0,0 +1,273 @@
+# api/preferences.py
+import logging
+import struct
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Sequence, Tuple
+from models import db, User, Preference, PreferenceVector
+from database import write_behind
+
+logger = logging.getLogger(__name__)
+
+# Order matters: vectors are packed by index, so only ever append new areas.
+PREFERENCE_AREAS = (
+    'sick_leave', 'vacation', 'overtime', 'termination', 'confidentiality',
+    'non_compete', 'intellectual_property', 'governing_law', 'jurisdiction',
+    'dispute_resolution', 'liability', 'salary', 'benefits', 'work_hours',
+    'performance_evaluation', 'duties', 'responsibilities'
+)
+AREA_INDEX = {area: i for i, area in enumerate(PREFERENCE_AREAS)}
+
+DEFAULT_WEIGHT = 1.0
+MATCH_BOOST = 0.2
+DECAY_PER_EVENT = 0.05
+MIN_WEIGHT = 0.5
+MAX_WEIGHT = 5.0
+
+class PreferenceState:
+    """Decoded preference vector with lazy decay.
+
+    Every analyzed question is one event: matched areas gain MATCH_BOOST and all
+    others lose DECAY_PER_EVENT. Instead of rewriting every area, each area keeps
+    the event index of its last write and the decay since then is applied on read.
+    """
+    __slots__ = ('weights', 'last_events', 'event_count')
+
+    def __init__(self, weights: List[float], last_events: List[int], event_count: int = 0):
+        self.weights = weights
+        self.last_events = last_events
+        self.event_count = event_count
+
+    @classmethod
+    def default(cls) -> 'PreferenceState':
+        n = len(PREFERENCE_AREAS)
+        return cls([DEFAULT_WEIGHT] * n, [0] * n)
+
+    @classmethod
+    def from_row(cls, row: PreferenceVector) -> 'PreferenceState':
+        weights = list(struct.unpack(f'<{len(row.weights) // 4}f', row.weights))
+        last_events = list(struct.unpack(f'<{len(row.last_events) // 4}I', row.last_events))
+        # Areas appended after the vector was written start at the default weight
+        missing = len(PREFERENCE_AREAS) - len(weights)
+        if missing > 0:
+            weights.extend([DEFAULT_WEIGHT] * missing)
+            last_events.extend([row.event_count] * missing)
+        return cls(weights, last_events, row.event_count)
+
+    def _current(self, index: int) -> float:
+        elapsed = self.event_count - self.last_events[index]
+        weight = self.weights[index]
+        if elapsed <= 0 or weight <= MIN_WEIGHT:
+            return weight
+        return max(weight - DECAY_PER_EVENT * elapsed, MIN_WEIGHT)
+
+    def apply(self, matched: Iterable[int]) -> None:
+        """Apply one question event; only the matched areas are touched."""
+        for index in set(matched):
+            # Decay up to the previous event, then boost for this one
+            weight = self._current(index)
+            self.weights[index] = min(weight + MATCH_BOOST, MAX_WEIGHT)
+            self.last_events[index] = self.event_count + 1
+        self.event_count += 1
+
+    def effective_weights(self) -> Dict[str, float]:
+        return {area: self._current(i) for i, area in enumerate(PREFERENCE_AREAS)}
+
+    def pack(self) -> Dict:
+        n = len(self.weights)
+        return {
+            'weights': struct.pack(f'<{n}f', *self.weights),
+            'last_events': struct.pack(f'<{n}I', *self.last_events),
+            'event_count': self.event_count
+        }
+
+class PreferenceStore:
+    """Per-user preference vectors with batched write-back.
+
+    Question events are queued in memory and handed to the write-behind queue
+    once batch_size events are pending for a user, or once the oldest has waited
+    flush_interval seconds: checked on the user's next event and by flush_due(),
+    which the maintenance scheduler runs in every worker. Reads include pending and in-flight events, so callers never see
+    stale weights from their own process. Top-k choices are cached per user until the next
+    event recorded here; choices_ttl bounds staleness from other workers' writes.
+    """
+
+    def __init__(self, batch_size: int = 5, flush_interval: float = 30.0, choices_ttl: float = 300.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.choices_ttl = choices_ttl
+        self._pending: Dict[int, List[tuple]] = {}
+        self._pending_since: Dict[int, float] = {}
+        self._inflight: Dict[int, List[tuple]] = {}
+        self._choices_cache: Dict[int, Tuple[float, List[str]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, user_id: int, areas: Sequence[str]) -> None:
+        """Queue one question event for the user, flushing when the batch is full."""
+        matched = tuple(AREA_INDEX[a] for a in areas if a in AREA_INDEX)
+        now = time.monotonic()
+        with self._lock:
+            events = self._pending.setdefault(user_id, [])
+            events.append(matched)
+            since = self._pending_since.setdefault(user_id, now)
+            self._choices_cache.pop(user_id, None)
+            due = len(events) >= self.batch_size or now - since >= self.flush_interval
+        if due:
+            self.flush_user(user_id)
+
+    def get_weights(self, user_id: int) -> Dict[str, float]:
+        """Current weights for the user: one primary-key read plus pending events."""
+        row = PreferenceVector.query.get(user_id)
+        state = PreferenceState.from_row(row) if row else self._seed_state(user_id)
+        with self._lock:
+            pending = self._inflight.get(user_id, []) + self._pending.get(user_id, [])
+        for matched in pending:
+            state.apply(matched)
+        return state.effective_weights()
+
+    def top_areas(self, user_id: int, k: int = 5) -> List[str]:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._choices_cache.get(user_id)
+        if cached and now - cached[0] < self.choices_ttl:
+            return cached[1][:k]
+
+        weights = self.get_weights(user_id)
+        # sorted is stable, so ties keep PREFERENCE_AREAS order
+        ranked = sorted(PREFERENCE_AREAS, key=weights.__getitem__, reverse=True)
+        with self._lock:
+            self._choices_cache[user_id] = (now, ranked)
+        return ranked[:k]
+
+    def invalidate(self, user_id: int) -> None:
+        """Drop cached choices for the user (e.g. after writing preferences elsewhere)."""
+        with self._lock:
+            self._choices_cache.pop(user_id, None)
+
+    def flush_user(self, user_id: int) -> None:
+        with self._lock:
+            events = self._pending.pop(user_id, None)
+            self._pending_since.pop(user_id, None)
+            if events:
+                self._inflight.setdefault(user_id, []).extend(events)
+        if events:
+            outcome = {}
+            try:
+                write_behind.submit(
+                    lambda: outcome.update(written=self._write_events(user_id, events)),
+                    on_done=lambda committed: self._settle(user_id, events, committed, outcome.get('written', False))
+                )
+            except Exception as e:
+                logger.error(f"Could not queue preference write for user_id {user_id}: {str(e)}")
+                self._settle(user_id, events, False, False)
+
+    def flush_due(self) -> int:
+        """Write back batches that have waited flush_interval seconds; returns the users flushed."""
+        cutoff = time.monotonic() - self.flush_interval
+        with self._lock:
+            user_ids = [user_id for user_id, since in self._pending_since.items() if since <= cutoff]
+        for user_id in user_ids:
+            self.flush_user(user_id)
+        return len(user_ids)
+
+    def flush(self) -> None:
+        """Write back every pending batch (e.g. at shutdown)."""
+        with self._lock:
+            user_ids = list(self._pending)
+        for user_id in user_ids:
+            self.flush_user(user_id)
+
+    def _seed_state(self, user_id: int) -> PreferenceState:
+        """Initial vector for a user: legacy per-area rows if any, else defaults."""
+        state = PreferenceState.default()
+        for pref in Preference.query.filter_by(user_id=user_id).all():
+            index = AREA_INDEX.get(pref.area)
+            if index is not None and pref.weight is not None:
+                state.weights[index] = pref.weight
+        return state
+
+    def _write_events(self, user_id: int, events: List[tuple]) -> bool:
+        """Fold events into the stored vector (runs inside a write-behind batch).
+
+        The update is guarded by event_count and returns False if another
+        worker wrote first, in which case nothing is written.
+        """
+        row = PreferenceVector.query.get(user_id)
+        state = PreferenceState.from_row(row) if row else self._seed_state(user_id)
+        expected = state.event_count
+        for matched in events:
+            state.apply(matched)
+        values = state.pack()
+        values['last_updated'] = datetime.utcnow()
+        if row is None:
+            db.session.add(PreferenceVector(user_id=user_id, **values))
+            return True
+        updated = PreferenceVector.query.filter_by(
+            user_id=user_id, event_count=expected
+        ).update(values, synchronize_session=False)
+        db.session.expire(row)
+        return bool(updated)
+
+    def pending_events(self) -> int:
+        """Events not yet written back (pending or in flight)."""
+        with self._lock:
+            return sum(map(len, self._pending.values())) + sum(map(len, self._inflight.values()))
+
+    def _settle(self, user_id: int, events: List[tuple], committed: bool, written: bool) -> None:
+        """Move events out of in-flight; unwritten ones go back to pending for the next flush.
+
+        committed is False when the write failed for any reason, written is
+        False when another worker wrote first; either way nothing is lost.
+        """
+        with self._lock:
+            inflight = self._inflight.get(user_id, [])
+            del inflight[:len(events)]
+            if not inflight:
+                self._inflight.pop(user_id, None)
+            if not (committed and written):
+                if committed:
+                    logger.debug(f"Preference write for user_id {user_id} not applied, requeueing {len(events)} events")
+                else:
+                    logger.warning(f"Preference write for user_id {user_id} failed, requeueing {len(events)} events")
+                self._pending.setdefault(user_id, [])[:0] = events
+                self._pending_since.setdefault(user_id, time.monotonic())
+            self._choices_cache.pop(user_id, None)
+
+def init_preference_vectors(batch_size: int = 500) -> int:
+    """Create missing preference vectors for all users, seeding from legacy rows.
+
+    Walks the users table by primary key in batches so memory stays flat;
+    returns the number of vectors created.
+    """
+    created = 0
+    last_id = 0
+    while True:
+        user_ids = [
+            user_id for (user_id,) in db.session.query(User.id)
+            .outerjoin(PreferenceVector, PreferenceVector.user_id == User.id)
+            .filter(User.id > last_id, PreferenceVector.user_id.is_(None))
+            .order_by(User.id)
+            .limit(batch_size)
+        ]
+        if not user_ids:
+            break
+        states = {user_id: PreferenceState.default() for user_id in user_ids}
+        legacy = Preference.query.filter(Preference.user_id.in_(user_ids)).all()
+        for pref in legacy:
+            index = AREA_INDEX.get(pref.area)
+            if index is not None and pref.weight is not None:
+                states[pref.user_id].weights[index] = pref.weight
+        now = datetime.utcnow()
+        db.session.bulk_insert_mappings(PreferenceVector, [
+            dict(user_id=user_id, last_updated=now, **state.pack())
+            for user_id, state in states.items()
+        ])
+        db.session.commit()
+        created += len(user_ids)
+        last_id = user_ids[-1]
+    logger.info(f"Initialized {created} preference vectors")
+    return created
+
+# Shared by every QuestionAnalyzerAgent in the process so batches are not split
+preference_store = PreferenceStore()
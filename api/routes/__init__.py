@@ -6,4 +6,5 @@ from .shadow_routes import shadow_bp
 from .summary_routes import summary_bp
 from .evaluator_routes import evaluator_bp
 from .translator_routes import translator_bp
-from .web_search_routes import web_search_bp
\ No newline at end of file
+from .web_search_routes import web_search_bp
+from .analysis_routes import analysis_bp
\ No newline at end of file
@@ -0,0 +1,54 @@
+# api/routes/analysis_routes.py
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from sqlalchemy.exc import SQLAlchemyError
+from analysis_store import decode_payload, list_analyses, load_analysis_record
+from contracts import load_contract_text
+import logging
+
+analysis_bp = Blueprint('analysis', __name__)
+logger = logging.getLogger(__name__)
+
+MAX_PER_PAGE = 50
+
+@analysis_bp.route('/', methods=['GET'])
+@login_required
+def list_history():
+    """List the current user's past analyses, newest first"""
+    try:
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 20, type=int), 1), MAX_PER_PAGE)
+        history = list_analyses(
+            user_id=current_user.id,
+            page=page,
+            per_page=per_page,
+            stage=request.args.get('stage'),
+            contract_id=request.args.get('contract_id')
+        )
+        return jsonify({'status': 'success', **history})
+    except SQLAlchemyError as e:
+        logger.error(f"Database error listing analyses: {str(e)}")
+        return jsonify({'status': 'error', 'error': 'Database error'}), 500
+    except Exception as e:
+        logger.error(f"Failed to list analyses: {str(e)}")
+        return jsonify({'status': 'error', 'error': str(e)}), 500
+
+@analysis_bp.route('/<analysis_id>', methods=['GET'])
+@login_required
+def get_analysis(analysis_id):
+    """Reopen a stored analysis without re-running the LLM"""
+    try:
+        record = load_analysis_record(analysis_id, current_user.id)
+        if record is None:
+            return jsonify({'status': 'error', 'error': 'Analysis not found'}), 404
+        analysis = decode_payload(record)
+        analysis['analysis_id'] = analysis_id
+        # From the row: shadow and summary payloads do not carry contract_id
+        analysis['document_text'] = load_contract_text(record.contract_id)
+        return jsonify({'status': 'success', 'analysis': analysis})
+    except SQLAlchemyError as e:
+        logger.error(f"Database error loading analysis {analysis_id}: {str(e)}")
+        return jsonify({'status': 'error', 'error': 'Database error'}), 500
+    except Exception as e:
+        logger.error(f"Failed to load analysis {analysis_id}: {str(e)}")
+        return jsonify({'status': 'error', 'error': str(e)}), 500
@@ -7,7 +7,10 @@ from datetime import datetime
 import requests
 from requests.exceptions import RequestException
 from models import db, ChatHistory, ChatSession
-from agents.question_analyzer_agent import QuestionAnalyzerAgent
+from contracts import store_contract
+from analysis_store import load_analysis
+from database import write_behind
+from agents.question_analyzer_agent import get_question_analyzer
 import os
 from dotenv import load_dotenv
 from sqlalchemy.exc import SQLAlchemyError
@@ -24,8 +27,8 @@ if not OPENROUTER_API_KEY:
     raise ValueError("OPENROUTER_API_KEY not found in .env file")
 OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
 
-# Initialize QuestionAnalyzerAgent
-question_analyzer = QuestionAnalyzerAgent()
+# Shared QuestionAnalyzerAgent (same instance as the shadow and summary agents)
+question_analyzer = get_question_analyzer()
 
 @chat_bp.route('/start', methods=['POST'])
 @login_required
@@ -41,11 +44,11 @@ def start_chat():
         language = data.get('language', 'en')
         session_id = str(uuid.uuid4())
 
-        # Store session in database
+        # Store session in database; the contract itself is stored once and shared
         chat_session = ChatSession(
             id=session_id,
             user_id=current_user.id,
-            contract_text=data['contract_text'],
+            contract_id=store_contract(data['contract_text']),
             language=language
         )
         db.session.add(chat_session)
@@ -84,25 +87,18 @@ def send_message():
             return jsonify({'status': 'error', 'error': 'No active chat session or unauthorized access'}), 400
 
         question = data['message']
-        contract_text = chat_session.contract_text
         language = chat_session.language
 
-        # Save question to database
-        chat_history = ChatHistory(
-            user_id=current_user.id,
-            session_id=session_id,
-            question=question
-        )
-        db.session.add(chat_history)
-        db.session.commit()
+        user_id = current_user.id
+        asked_at = datetime.utcnow()
 
         # Update preferences
         question_analyzer.analyze(user_id=current_user.id, question=question)
 
-        # Include analysis results if available
+        # Include analysis results if available (loaded from the server-side store)
         analysis_context = ''
-        if 'english_analysis_results' in session:
-            analysis = session['english_analysis_results']
+        analysis = load_analysis(session.get('analysis_id'), current_user.id)
+        if analysis:
             analysis_context = (
                 f"\n\nPrevious Analysis Results:\n"
                 f"Summary: {analysis.get('summary', '')}\n"
@@ -110,7 +106,8 @@ def send_message():
                 f"Evaluation: {str(analysis.get('evaluation', ''))}"
             )
 
-        # Prepare prompt
+        # Prepare prompt (the contract is only decompressed here)
+        contract_text = chat_session.contract_text
         prompt = (
             "You are an expert in analyzing employment contracts under Italian law. "
             "Based on the following contract text and any provided analysis results, answer the user's question clearly and concisely in the requested language. "
@@ -143,15 +140,16 @@ def send_message():
             choices = response.json().get('choices', [])
             if not choices or not choices[0].get('message', {}).get('content'):
                 logger.error("Invalid OpenRouter API response structure")
+                _queue_chat_history(user_id, session_id, question, asked_at)
                 return jsonify({'status': 'error', 'error': 'Invalid API response'}), 500
             chat_response = choices[0]['message']['content'].strip()
         except RequestException as e:
             logger.error(f"OpenRouter API error: {str(e)}")
+            _queue_chat_history(user_id, session_id, question, asked_at)
             return jsonify({'status': 'error', 'error': 'Unable to process question due to API error'}), 500
 
-        # Save response
-        chat_history.response = chat_response
-        db.session.commit()
+        # Save question and response in one write-behind op
+        _queue_chat_history(user_id, session_id, question, asked_at, chat_response)
 
         logger.info(f"Processed message for session: {session_id}")
         return jsonify({'status': 'success', 'response': chat_response})
@@ -164,6 +162,25 @@ def send_message():
         logger.error(f"Failed to process chat message: {str(e)}")
         return jsonify({'status': 'error', 'error': str(e)}), 500
 
+def _queue_chat_history(user_id: int, session_id: str, question: str, asked_at: datetime, response: str = None,
+                        on_done=None):
+    """Save a question (and its response, if any) through the write-behind queue.
+
+    on_done(committed) is passed on to write_behind.submit.
+    """
+    def save():
+        db.session.add(ChatHistory(
+            user_id=user_id,
+            session_id=session_id,
+            question=question,
+            response=response,
+            asked_at=asked_at
+        ))
+        question_analyzer.record_question(user_id=user_id, question=question)
+        if response:
+            question_analyzer.record_response(user_id=user_id, question=question, response=response)
+    write_behind.submit(save, on_done=on_done)
+
 @chat_bp.route('/update_language', methods=['POST'])
 @login_required
 def update_language():
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify, current_app
-from werkzeug.utils import secure_filename
+from flask_login import current_user
 from agents.document_extractor import DocumentExtractor
+from clauses import with_text
+from extractions import spooled_upload, extract_cached, spool_upload, discard_upload, submit_batch, get_batch
 import os
 import logging
 from pathlib import Path
@@ -9,6 +11,8 @@ document_bp = Blueprint('document', __name__)
 document_extractor = DocumentExtractor()
 logger = logging.getLogger(__name__)
 
+MAX_BATCH_FILES = 50
+
 @document_bp.route('/extract', methods=['POST'])
 def extract_text():
     """Extract text from uploaded document"""
@@ -31,40 +35,90 @@ def extract_text():
             logger.error("Invalid file")
             return jsonify({'error': 'Invalid file'}), 400
 
-        # Create temp directory if it doesn't exist
         temp_dir = Path(current_app.instance_path) / 'uploads'
-        temp_dir.mkdir(parents=True, exist_ok=True)
-
-        filename = secure_filename(file.filename)
-        temp_path = temp_dir / filename
+        language = request.form.get('language', 'en')
 
         try:
-            # Save uploaded file
-            file.save(str(temp_path))
-            logger.debug(f"File saved to {temp_path}")
+            # Stream to a unique temp file, hashing as it goes; duplicates hit the cache
+            with spooled_upload(file, str(temp_dir)) as upload:
+                logger.debug(f"Spooled {upload.filename} ({upload.size} bytes, sha256 {upload.sha256[:12]})")
+                extraction, cached = extract_cached(document_extractor, upload, language)
 
-            # Extract text
-            language = request.form.get('language', 'en')
-            extracted_text = document_extractor.extract_text(str(temp_path), lang=language)
-
-            if not extracted_text:
+            if not extraction['text']:
                 raise ValueError("No text could be extracted from the document")
 
             return jsonify({
                 'status': 'success',
-                'text': extracted_text
+                'text': extraction['text'],
+                'clauses': with_text(extraction['clauses'], extraction['text']),
+                'file_hash': upload.sha256,
+                'cached': cached
             })
 
         except Exception as e:
             logger.error(f"Extraction error: {str(e)}")
             return jsonify({'error': f'Text extraction failed: {str(e)}'}), 500
 
-        finally:
-            # Clean up the temporary file
-            if temp_path.exists():
-                temp_path.unlink()
-                logger.debug(f"Cleaned up temporary file {temp_path}")
-
     except Exception as e:
         logger.error(f"Request handling error: {str(e)}")
-        return jsonify({'error': str(e)}), 400
\ No newline at end of file
+        return jsonify({'error': str(e)}), 400
+
+@document_bp.route('/extract/batch', methods=['POST'])
+def extract_batch():
+    """Accept many files at once; extraction runs in the background, poll /batch/<batch_id>"""
+    try:
+        # A batch of contracts can exceed the single-upload limit
+        request.max_content_length = current_app.config.get('BATCH_MAX_CONTENT_LENGTH')
+        files = [file for file in request.files.getlist('files') if file and file.filename]
+        if not files:
+            logger.error("No files in batch request")
+            return jsonify({'error': 'No files provided'}), 400
+        if len(files) > MAX_BATCH_FILES:
+            return jsonify({'error': f'At most {MAX_BATCH_FILES} files per batch'}), 400
+        unsupported = [file.filename for file in files if not document_extractor.supports(file.filename)]
+        if unsupported:
+            return jsonify({'error': 'Unsupported file format', 'files': unsupported}), 400
+
+        temp_dir = str(Path(current_app.instance_path) / 'uploads')
+        uploads = []
+        try:
+            for file in files:
+                uploads.append(spool_upload(file, temp_dir))
+            batch_id = submit_batch(
+                current_app._get_current_object(),
+                document_extractor,
+                uploads,
+                lang=request.form.get('language', 'en'),
+                user_id=current_user.id if current_user.is_authenticated else None
+            )
+        except Exception:
+            for upload in uploads:
+                discard_upload(upload)
+            raise
+
+        return jsonify({
+            'status': 'accepted',
+            'batch_id': batch_id,
+            'files': len(uploads),
+            'distinct_files': len({upload.sha256 for upload in uploads})
+        }), 202
+
+    except Exception as e:
+        logger.error(f"Batch request handling error: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+
+@document_bp.route('/batch/<batch_id>', methods=['GET'])
+def batch_status(batch_id):
+    """Per-file status of a batch, with extracted text for finished files (omit with ?text=0)"""
+    try:
+        batch = get_batch(
+            batch_id,
+            user_id=current_user.id if current_user.is_authenticated else None,
+            include_text=request.args.get('text', '1') != '0'
+        )
+        if batch is None:
+            return jsonify({'error': 'Batch not found'}), 404
+        return jsonify({'status': 'success', **batch})
+    except Exception as e:
+        logger.error(f"Failed to load batch {batch_id}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
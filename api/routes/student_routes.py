@@ -37,7 +37,7 @@ def student_search():
 
         logger.debug(f"Received student search request: university={university}, category={category}, keywords={custom_keywords}, language={target_language}")
 
-        # Get university country (using Hipolabs API or similar)
+        # Get university country from the local university index
         country = student_agent.get_university_country(university)
         results = student_agent.search_university_info(
             university=university,
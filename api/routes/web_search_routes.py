@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from agents.web_search_agent import WebSearchAgent
+from search_cache import page_cache, search_cache
 import logging
 
 web_search_bp = Blueprint('web_search', __name__)
@@ -31,4 +32,12 @@ def focused_search():
         return jsonify({
             'status': 'error',
             'error': str(e)
-        }), 500
\ No newline at end of file
+        }), 500
+
+@web_search_bp.route('/search-cache/stats', methods=['GET'])
+def search_cache_stats():
+    """Hit rates and sizes of the search result and page caches in this worker"""
+    return jsonify({
+        'results': search_cache.stats(),
+        'pages': page_cache.stats()
+    })
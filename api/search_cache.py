@@ -0,0 +1,280 @@
+# api/search_cache.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_TTL = float(os.getenv('SEARCH_CACHE_TTL_HOURS', '24')) * 3600
+SEARCH_CACHE_MEMORY_ENTRIES = int(os.getenv('SEARCH_CACHE_MEMORY_ENTRIES', '256'))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', '5000'))
+SEARCH_CACHE_STORE = os.getenv('SEARCH_CACHE_STORE', 'sqlite')  # 'sqlite' or 'memory'
+SEARCH_CACHE_PATH = os.getenv('SEARCH_CACHE_PATH')  # default: search_cache.sqlite3 in the app's instance folder
+PAGE_CACHE_TTL = float(os.getenv('PAGE_CACHE_TTL_DAYS', '7')) * 86400
+PAGE_CACHE_FRESH = float(os.getenv('PAGE_CACHE_FRESH_SECONDS', '600'))  # served without revalidating
+PAGE_CACHE_MEMORY_ENTRIES = int(os.getenv('PAGE_CACHE_MEMORY_ENTRIES', '128'))
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv('PAGE_CACHE_MAX_ENTRIES', '2000'))
+TRIM_EVERY = 64  # puts between size-cap sweeps of the SQLite store
+
+def search_cache_key(query: str, keywords: List[str], min_matches: int, max_results: int) -> str:
+    """SHA-256 of the normalized search parameters.
+
+    Case and whitespace in the query and the order and case of keywords do
+    not change what focused_search returns, so they share an entry.
+    """
+    normalized = {
+        'q': ' '.join(query.casefold().split()),
+        'k': sorted({' '.join(k.casefold().split()) for k in keywords if k and k.strip()}),
+        'm': int(min_matches),
+        'n': int(max_results)
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode('utf-8')).hexdigest()
+
+class TTLCache:
+    """Thread-safe in-process LRU with a per-entry expiry."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class SqliteCacheStore:
+    """Key/value table in a WAL-mode SQLite file, shared by every worker process.
+
+    Reads refresh accessed_at, so the size cap evicts least-recently-used
+    entries; the cap is enforced every TRIM_EVERY puts and by purge(), so it
+    can be exceeded briefly. The file and table are created on first use.
+    One connection per thread and process.
+    """
+
+    def __init__(self, path: str, table: str, max_entries: int):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._puts = 0
+        self._created = False
+
+    def _connection(self) -> sqlite3.Connection:
+        # Keyed by pid too: a connection opened before a fork must not be used in the child
+        pid, conn = getattr(self._local, 'conn', (None, None))
+        if conn is None or pid != os.getpid():
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            except OSError as e:
+                raise sqlite3.OperationalError(f"cannot create {self.path}: {str(e)}") from e
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            if not self._created:
+                conn.execute(
+                    f'CREATE TABLE IF NOT EXISTS {self.table} ('
+                    'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+                )
+                conn.execute(f'CREATE INDEX IF NOT EXISTS ix_{self.table}_accessed_at ON {self.table} (accessed_at)')
+                self._created = True
+            self._local.conn = (os.getpid(), conn)
+        return conn
+
+    def get(self, key: str) -> Tuple[Optional[str], Optional[float]]:
+        """(value, expires_at); an expired row is deleted and returned as (None, expires_at)."""
+        conn = self._connection()
+        row = conn.execute(f'SELECT value, expires_at FROM {self.table} WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None, None
+        now = time.time()
+        if row[1] <= now:
+            conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+            return None, row[1]
+        conn.execute(f'UPDATE {self.table} SET accessed_at = ? WHERE key = ?', (now, key))
+        return row[0], row[1]
+
+    def put(self, key: str, value: str, ttl: float) -> int:
+        """Store a value; returns the number of entries evicted by the size cap."""
+        now = time.time()
+        self._connection().execute(
+            f'INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+            (key, value, now + ttl, now)
+        )
+        self._puts += 1
+        if self._puts % TRIM_EVERY == 0:
+            return self.purge()['evicted']
+        return 0
+
+    def purge(self) -> Dict[str, int]:
+        """Delete expired entries, then the least recently used beyond max_entries."""
+        conn = self._connection()
+        expired = conn.execute(f'DELETE FROM {self.table} WHERE expires_at <= ?', (time.time(),)).rowcount
+        evicted = conn.execute(
+            f'DELETE FROM {self.table} WHERE key IN ('
+            f'SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        ).rowcount
+        return {'expired': expired, 'evicted': evicted}
+
+    def __len__(self) -> int:
+        return self._connection().execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+class SearchCache:
+    """Two-tier cache for focused_search results with hit-rate metrics.
+
+    A per-process TTLCache sits in front of an optional SqliteCacheStore,
+    attached by init_app; store hits are copied into memory. Values are kept as JSON so callers
+    always get a fresh copy they may modify.
+    """
+
+    def __init__(self, ttl: float = SEARCH_CACHE_TTL, memory_entries: int = SEARCH_CACHE_MEMORY_ENTRIES,
+                 store: Optional[SqliteCacheStore] = None):
+        self.ttl = ttl
+        self.memory = TTLCache(memory_entries, ttl)
+        self.store = store
+        self.counts = {'memory_hits': 0, 'store_hits': 0, 'misses': 0, 'expired': 0, 'puts': 0, 'store_evictions': 0, 'errors': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counts[name] += n
+
+    def get(self, key: str) -> Optional[Dict]:
+        value = self.memory.get(key)
+        if value is not None:
+            self._count('memory_hits')
+            return json.loads(value)
+        if self.store is not None:
+            try:
+                value, expires_at = self.store.get(key)
+            except sqlite3.Error as e:
+                logger.warning(f"Search cache store read failed: {str(e)}")
+                self._count('errors')
+                value, expires_at = None, None
+            if value is not None:
+                self._count('store_hits')
+                self.memory.put(key, value, ttl=expires_at - time.time())
+                return json.loads(value)
+            if expires_at is not None:
+                self._count('expired')
+        self._count('misses')
+        return None
+
+    def put(self, key: str, result: Dict) -> None:
+        value = json.dumps(result)
+        self.memory.put(key, value)
+        self._count('puts')
+        if self.store is not None:
+            try:
+                self._count('store_evictions', self.store.put(key, value, self.ttl))
+            except sqlite3.Error as e:
+                logger.warning(f"Search cache store write failed: {str(e)}")
+                self._count('errors')
+
+    def purge(self) -> Dict[str, int]:
+        """Expire and size-cap the store (for the maintenance scheduler)."""
+        if self.store is None:
+            return {'expired': 0, 'evicted': 0}
+        result = self.store.purge()
+        self._count('store_evictions', result['evicted'])
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self.counts)
+        lookups = counts['memory_hits'] + counts['store_hits'] + counts['misses']
+        counts.update({
+            'lookups': lookups,
+            'hit_rate': round((counts['memory_hits'] + counts['store_hits']) / lookups, 4) if lookups else 0.0,
+            'memory_entries': len(self.memory),
+            'memory_evictions': self.memory.evictions,
+            'store': 'sqlite' if self.store is not None else None
+        })
+        if self.store is not None:
+            try:
+                counts['store_entries'] = len(self.store)
+            except sqlite3.Error:
+                counts['store_entries'] = None
+        return counts
+
+class PageCache(SearchCache):
+    """Extracted text of fetched pages with their HTTP validators.
+
+    Entries are {text, etag, last_modified, checked_at}. Within fresh_for
+    seconds of the last check a page is served without any request; after
+    that the fetcher revalidates with If-None-Match / If-Modified-Since and
+    a 304 reuses the stored text without downloading or parsing the page.
+    """
+
+    def __init__(self, ttl: float, fresh_for: float, memory_entries: int, store: Optional[SqliteCacheStore] = None):
+        super().__init__(ttl=ttl, memory_entries=memory_entries, store=store)
+        self.fresh_for = fresh_for
+        self.counts.update({'fresh': 0, 'not_modified': 0, 'modified': 0, 'bytes_downloaded': 0})
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        return self.get(self._key(url))
+
+    def is_fresh(self, entry: Dict) -> bool:
+        return time.time() - entry['checked_at'] < self.fresh_for
+
+    def conditional_headers(self, entry: Optional[Dict]) -> Dict[str, str]:
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def save(self, url: str, text: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        self.put(self._key(url), {'text': text, 'etag': etag, 'last_modified': last_modified, 'checked_at': time.time()})
+
+    def revalidated(self, url: str, entry: Dict) -> None:
+        """Record a 304: the stored text is current as of now."""
+        self.save(url, entry['text'], entry.get('etag'), entry.get('last_modified'))
+
+    def count(self, name: str, n: int = 1) -> None:
+        self._count(name, n)
+
+def init_app(app) -> None:
+    """Back both caches with a SQLite file in the app's instance folder (or SEARCH_CACHE_PATH).
+
+    Nothing is opened here; the file is created on the first cache read or write.
+    """
+    if SEARCH_CACHE_STORE != 'sqlite':
+        return
+    path = SEARCH_CACHE_PATH or os.path.join(app.instance_path, 'search_cache.sqlite3')
+    search_cache.store = SqliteCacheStore(path, 'search_results', SEARCH_CACHE_MAX_ENTRIES)
+    page_cache.store = SqliteCacheStore(path, 'page_content', PAGE_CACHE_MAX_ENTRIES)
+
+search_cache = SearchCache()
+page_cache = PageCache(PAGE_CACHE_TTL, PAGE_CACHE_FRESH, PAGE_CACHE_MEMORY_ENTRIES)
@@ -0,0 +1,152 @@
+# api/search_ranking.py
+import re
+import logging
+from itertools import islice
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+TITLE_WEIGHT = 3.0  # a title occurrence counts as this many body occurrences
+POLICY_TERM_WEIGHT = 0.3  # query weight of the expansion terms below
+SENTENCE_SEPARATOR = '. '
+POLICY_TERMS = ('policy', 'policies', 'regulation', 'regulations', 'guidelines', 'rules', 'regolamenti', 'regolamento')
+
+class Ranking(NamedTuple):
+    score: float
+    matched_keywords: List[str]
+
+class KeywordMatcher:
+    """Counts every term in a batch of pages with one compiled regex.
+
+    Terms match case-insensitively at the start of a word, so "rule" matches
+    "rules" but "rent" does not match "parent"; a phrase's words may be
+    separated by any whitespace. The pattern finds the word starts where any
+    term begins, and each term is an optional lookahead with an empty group
+    behind it, so every term starting there is counted ("housing" is counted
+    inside "student housing" too) and each page is scanned once.
+    """
+
+    def __init__(self, terms: Sequence[str]):
+        self.terms = list(dict.fromkeys(' '.join(t.lower().split()) for t in terms if t and t.strip()))
+        self.index = {term: i for i, term in enumerate(self.terms)}
+        patterns = [r'\s+'.join(re.escape(word) for word in term.split()) for term in self.terms]
+        self._pattern = re.compile(
+            r'(?<!\w)(?=' + '|'.join(patterns) + ')' + ''.join(f'(?:(?={p})())?' for p in patterns)
+        ) if patterns else None
+
+    def count_pages(self, pages: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(occurrences of each term per page, token count per page) for already-lowercased pages."""
+        counts = np.zeros((len(pages), len(self.terms)), dtype=np.float64)
+        tokens = np.array([len(page.split()) for page in pages], dtype=np.int64)
+        if self._pattern is not None:
+            for row, page in zip(counts, pages):
+                found = [0] * len(self.terms)
+                for match in self._pattern.finditer(page):
+                    for i, group in enumerate(match.groups()):
+                        if group is not None:
+                            found[i] += 1
+                row[:] = found
+        return counts, tokens
+
+    def counts(self, lowered: str) -> Tuple[np.ndarray, int]:
+        """(occurrences of each term, token count) for one already-lowercased text."""
+        counts, tokens = self.count_pages([lowered])
+        return counts[0], int(tokens[0])
+
+def rank_pages(pages: Sequence[Tuple[str, str]], keywords: Sequence[str]) -> List[Ranking]:
+    """BM25 scores and matched keywords for (title, content) pairs, in input order.
+
+    Bodies and titles are lowercased once and counted by one KeywordMatcher
+    pass; each page fills one row of the term-frequency matrix and its body
+    token count is the document length.
+    IDF comes from the result set itself, so a keyword found on every page
+    counts for less than one that singles a page out. Keywords weigh 1,
+    the policy-term expansion POLICY_TERM_WEIGHT.
+    """
+    if not pages:
+        return []
+    keyword_terms = list(dict.fromkeys(' '.join(k.lower().split()) for k in keywords if k and k.strip()))
+    matcher = KeywordMatcher(keyword_terms + [t for t in POLICY_TERMS if t not in keyword_terms])
+    weights = np.array([1.0 if term in keyword_terms else POLICY_TERM_WEIGHT for term in matcher.terms])
+
+    counts, tokens = matcher.count_pages([content.lower() for _, content in pages] + [title.lower() for title, _ in pages])
+    tf = counts[:len(pages)] + TITLE_WEIGHT * counts[len(pages):]
+    lengths = np.maximum(tokens[:len(pages)], 1)
+
+    n_docs = len(pages)
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / lengths.mean())
+    scores = (tf * (BM25_K1 + 1) / (tf + norm[:, None])) @ (idf * weights)
+
+    present = (tf > 0)[:, :len(keyword_terms)]
+    # Report keywords as the caller spelled them
+    original = {}
+    for keyword in keywords:
+        if keyword and keyword.strip():
+            original.setdefault(' '.join(keyword.lower().split()), keyword)
+    terms = matcher.terms
+    return [
+        Ranking(round(float(score), 4), [original[terms[i]] for i in np.flatnonzero(row)])
+        for score, row in zip(scores, present)
+    ]
+
+def _mention_finder(lowered: str, keywords: Tuple[str, ...]) -> Callable[[int], Optional[Tuple[int, int]]]:
+    """next_mention(position) -> (start, end) of the first keyword at or after position,
+    the shortest one if several start there.
+
+    Keeps one str.find cursor per keyword, so each keyword's occurrences are
+    scanned once in total; a re alternation scans position by position and
+    is several times slower on pages of this size.
+    """
+    cursors = {keyword: lowered.find(keyword) for keyword in keywords}
+
+    def next_mention(position: int) -> Optional[Tuple[int, int]]:
+        best = None
+        for keyword, found in cursors.items():
+            if 0 <= found < position:
+                found = cursors[keyword] = lowered.find(keyword, position)
+            # On ties the shortest keyword: if it runs into a separator, so do the longer ones
+            if found >= 0 and (best is None or (found, found + len(keyword)) < best):
+                best = (found, found + len(keyword))
+        return best
+    return next_mention
+
+def key_sentences(content: str, keywords: Sequence[str], limit: int = 3) -> List[str]:
+    """The first limit sentences (split on '. ') that mention any keyword, case-insensitively.
+
+    Single pass with early stop: the next mention is located, the sentence
+    around it is cut out at the neighbouring separators, and the search
+    resumes after that sentence. The content is never split into sentences.
+    """
+    # A keyword containing the separator can never lie inside one sentence
+    keywords = tuple(dict.fromkeys(k.lower() for k in keywords if k and SENTENCE_SEPARATOR not in k))
+    if not keywords or limit <= 0:
+        return []
+    lowered = content.lower()
+    if len(lowered) != len(content):
+        # Lowercasing changed some lengths (e.g. U+0130), so offsets would not line up
+        matches = (s.strip() for s in content.split(SENTENCE_SEPARATOR) if any(k in s.lower() for k in keywords))
+        return list(islice(matches, limit))
+
+    next_mention = _mention_finder(lowered, keywords)
+    sentences = []
+    position = 0
+    while len(sentences) < limit:
+        mention = next_mention(position)
+        if mention is None:
+            break
+        start, end = mention
+        if content.find(SENTENCE_SEPARATOR, max(start - 1, 0), end + 1) >= 0:
+            position = start + 1  # the mention runs into a separator, so it is in no sentence
+            continue
+        start = content.rfind(SENTENCE_SEPARATOR, 0, start)
+        start = 0 if start < 0 else start + len(SENTENCE_SEPARATOR)
+        end = content.find(SENTENCE_SEPARATOR, end)
+        end = len(content) if end < 0 else end
+        sentences.append(content[start:end].strip())
+        position = end + len(SENTENCE_SEPARATOR)
+    return sentences
@@ -0,0 +1,146 @@
+# api/university_index.py
+import os
+import re
+import gzip
+import json
+import logging
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+UNIVERSITY_DATASET = os.getenv(
+    'UNIVERSITY_DATASET',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'world_universities.json.gz')
+)
+# Cosine similarity of trigram sets. Matches from UNIVERSITY_MIN_SCORE up to
+# UNIVERSITY_SURE_SCORE must also lead the runner-up by UNIVERSITY_MIN_MARGIN:
+# 'LUISS' scores 0.41 against 'Universidad Nacional de San Luis' but only 0.09
+# above the next Luis, while 'Oxfrod University' leads its runner-up by 0.11.
+UNIVERSITY_MIN_SCORE = float(os.getenv('UNIVERSITY_MIN_SCORE', '0.4'))
+UNIVERSITY_SURE_SCORE = float(os.getenv('UNIVERSITY_SURE_SCORE', '0.5'))
+UNIVERSITY_MIN_MARGIN = float(os.getenv('UNIVERSITY_MIN_MARGIN', '0.1'))
+LOOKUP_CACHE_SIZE = 4096
+NGRAM = 3
+DOMAIN = re.compile(r'^(?:https?://)?(?:www\.)?([a-z0-9-]+(?:\.[a-z0-9-]+)+)/?$')
+
+class University(NamedTuple):
+    name: str
+    country: Optional[str]
+    alpha_two_code: Optional[str]
+    domains: List[str]
+
+class UniversityMatch(NamedTuple):
+    university: University
+    score: float
+
+def normalize_name(name: str) -> str:
+    """Casefolded, accent-free, punctuation as spaces: 'Università di Trento' -> 'universita di trento'"""
+    decomposed = unicodedata.normalize('NFKD', name.casefold())
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[\W_]+', ' ', stripped).split())
+
+def _ngrams(normalized: str) -> List[str]:
+    padded = f' {normalized} '
+    return list({padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)})
+
+class UniversityIndex:
+    """In-memory index of the bundled world-universities dataset.
+
+    Exact names and domains resolve through dicts. Anything else goes
+    through an inverted index of character trigrams: each query trigram
+    adds its squared IDF to every name containing it in one np.bincount,
+    and the best cosine similarity wins if it is high enough, or clearly
+    ahead of the second best; otherwise the lookup finds nothing rather
+    than a university in the wrong country. Rare trigrams ("tre", "ent" in
+    "trento") outweigh ones every name shares ("uni", "ver"), so partial
+    and misspelled names still find their university. Lookups are
+    memoized per query string.
+    """
+
+    def __init__(self, universities: List[University]):
+        self.universities = universities
+        self._by_name: Dict[str, int] = {}
+        self._by_domain: Dict[str, int] = {}
+        postings = defaultdict(list)
+        for i, university in enumerate(universities):
+            normalized = normalize_name(university.name)
+            self._by_name.setdefault(normalized, i)
+            for domain in university.domains:
+                self._by_domain.setdefault(domain.lower(), i)
+            for gram in _ngrams(normalized):
+                postings[gram].append(i)
+
+        n = max(len(universities), 1)
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._weights = {gram: float(np.log(n / len(ids)) + 1.0) ** 2 for gram, ids in self._postings.items()}
+        norms = np.zeros(len(universities))
+        for gram, ids in self._postings.items():
+            norms[ids] += self._weights[gram]
+        self._norms = np.sqrt(np.maximum(norms, 1e-12))  # names of punctuation only have no trigrams
+        self.lookup = lru_cache(maxsize=LOOKUP_CACHE_SIZE)(self._lookup)
+
+    @classmethod
+    def load(cls, path: str) -> 'UniversityIndex':
+        """Index a JSON list of {name, country, alpha_two_code, domains}, gzipped or not."""
+        try:
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'rt', encoding='utf-8') as f:
+                records = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"University dataset {path} unavailable, lookups will find nothing: {str(e)}")
+            records = []
+        universities = [
+            University(r['name'], r.get('country'), r.get('alpha_two_code'), list(r.get('domains') or []))
+            for r in records if r.get('name')
+        ]
+        logger.info(f"Indexed {len(universities)} universities from {path}")
+        return cls(universities)
+
+    def _lookup(self, query: str) -> Optional[UniversityMatch]:
+        domain = DOMAIN.match(query.strip().lower())
+        if domain and domain.group(1) in self._by_domain:
+            return UniversityMatch(self.universities[self._by_domain[domain.group(1)]], 1.0)
+
+        normalized = normalize_name(query)
+        if not normalized:
+            return None
+        if normalized in self._by_name:
+            return UniversityMatch(self.universities[self._by_name[normalized]], 1.0)
+
+        grams = [gram for gram in _ngrams(normalized) if gram in self._postings]
+        if not grams:
+            return None
+        ids = np.concatenate([self._postings[gram] for gram in grams])
+        weights = np.concatenate([np.full(len(self._postings[gram]), self._weights[gram]) for gram in grams])
+        shared = np.bincount(ids, weights=weights, minlength=len(self.universities))
+        # Query trigrams missing from the index count at the highest weight
+        unseen = len(_ngrams(normalized)) - len(grams)
+        query_norm = np.sqrt(sum(self._weights[gram] for gram in grams) + unseen * (np.log(len(self.universities)) + 1.0) ** 2)
+        scores = shared / (self._norms * query_norm)
+        best = int(np.argmax(scores))
+        score = float(scores[best])
+        scores[best] = 0.0
+        runner_up = float(scores.max(initial=0.0))
+        if score < UNIVERSITY_MIN_SCORE:
+            return None
+        if score < UNIVERSITY_SURE_SCORE and score - runner_up < UNIVERSITY_MIN_MARGIN:
+            logger.debug(f"Ambiguous university '{query}': {self.universities[best].name} {score:.3f}, runner-up {runner_up:.3f}")
+            return None
+        return UniversityMatch(self.universities[best], round(score, 4))
+
+    def country(self, query: str) -> Optional[str]:
+        match = self.lookup(query)
+        return match.university.country if match else None
+
+    def domain(self, query: str) -> Optional[str]:
+        match = self.lookup(query)
+        return match.university.domains[0] if match and match.university.domains else None
+
+    def __len__(self) -> int:
+        return len(self.universities)
+
+university_index = UniversityIndex.load(UNIVERSITY_DATASET)
@@ -0,0 +1,199 @@
+import os
+import sys
+import time
+import random
+import argparse
+import logging
+import tempfile
+import threading
+import multiprocessing
+from datetime import datetime
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+# Importing the routes package builds every agent, which check for their API keys
+os.environ.setdefault('OPENROUTER_API_KEY', 'benchmark')
+os.environ.setdefault('SERPAPI_KEY', 'benchmark')
+
+from models import db, User, Preference, ChatHistory, ChatSession
+from contracts import store_contract
+from database import configure_database, sqlite_engine_options, write_behind
+from preferences import preference_store, PREFERENCE_AREAS
+from routes.chat_routes import _queue_chat_history
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MODES = {
+    'baseline': 'baseline (default SQLite)',
+    'inline': 'WAL + pool, inline writes',
+    'write-behind': 'WAL + pool + write-behind'
+}
+
+def make_app(db_path: str, mode: str) -> Flask:
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{db_path}',
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        DB_WRITE_BEHIND=mode == 'write-behind'
+    )
+    if mode != 'baseline':
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_engine_options()
+    db.init_app(app)
+    if mode != 'baseline':
+        configure_database(app)
+    return app
+
+def setup_database(db_path: str, users: int, mode: str):
+    app = make_app(db_path, mode)
+    with app.app_context():
+        db.create_all()
+        contract_id = store_contract('benchmark contract')
+        for user_id in range(1, users + 1):
+            db.session.add(User(id=user_id, username=f'user{user_id}', email=f'user{user_id}@example.com', password_hash='x'))
+            db.session.add(ChatSession(id=f'session-{user_id}', user_id=user_id, contract_id=contract_id))
+            for area in PREFERENCE_AREAS:
+                db.session.add(Preference(user_id=user_id, area=area, weight=1.0))
+        db.session.commit()
+
+def legacy_message(user_id: int, question: str, areas, llm_delay: float, committed):
+    """DB work of send_message with one preference row per area: three commits and 17 row updates"""
+    ChatSession.query.get(f'session-{user_id}')
+    chat_history = ChatHistory(user_id=user_id, session_id=f'session-{user_id}', question=question)
+    db.session.add(chat_history)
+    db.session.commit()
+    for pref in Preference.query.filter_by(user_id=user_id).all():
+        if pref.area in areas:
+            pref.weight = min(pref.weight + 0.2, 5.0)
+        else:
+            pref.weight = max(pref.weight - 0.05, 0.5)
+    db.session.commit()
+    time.sleep(llm_delay)
+    chat_history.response = 'answer'
+    db.session.commit()
+    committed(True)
+
+def tuned_message(user_id: int, question: str, areas, llm_delay: float, committed):
+    """DB work of send_message now: batched preference events and one chat history op.
+
+    With DB_WRITE_BEHIND=0 the op commits before this returns; otherwise
+    committed is called from the write-behind thread once its batch commits.
+    """
+    ChatSession.query.get(f'session-{user_id}')
+    asked_at = datetime.utcnow()
+    preference_store.record(user_id, areas)
+    time.sleep(llm_delay)
+    _queue_chat_history(user_id, f'session-{user_id}', question, asked_at, 'answer', on_done=committed)
+
+def worker(db_path: str, mode: str, worker_id: int, threads: int, messages: int,
+           users: int, llm_delay: float, results):
+    app = make_app(db_path, mode)
+    handler = legacy_message if mode == 'baseline' else tuned_message
+    latencies = []
+    commit_latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def run(thread_id: int):
+        rng = random.Random(worker_id * 1000 + thread_id)
+        local = []
+        with app.app_context():
+            for n in range(messages):
+                user_id = rng.randint(1, users)
+                areas = rng.sample(PREFERENCE_AREAS, 2)
+                started = time.perf_counter()
+
+                def committed(ok: bool, started=started):
+                    # Until the chat row is durable; runs on the write-behind thread when queued
+                    if ok:
+                        with lock:
+                            commit_latencies.append((time.perf_counter() - started) * 1000)
+                try:
+                    handler(user_id, f'Question {n} about {areas[0]}?', areas, llm_delay, committed)
+                    local.append((time.perf_counter() - started) * 1000)
+                except Exception as e:
+                    db.session.rollback()
+                    with lock:
+                        errors.append(str(e))
+            db.session.remove()
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    if mode != 'baseline':
+        with app.app_context():
+            preference_store.flush()
+        write_behind.flush()
+    results.put((latencies, commit_latencies, errors))
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+def run_mode(mode: str, args) -> dict:
+    db_path = os.path.join(tempfile.mkdtemp(prefix='chat_concurrency_'), 'bench.db')
+    setup_database(db_path, args.users, mode)
+    results = multiprocessing.Queue()
+    started = time.perf_counter()
+    procs = [
+        multiprocessing.Process(target=worker, args=(
+            db_path, mode, w, args.threads, args.messages, args.users, args.llm_delay, results
+        ))
+        for w in range(args.workers)
+    ]
+    for p in procs:
+        p.start()
+    latencies, commit_latencies, errors = [], [], []
+    for _ in procs:
+        lat, committed, err = results.get()
+        latencies.extend(lat)
+        commit_latencies.extend(committed)
+        errors.extend(err)
+    for p in procs:
+        p.join()
+    # Workers flush their queues before reporting, so this is until everything is committed
+    elapsed = time.perf_counter() - started
+
+    app = make_app(db_path, 'baseline')
+    with app.app_context():
+        saved = ChatHistory.query.count()
+    return {
+        'mode': MODES[mode],
+        'messages': len(latencies),
+        'errors': len(errors),
+        'saved': saved,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+        'commit_p50': percentile(commit_latencies, 50),
+        'commit_p99': percentile(commit_latencies, 99),
+        'throughput': saved / elapsed if elapsed else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Chat write path latency under concurrent workers')
+    parser.add_argument('--workers', type=int, default=4, help='processes, like gunicorn workers')
+    parser.add_argument('--threads', type=int, default=4, help='threads per worker')
+    parser.add_argument('--messages', type=int, default=200, help='messages per thread')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--llm-delay', type=float, default=0.005, help='simulated LLM latency (s)')
+
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    rows = [run_mode(mode, args) for mode in args.modes]
+    print(f"\n{args.workers} workers x {args.threads} threads x {args.messages} messages")
+    print("response: until send_message returns; committed: until the chat row is committed")
+    print(f"{'mode':28} {'response p50':>12} {'p99':>8} {'committed p50':>14} {'p99':>8} {'saved/s':>8} {'saved':>7} {'errors':>7}")
+    for r in rows:
+        print(f"{r['mode']:28} {r['p50']:12.2f} {r['p99']:8.2f} {r['commit_p50']:14.2f} {r['commit_p99']:8.2f} "
+              f"{r['throughput']:8.1f} {r['saved']:7d} {r['errors']:7d}")
+
+if __name__ == "__main__":
+    main()
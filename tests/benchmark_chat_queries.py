@@ -0,0 +1,154 @@
+import os
+import sys
+import time
+import random
+import argparse
+import logging
+import tempfile
+from datetime import datetime, timedelta
+from statistics import median
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from models import db, User, Preference, ChatHistory, ChatSession
+import migrations
+from contracts import store_contract
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+AREAS = [
+    'sick_leave', 'vacation', 'overtime', 'termination', 'confidentiality',
+    'non_compete', 'intellectual_property', 'governing_law', 'jurisdiction',
+    'dispute_resolution', 'liability', 'salary', 'benefits', 'work_hours',
+    'performance_evaluation', 'duties', 'responsibilities'
+]
+
+class ChatQueryBenchmark:
+    """Times the hot chat/preference queries with and without migration 2's indexes"""
+
+    def __init__(self, rows: int, users: int, sessions_per_user: int, repeats: int):
+        self.rows = rows
+        self.users = users
+        self.sessions_per_user = sessions_per_user
+        self.repeats = repeats
+        self.db_path = os.path.join(tempfile.mkdtemp(prefix='chat_bench_'), 'bench.db')
+        self.app = Flask(__name__)
+        self.app.config.update(
+            SQLALCHEMY_DATABASE_URI=f'sqlite:///{self.db_path}',
+            SQLALCHEMY_TRACK_MODIFICATIONS=False
+        )
+        db.init_app(self.app)
+
+    def populate(self):
+        """Create users, sessions, legacy preferences and chat_history rows"""
+        db.create_all()
+        self.drop_indexes()
+        rng = random.Random(42)
+        db.session.execute(User.__table__.insert(), [
+            {'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': 'x'}
+            for i in range(1, self.users + 1)
+        ])
+        db.session.execute(Preference.__table__.insert(), [
+            {'user_id': i, 'area': area, 'weight': 1.0}
+            for i in range(1, self.users + 1) for area in AREAS
+        ])
+        contract_id = store_contract('contract')
+        session_ids = [f'{i:08d}-{s:04d}' for i in range(1, self.users + 1) for s in range(self.sessions_per_user)]
+        db.session.execute(ChatSession.__table__.insert(), [
+            {'id': sid, 'user_id': int(sid.split('-')[0]), 'contract_id': contract_id, 'language': 'en'}
+            for sid in session_ids
+        ])
+        questions = [f'What does the contract say about {area} (variant {v})?' for area in AREAS for v in range(30)]
+        start = datetime(2025, 1, 1)
+        batch = []
+        for n in range(self.rows):
+            sid = rng.choice(session_ids)
+            batch.append({
+                'user_id': int(sid.split('-')[0]),
+                'session_id': sid,
+                'question': rng.choice(questions),
+                'response': 'answer',
+                'asked_at': start + timedelta(seconds=n)
+            })
+            if len(batch) == 50000:
+                db.session.execute(ChatHistory.__table__.insert(), batch)
+                batch = []
+        if batch:
+            db.session.execute(ChatHistory.__table__.insert(), batch)
+        db.session.commit()
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+        logger.info(f"Populated {self.rows} chat_history rows for {self.users} users in {self.db_path}")
+
+    def drop_indexes(self):
+        for model in (Preference, ChatHistory, ChatSession):
+            for index in model.__table__.indexes:
+                db.session.execute(db.text(f'DROP INDEX IF EXISTS {index.name}'))
+        db.session.commit()
+
+    def queries(self):
+        rng = random.Random(7)
+        user_id = rng.randint(1, self.users)
+        session_id = f'{user_id:08d}-0000'
+        return {
+            'preferences by user': lambda: Preference.query.filter_by(user_id=user_id).all(),
+            'preference by (user, area)': lambda: Preference.query.filter_by(user_id=user_id, area='salary').first(),
+            'history grouped by question for user': lambda: (
+                db.session.query(ChatHistory.question, db.func.count())
+                .filter(ChatHistory.user_id == user_id)
+                .group_by(ChatHistory.question)
+                .order_by(db.func.count().desc())
+                .limit(5)
+                .all()
+            ),
+            'history of session by time': lambda: (
+                ChatHistory.query.filter_by(session_id=session_id)
+                .order_by(ChatHistory.asked_at)
+                .all()
+            ),
+            'sessions by user': lambda: ChatSession.query.filter_by(user_id=user_id).all(),
+        }
+
+    def time_queries(self):
+        results = {}
+        for name, query in self.queries().items():
+            samples = []
+            for _ in range(self.repeats):
+                db.session.expunge_all()
+                started = time.perf_counter()
+                query()
+                samples.append((time.perf_counter() - started) * 1000)
+            results[name] = median(samples)
+        return results
+
+    def run(self):
+        with self.app.app_context():
+            self.populate()
+            before = self.time_queries()
+            started = time.perf_counter()
+            next(m for m in migrations.MIGRATIONS if m.version == 2).upgrade()
+            db.session.commit()
+            db.session.execute(db.text('ANALYZE'))
+            db.session.commit()
+            logger.info(f"Created indexes in {time.perf_counter() - started:.1f}s")
+            after = self.time_queries()
+
+        print(f"\nQuery latency at {self.rows} chat_history rows (median of {self.repeats}, ms)")
+        print(f"{'query':40} {'no index':>10} {'indexed':>10} {'speedup':>9}")
+        for name in before:
+            speedup = before[name] / after[name] if after[name] else float('inf')
+            print(f"{name:40} {before[name]:10.2f} {after[name]:10.2f} {speedup:8.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark chat/preference queries before and after indexing')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--sessions-per-user', type=int, default=5)
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+    ChatQueryBenchmark(args.rows, args.users, args.sessions_per_user, args.repeats).run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import os
+import sys
+import glob
+import time
+import struct
+import argparse
+import logging
+import tempfile
+import tracemalloc
+from statistics import median
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from pdf_engine import extract_pages, with_offsets, join_pages
+from legacy_formats import extract_doc, extract_rtf
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+CONTRACTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'contracts')
+
+def contract_text() -> str:
+    """Text of the bundled contracts that have a text layer"""
+    parts = []
+    for pdf in sorted(glob.glob(os.path.join(CONTRACTS_DIR, '**', '*.pdf'), recursive=True)):
+        pages = extract_pages(pdf, workers=1)
+        if not all(scanned for _, _, scanned in pages):
+            parts.append(join_pages(with_offsets(pages)))
+    return '\n'.join(parts)
+
+def write_rtf(text: str, path: str) -> None:
+    """RTF as word processors write it: tables, a generator, hex escapes and \\uN for non-cp1252"""
+    out = [r'{\rtf1\ansi\ansicpg1252\deff0{\fonttbl{\f0\fswiss Arial;}{\f1\froman Times New Roman;}}',
+           r'{\colortbl;\red0\green0\blue0;}{\*\generator Bench 1.0;}\uc1\pard\f0\fs22 ']
+    for line in text.split('\n'):
+        escaped = []
+        for char in line:
+            if char in '\\{}':
+                escaped.append('\\' + char)
+            elif ord(char) < 128:
+                escaped.append(char)
+            else:
+                try:
+                    escaped.extend(f"\\'{byte:02x}" for byte in char.encode('cp1252'))
+                except UnicodeEncodeError:
+                    code = ord(char)
+                    escaped.append(f"\\u{code - 65536 if code > 32767 else code}?")
+        out.append(''.join(escaped) + '\\par\n')
+    out.append('}')
+    with open(path, 'w', encoding='ascii') as file:
+        file.write(''.join(out))
+
+def write_doc(text: str, path: str, compressed: bool) -> None:
+    """Word 97 binary document: FIB + one-piece table, wrapped in an OLE2 compound file"""
+    text = text.replace('\n', '\r')
+    fib = bytearray(0x800)
+    struct.pack_into('<HH', fib, 0, 0xA5EC, 0x00C1)
+    struct.pack_into('<H', fib, 0x0A, 0x0200)  # fWhichTblStm: 1Table
+    struct.pack_into('<i', fib, 0x4C, len(text))
+    if compressed:
+        body, fc = text.encode('cp1252', errors='replace'), (0x800 * 2) | 0x40000000
+    else:
+        body, fc = text.encode('utf-16-le'), 0x800
+    plc = struct.pack('<II', 0, len(text)) + struct.pack('<HIH', 0, fc, 0)
+    clx = b'\x02' + struct.pack('<I', len(plc)) + plc
+    struct.pack_into('<II', fib, 0x1A2, 0, len(clx))
+    write_compound_file(path, {'WordDocument': bytes(fib) + body, '1Table': clx})
+
+def write_compound_file(path: str, streams) -> None:
+    sector, mini, cutoff, free, end, fat_mark = 512, 64, 4096, 0xFFFFFFFF, 0xFFFFFFFE, 0xFFFFFFFD
+    sectors, fat = [], []
+
+    def chain(data: bytes) -> int:
+        count = max(1, -(-len(data) // sector))
+        start = len(sectors)
+        data = data.ljust(count * sector, b'\0')
+        for index in range(count):
+            sectors.append(data[index * sector:(index + 1) * sector])
+            fat.append(start + index + 1 if index < count - 1 else end)
+        return start
+
+    mini_stream, minifat, entries = b'', [], []
+    for name, data in streams.items():
+        if len(data) < cutoff:
+            count = max(1, -(-len(data) // mini))
+            start = len(mini_stream) // mini
+            mini_stream += data.ljust(count * mini, b'\0')
+            minifat.extend(start + index + 1 if index < count - 1 else end for index in range(count))
+            entries.append((name, 2, start, len(data)))
+        else:
+            entries.append((name, 2, chain(data), len(data)))
+    root_start = chain(mini_stream) if mini_stream else end
+    minifat_start = chain(struct.pack(f'<{len(minifat)}I', *minifat)) if minifat else end
+
+    directory = b''
+    for index, (name, kind, start, size) in enumerate([('Root Entry', 5, root_start, len(mini_stream))] + entries):
+        encoded = name.encode('utf-16-le') + b'\0\0'
+        child = 1 if kind == 5 else free
+        right = index + 1 if kind == 2 and index < len(entries) else free
+        directory += (encoded.ljust(64, b'\0') + struct.pack('<HBBIII', len(encoded), kind, 1, free, right, child)
+                      + b'\0' * 36 + struct.pack('<IQ', start, size))
+    directory_start = chain(directory.ljust(-(-len(directory) // sector) * sector, b'\0'))
+
+    per_sector = sector // 4
+    fat_count, difat_count = 1, 0
+    while (len(sectors) + fat_count + difat_count) > fat_count * per_sector or max(0, fat_count - 109) > difat_count * (per_sector - 1):
+        fat_count = -(-(len(sectors) + fat_count + difat_count) // per_sector)
+        difat_count = -(-max(0, fat_count - 109) // (per_sector - 1))
+    fat_start = len(sectors)
+    difat_start = fat_start + fat_count
+    fat.extend([fat_mark] * fat_count + [0xFFFFFFFC] * difat_count)
+    fat_bytes = struct.pack(f'<{len(fat)}I', *fat).ljust(fat_count * sector, b'\xff')
+    sectors.extend(fat_bytes[index * sector:(index + 1) * sector] for index in range(fat_count))
+    fat_sectors = [fat_start + index for index in range(fat_count)]
+    overflow = fat_sectors[109:]
+    for index in range(difat_count):
+        entries = overflow[index * (per_sector - 1):(index + 1) * (per_sector - 1)]
+        following = difat_start + index + 1 if index < difat_count - 1 else end
+        sectors.append(struct.pack(f'<{per_sector}I', *(entries + [free] * (per_sector - 1 - len(entries)) + [following])))
+
+    header = bytearray(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'.ljust(512, b'\0'))
+    struct.pack_into('<HHHHH', header, 0x18, 0x3E, 3, 0xFFFE, 9, 6)
+    struct.pack_into('<IIIIIIIII', header, 0x28, 0, fat_count, directory_start, 0, cutoff,
+                     minifat_start, -(-len(minifat) * 4 // sector), difat_start if difat_count else end, difat_count)
+    difat = fat_sectors[:109] + [free] * (109 - min(fat_count, 109))
+    struct.pack_into('<109I', header, 0x4C, *difat)
+    with open(path, 'wb') as file:
+        file.write(bytes(header))
+        file.writelines(sectors)
+
+def measure(fn, repeats: int):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, median(samples), peak
+
+def llm_extract(path: str) -> str:
+    from agents.document_extractor import DocumentExtractor
+    return DocumentExtractor()._extract_from_openrouter(path, 'document') or ''
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark local RTF/.doc extraction against the LLM path')
+    parser.add_argument('--copies', type=int, nargs='+', default=[1, 20, 200], help='contract corpus repetitions per file')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--llm', action='store_true', help='also time the OpenRouter path (needs OPENROUTER_API_KEY)')
+    args = parser.parse_args()
+
+    base = contract_text()
+    work = tempfile.mkdtemp(prefix='format_bench_')
+    print(f"\nLocal extraction (median of {args.repeats}); corpus {len(base)} chars")
+    print(f"{'file':26} {'size MB':>8} {'ms':>9} {'MB/s':>8} {'peak MB':>8} {'LLM upload MB':>14}")
+    for copies in args.copies:
+        text = '\n'.join([base] * copies)
+        files = {
+            f'rtf x{copies}': (write_rtf, extract_rtf, '.rtf', {}),
+            f'doc cp1252 x{copies}': (write_doc, extract_doc, '.doc', {'compressed': True}),
+            f'doc utf-16 x{copies}': (write_doc, extract_doc, '.doc', {'compressed': False}),
+        }
+        for label, (writer, reader, suffix, options) in files.items():
+            path = os.path.join(work, label.replace(' ', '_') + suffix)
+            writer(text, path, **options)
+            size = os.path.getsize(path) / (1024 * 1024)
+            extracted, elapsed, peak = measure(lambda: reader(path), args.repeats)
+            assert extracted.split() == text.split(), f'{label}: extracted text differs from the source'
+            upload = -(-os.path.getsize(path) // 3) * 4 / (1024 * 1024)  # base64 request body
+            print(f"{label:26} {size:8.2f} {elapsed:9.1f} {size / (elapsed / 1000):8.1f} {peak / (1024 * 1024):8.1f} {upload:14.2f}")
+            if args.llm and copies == args.copies[0]:
+                started = time.perf_counter()
+                remote = llm_extract(path)
+                print(f"{'  LLM path':26} {'':8} {(time.perf_counter() - started) * 1000:9.1f} {'':8} {'':8} {'':>14}  ({len(remote)} chars)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import glob
+import time
+import argparse
+import logging
+import tempfile
+from statistics import median
+import fitz  # PyMuPDF
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+import pdf_engine
+from pdf_engine import extract_pages, with_offsets, join_pages
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+CONTRACTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'contracts')
+
+def legacy_extract(path: str) -> str:
+    """The old _extract_pdf_fallback: every page on the request thread, joined with +="""
+    doc = fitz.open(path)
+    text = ""
+    for page in doc:
+        text += page.get_text()
+    return text
+
+def engine_extract(path: str, workers: int) -> str:
+    return join_pages(with_offsets(extract_pages(path, workers=workers)))
+
+def build_corpus(pdfs, pages: int) -> str:
+    """Concatenate the bundled text contracts until the document has the requested pages"""
+    path = os.path.join(tempfile.mkdtemp(prefix='pdf_bench_'), 'corpus.pdf')
+    out = fitz.open()
+    while out.page_count < pages:
+        for pdf in pdfs:
+            with fitz.open(pdf) as src:
+                out.insert_pdf(src, to_page=min(src.page_count, pages - out.page_count) - 1)
+            if out.page_count >= pages:
+                break
+    out.save(path)
+    out.close()
+    return path
+
+def time_it(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark page-parallel PDF extraction on contracts/')
+    parser.add_argument('--pages', type=int, default=400, help='pages in the concatenated corpus')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    pdfs = sorted(glob.glob(os.path.join(CONTRACTS_DIR, '**', '*.pdf'), recursive=True))
+    text_pdfs = [p for p in pdfs if not all(scanned for _, _, scanned in extract_pages(p, workers=1))]
+
+    print(f"\nBundled contracts (median of {args.repeats}, ms)")
+    print(f"{'file':28} {'pages':>6} {'legacy':>9} {'engine':>9}")
+    for pdf in pdfs:
+        with fitz.open(pdf) as doc:
+            page_count = doc.page_count
+        legacy = time_it(lambda: legacy_extract(pdf), args.repeats)
+        engine = time_it(lambda: engine_extract(pdf, pdf_engine.MAX_WORKERS), args.repeats)
+        print(f"{os.path.basename(pdf):28} {page_count:6d} {legacy:9.2f} {engine:9.2f}")
+
+    corpus = build_corpus(text_pdfs, args.pages)
+    expected = legacy_extract(corpus)
+    baseline = time_it(lambda: legacy_extract(corpus), args.repeats)
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    print(f"\n{args.pages}-page corpus from {len(text_pdfs)} text contracts, {cpus} CPUs available (median of {args.repeats}, ms)")
+    print("speedup is against legacy; scaling is against 1 engine worker; efficiency = scaling / workers")
+    print(f"{'mode':28} {'ms':>9} {'speedup':>9} {'scaling':>9} {'efficiency':>11}")
+    print(f"{'legacy (1 thread, +=)':28} {baseline:9.1f} {1.0:8.2f}x")
+    single = time_it(lambda: engine_extract(corpus, 1), args.repeats)
+    for workers in args.workers:
+        assert engine_extract(corpus, workers) == expected, 'engine output differs from legacy'
+        elapsed = single if workers == 1 else time_it(lambda: engine_extract(corpus, workers), args.repeats)
+        scaling = single / elapsed
+        note = f'  (more workers than the {cpus} CPUs)' if workers > cpus else ''
+        print(f"{f'engine, {workers} worker(s)':28} {elapsed:9.1f} {baseline / elapsed:8.2f}x "
+              f"{scaling:8.2f}x {scaling / workers:10.0%}{note}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import os
+import sys
+import time
+import random
+import argparse
+from statistics import median
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from search_ranking import key_sentences, rank_pages
+
+VOCABULARY = (
+    'the university student accommodation rent deposit tenancy contract landlord agreement '
+    'term notice period payment month fees services library campus course exam admission '
+    'visa permit office guidance support information rules regulation policy guidelines '
+    'residence hall room kitchen utilities insurance housing scholarship'
+).split()
+KEYWORDS = ['housing', 'deposit', 'tenancy agreement', 'notice period', 'international students']
+
+def legacy_relevance(content: str, title: str, keywords):
+    """The old _calculate_relevance: a substring test per keyword, flat weights"""
+    content_lower = content.lower()
+    title_lower = title.lower()
+    matched_keywords = []
+    score = 0.0
+    for keyword in keywords:
+        keyword_lower = keyword.lower()
+        if keyword_lower in title_lower:
+            score += 2.0
+            matched_keywords.append(keyword)
+        if keyword_lower in content_lower:
+            score += 1.0
+            if keyword not in matched_keywords:
+                matched_keywords.append(keyword)
+        if keyword_lower in ['regulation', 'regulations', 'regolamenti', 'policy', 'policies']:
+            score += 1.5
+    for term in ['policy', 'policies', 'regulation', 'regulations', 'guidelines', 'rules', 'regolamenti']:
+        if term in content_lower:
+            score += 0.5
+    return score, matched_keywords
+
+def legacy_summarize(content: str, keywords):
+    """The old _summarize_content: splits the whole page into sentences first"""
+    sentences = content.split('. ')
+    relevant_sentences = []
+    key_points = []
+    for sentence in sentences:
+        if any(keyword.lower() in sentence.lower() for keyword in keywords):
+            relevant_sentences.append(sentence.strip())
+            if len(key_points) < 3:
+                key_points.append(sentence.strip())
+    summary = " ".join(relevant_sentences[:3]) or content[:200]
+    return summary, key_points
+
+def summarize(content: str, keywords):
+    key_points = key_sentences(content, keywords, limit=3)
+    return " ".join(key_points) or content[:200], key_points
+
+def make_pages(count: int, chars: int, seed: int = 7):
+    """Random pages over a small vocabulary, sentence-cased, with a few keyword-heavy ones"""
+    rng = random.Random(seed)
+    pages = []
+    for index in range(count):
+        words = []
+        length = 0
+        while length < chars:
+            sentence = [rng.choice(VOCABULARY) for _ in range(rng.randint(6, 20))]
+            if index % 4 == 0 and rng.random() < 0.2:
+                sentence.insert(rng.randrange(len(sentence)), rng.choice(KEYWORDS))
+            text = ' '.join(sentence).capitalize() + '.'
+            words.append(text)
+            length += len(text) + 1
+        pages.append((f'Page {index} {rng.choice(VOCABULARY)} {rng.choice(VOCABULARY)}', ' '.join(words)))
+    return pages
+
+def time_it(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmarks for search result ranking and summaries')
+    parser.add_argument('--pages', type=int, default=10, help='results per search (focused_search fetches max_results * 2)')
+    parser.add_argument('--chars', type=int, nargs='+', default=[5_000, 30_000, 100_000], help='characters per page')
+    parser.add_argument('--summary-chars', type=int, nargs='+', default=[100_000, 1_000_000], help='page size for summaries')
+    parser.add_argument('--repeats', type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"\nRanking {args.pages} pages for {len(KEYWORDS)} keywords (median of {args.repeats}, ms)")
+    print(f"{'chars/page':>10} {'legacy':>9} {'bm25':>9}")
+    for chars in args.chars:
+        pages = make_pages(args.pages, chars)
+        legacy = time_it(lambda: [legacy_relevance(content, title, KEYWORDS) for title, content in pages], args.repeats)
+        bm25 = time_it(lambda: rank_pages(pages, KEYWORDS), args.repeats)
+        print(f"{chars:10d} {legacy:9.2f} {bm25:9.2f}")
+
+    print(f"\nSummaries of one page (median of {args.repeats}, ms)")
+    print(f"{'chars':>9} {'keywords':>10} {'legacy':>9} {'single-pass':>12}")
+    for chars in args.summary_chars:
+        (_, page), = make_pages(1, chars, seed=chars)
+        cases = {
+            'frequent': ['student', 'room'],
+            'rare': ['tenancy agreement', 'notice period'],
+            'at end': ['zzz final clause'],
+            'absent': ['erasmus', 'quarantine'],
+        }
+        page_with_end = page + ' Last. The zzz final clause applies.'
+        for label, keywords in cases.items():
+            content = page_with_end if label == 'at end' else page
+            assert summarize(content, keywords) == legacy_summarize(content, keywords), f'{label}: summaries differ'
+            legacy = time_it(lambda: legacy_summarize(content, keywords), args.repeats)
+            single = time_it(lambda: summarize(content, keywords), args.repeats)
+            print(f"{chars:9d} {label:>10} {legacy:9.2f} {single:12.3f}")
+
+    pages = make_pages(args.pages, args.chars[0])
+    ranked = sorted(zip(rank_pages(pages, KEYWORDS), range(len(pages))), reverse=True)[:4]
+    print("\nTop pages:", ', '.join(f"#{index} {ranking.score:.2f} {ranking.matched_keywords}" for ranking, index in ranked))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+import argparse
+from statistics import median
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from university_index import UniversityIndex, UNIVERSITY_DATASET
+
+QUERIES = [
+    'University of Trento', 'universita degli stui di trento', 'trento', 'Oxford', 'harvard university',
+    'Stanford', 'Cambridge', 'Universita di Bologna', 'Sapienza', 'Sorbonne', 'unitn.it',
+    'Technische Universitat Munchen', 'University of Tokio', 'no such college anywhere'
+]
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark for university name lookups')
+    parser.add_argument('--dataset', default=UNIVERSITY_DATASET)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--fuzzywuzzy', action='store_true', help='also time process.extractOne over every name')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = UniversityIndex.load(args.dataset)
+    print(f"\nLoaded and indexed {len(index)} universities in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    if args.fuzzywuzzy:
+        from fuzzywuzzy import fuzz, process
+        names = [university.name for university in index.universities]
+
+    print(f"\n{'query':34} {'trigram us':>11} {'cached us':>10}" + (f" {'extractOne ms':>14}" if args.fuzzywuzzy else '') + "  match")
+    for query in QUERIES:
+        samples = []
+        for _ in range(args.repeats):
+            index.lookup.cache_clear()
+            t = time.perf_counter()
+            match = index.lookup(query)
+            samples.append((time.perf_counter() - t) * 1e6)
+        t = time.perf_counter()
+        index.lookup(query)
+        cached = (time.perf_counter() - t) * 1e6
+        row = f"{query:34} {median(samples):11.1f} {cached:10.2f}"
+        if args.fuzzywuzzy:
+            t = time.perf_counter()
+            process.extractOne(query.lower(), names, scorer=fuzz.token_sort_ratio)
+            row += f" {(time.perf_counter() - t) * 1000:14.1f}"
+        found = f"{match.university.name} ({match.university.country}, {match.university.domains[0]}) {match.score}" if match else '-'
+        print(f"{row}  {found}")
+
+if __name__ == "__main__":
+    main()
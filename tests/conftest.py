@@ -0,0 +1,7 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+# Scripts run by hand against a live server, not pytest tests
+collect_ignore = ['automated_test.py']
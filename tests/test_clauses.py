@@ -0,0 +1,34 @@
+from clauses import flatten, segment_text
+
+def test_article_headings_and_inline_references():
+    text = (
+        "Art. 1 - Oggetto\n"
+        "Il presente contratto disciplina il rapporto di lavoro come previsto dalla\n"
+        "sezione 3 del CCNL applicabile.\n"
+        "Art. 2 - Durata\n"
+        "The term is two years; clause 4 above shall apply.\n"
+        "ARTICLE III\n"
+        "Final provisions."
+    )
+    clauses = flatten(segment_text(text))
+    assert [(c['number'], c['heading'], c['level']) for c in clauses] == [
+        ('1', 'Art. 1 - Oggetto', 1),
+        ('2', 'Art. 2 - Durata', 1),
+        ('III', 'ARTICLE III', 1),
+    ]
+    assert text[clauses[0]['start']:clauses[0]['end']].endswith('CCNL applicabile.\n')
+    assert clauses[-1]['end'] == len(text)
+
+def test_dotted_numbers_nest_under_their_parent():
+    text = (
+        "1. Definitions\nIn this agreement:\n"
+        "1.1 Landlord\nmeans the owner.\n"
+        "1.2 Tenant\nmeans the student.\n"
+        "2. Rent\nThe rent is due monthly."
+    )
+    roots = segment_text(text)
+    assert [(c['number'], [child['number'] for child in c['children']]) for c in roots] == [
+        ('1', ['1.1', '1.2']),
+        ('2', []),
+    ]
+    assert roots[0]['end'] == roots[1]['start'] == text.index('2. Rent')
@@ -0,0 +1,33 @@
+import pytest
+from legacy_formats import extract_doc, extract_rtf, sniff_format
+from benchmark_document_formats import write_doc
+
+def test_rtf_text_with_escapes_groups_and_skipped_destinations(tmp_path):
+    path = tmp_path / 'lease.rtf'
+    path.write_bytes(
+        rb"{\rtf1\ansi\ansicpg1252\deff0{\fonttbl{\f0\fswiss Arial;}}{\*\generator Word;}"
+        rb"\pard\f0 Art. 1 \'96 Oggetto\par L\'27affitto \u232? dovuto {\b entro} il 5.\par}"
+    )
+    assert sniff_format(str(path)) == 'rtf'
+    assert extract_rtf(str(path)) == "Art. 1 – Oggetto\nL'affitto è dovuto entro il 5.\n"
+
+@pytest.mark.parametrize('compressed', [True, False])
+def test_doc_text_from_piece_table(tmp_path, compressed):
+    path = tmp_path / 'lease.doc'
+    write_doc("Art. 1 – Oggetto\nL'affitto è dovuto.", str(path), compressed)
+    assert sniff_format(str(path)) == 'doc'
+    assert extract_doc(str(path)) == "Art. 1 – Oggetto\nL'affitto è dovuto."
+
+def test_doc_keeps_field_results_and_drops_instructions(tmp_path):
+    path = tmp_path / 'fields.doc'
+    write_doc('Vedi \x13 HYPERLINK "https://example.org" \x14il sito\x15 ora.', str(path), False)
+    assert extract_doc(str(path)) == 'Vedi il sito ora.'
+
+def test_non_word_compound_file_is_rejected(tmp_path):
+    path = tmp_path / 'other.doc'
+    write_doc('text', str(path), True)
+    data = bytearray(path.read_bytes())
+    data[data.index(b'\xec\xa5\xc1\x00')] = 0  # break the FIB's wIdent
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match='Word 97-2003'):
+        extract_doc(str(path))
@@ -0,0 +1,65 @@
+import pytest
+from flask import Flask
+from sqlalchemy import inspect, text
+import migrations
+from models import db, ChatSession, Contract, QuestionFrequency
+
+# chat tables as the first release created them
+BASELINE_SCHEMA = [
+    'CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(80) NOT NULL UNIQUE, '
+    'email VARCHAR(120) NOT NULL UNIQUE, password_hash VARCHAR(255) NOT NULL, created_at DATETIME)',
+    'CREATE TABLE preferences (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users(id), '
+    'area VARCHAR(50) NOT NULL, weight FLOAT, updated_at DATETIME)',
+    'CREATE TABLE chat_sessions (id VARCHAR(36) PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users(id), '
+    'contract_text TEXT NOT NULL, language VARCHAR(10), created_at DATETIME)',
+    'CREATE TABLE chat_history (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users(id), '
+    'session_id VARCHAR(36) NOT NULL REFERENCES chat_sessions(id), question TEXT NOT NULL, response TEXT, asked_at DATETIME)',
+]
+
+@pytest.fixture
+def baseline_app(tmp_path, monkeypatch):
+    monkeypatch.setattr(migrations, '_schema_current', False)
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'baseline.db'}")
+    db.init_app(app)
+    with app.app_context():
+        for statement in BASELINE_SCHEMA:
+            db.session.execute(text(statement))
+        db.session.execute(text(
+            "INSERT INTO users (id, username, email, password_hash) VALUES (1, 'anna', 'anna@example.org', 'x')"
+        ))
+        db.session.execute(text(
+            "INSERT INTO preferences (user_id, area, weight) VALUES (1, 'vacation', 3.0)"
+        ))
+        db.session.execute(text(
+            "INSERT INTO chat_sessions (id, user_id, contract_text, language) VALUES "
+            "('s1', 1, 'Art. 1 - Oggetto', 'it'), ('s2', 1, 'Art. 1 - Oggetto', 'it')"
+        ))
+        db.session.execute(text(
+            "INSERT INTO chat_history (user_id, session_id, question, response) VALUES "
+            "(1, 's1', 'How many  vacation days?', '20'), (1, 's2', 'how many vacation days?', NULL)"
+        ))
+        db.session.commit()
+        # What startup does on an existing database: new tables only, no stamp
+        db.create_all()
+        yield app
+
+def test_upgrade_brings_a_baseline_database_to_the_latest_version(baseline_app):
+    assert [step.version for step in migrations.pending_migrations()] == [m.version for m in migrations.MIGRATIONS]
+    assert not migrations.schema_is_current()
+
+    applied = migrations.upgrade()
+
+    assert [step.version for step in applied] == [m.version for m in migrations.MIGRATIONS]
+    assert migrations.current_version() == migrations.MIGRATIONS[-1].version
+    assert migrations.schema_is_current()
+    columns = {column['name'] for column in inspect(db.engine).get_columns('chat_sessions')}
+    assert 'contract_id' in columns and 'contract_text' not in columns
+    sessions = ChatSession.query.order_by(ChatSession.id).all()
+    assert len({session.contract_id for session in sessions}) == 1
+    assert Contract.query.count() == 1
+    assert {(f.user_id, f.count) for f in QuestionFrequency.query.all()} == {(1, 2), (0, 2)}
+
+def test_upgrade_is_a_no_op_once_applied(baseline_app):
+    migrations.upgrade()
+    assert migrations.upgrade() == []